@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Contrôle d'admission des traitements: au-delà des traitements en cours et
+d'une file d'attente bornée, les requêtes sont refusées tout de suite (503)
+avec un délai Retry-After estimé d'après les durées récentes, au lieu
+d'attendre sans fin derrière un pool saturé.
+"""
+
+import math
+import statistics
+import threading
+import time
+from collections import deque
+
+
+class AdmissionController:
+    """Compteur des traitements admis (en cours + en attente) par worker web"""
+
+    def __init__(self, max_active: int, max_queued: int, history_size: int = 50,
+                 default_duration: float = 5.0):
+        """
+        Args:
+            max_active: Traitements simultanés (processus du pool)
+            max_queued: Traitements admis en attente d'un processus libre
+            history_size: Nombre de durées récentes conservées
+            default_duration: Durée supposée d'un traitement sans historique (secondes)
+        """
+        self.max_active = max(1, max_active)
+        self.max_queued = max(0, max_queued)
+        self.default_duration = default_duration
+        self._durations = deque(maxlen=history_size)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_active + self.max_queued
+
+    def try_acquire(self) -> bool:
+        """Admet un traitement s'il reste de la place, sinon le compte comme refusé"""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, duration: float = None):
+        """Libère une place; la durée du traitement alimente l'estimation"""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if duration is not None:
+                self._durations.append(duration)
+
+    def typical_duration(self) -> float:
+        with self._lock:
+            if not self._durations:
+                return self.default_duration
+            return statistics.median(self._durations)
+
+    def retry_after(self) -> int:
+        """
+        Secondes avant qu'un nouveau traitement puisse démarrer: la file
+        s'écoule par vagues de max_active traitements de durée typique
+        """
+        with self._lock:
+            waiting = self._in_flight + 1 - self.max_active
+        waves = max(1, math.ceil(waiting / self.max_active))
+        return max(1, math.ceil(waves * self.typical_duration()))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            'in_flight': in_flight,
+            'active_limit': self.max_active,
+            'queue_limit': self.max_queued,
+            'rejected': self.rejected,
+            'typical_duration': round(self.typical_duration(), 3),
+        }
+
+
+class AdmissionSlot:
+    """
+    Place admise d'un traitement: sa durée n'alimente l'estimation que si le
+    traitement a atteint le pool (un refus immédiat ne dure presque rien)
+    """
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+        self.start = time.monotonic()
+        self.reached_pool = False
+
+    def mark_reached_pool(self):
+        self.reached_pool = True
+
+    def release(self):
+        self.controller.release(time.monotonic() - self.start if self.reached_pool else None)
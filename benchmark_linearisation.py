@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark du temps d'affichage de la première page, avec et sans linéarisation
+
+Un lecteur (navigateur, mobile) affiche la page 1 d'un PDF linéarisé dès qu'il
+a reçu les octets jusqu'à /E (dictionnaire /Linearized en tête de fichier);
+sans linéarisation, la table xref est à la fin: il faut tout le fichier.
+Temps jusqu'à la première page = octets nécessaires / débit + rendu de la page 1.
+
+Usage:
+    python benchmark_linearisation.py [--pages 1 10 50] [--kbps 1600] [--repeat 3] [--pdf devis.pdf]
+"""
+
+import argparse
+import logging
+import os
+import re
+import statistics
+import time
+
+import fitz  # PyMuPDF
+from benchmark_modifier import create_bench_pdf
+from pdf_processor_complete import PDFProcessorComplete
+
+_LINEARIZED_RE = re.compile(rb"/Linearized\b.*?/E\s+(\d+)", re.S)
+
+def first_page_bytes(data: bytes) -> int:
+    """Octets à recevoir avant de pouvoir afficher la page 1"""
+    # Le dictionnaire de linéarisation est dans les 1024 premiers octets (PDF 32000, annexe F)
+    match = _LINEARIZED_RE.search(data[:1024])
+    return int(match.group(1)) if match else len(data)
+
+def render_first_page(data: bytes, dpi: int = 96) -> float:
+    """Durée (secondes) d'ouverture et de rendu de la page 1 à partir des octets reçus"""
+    start = time.perf_counter()
+    with fitz.open("pdf", data) as doc:
+        doc[0].get_pixmap(dpi=dpi)
+    return time.perf_counter() - start
+
+def bench_output(output_path: str, kbps: float, repeat: int) -> dict:
+    """Taille, octets avant la page 1 et temps jusqu'à la première page"""
+    with open(output_path, "rb") as f:
+        data = f.read()
+    needed = first_page_bytes(data)
+    render = statistics.median(render_first_page(data[:needed]) for _ in range(repeat))
+    transfer = needed * 8 / (kbps * 1000)
+    return {'size': len(data), 'first_page_bytes': needed, 'transfer': transfer,
+            'render': render, 'ttfp': transfer + render}
+
+if __name__ == "__main__":
+    # Le PDF d'exemple n'a pas d'acomptes: taire les avertissements du traitement
+    logging.disable(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Temps jusqu'à la première page, avec et sans linéarisation")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--kbps", type=float, default=1600, help="Débit simulé en kbit/s (3G: 1600)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pdf", help="PDF modèle (par défaut: PDF d'exemple)")
+    args = parser.parse_args()
+
+    os.makedirs("output", exist_ok=True)
+    print(f"Débit simulé: {args.kbps:.0f} kbit/s")
+    print(f"{'pages':>6}  {'mode':>9}  {'taille':>9}  {'avant p.1':>9}  {'rendu':>8}  {'1re page':>9}")
+    for num_pages in args.pages:
+        input_path = os.path.join("output", f"bench_lineaire_{num_pages}.pdf")
+        create_bench_pdf(input_path, num_pages, args.pdf)
+        for linearize in (False, True):
+            mode = "linéarisé" if linearize else "standard"
+            output_path = os.path.join("output", f"bench_lineaire_{num_pages}_{'lin' if linearize else 'std'}.pdf")
+            if not PDFProcessorComplete(linearize=linearize).process_pdf(input_path, output_path):
+                raise RuntimeError(f"Échec du traitement ({mode})")
+            result = bench_output(output_path, args.kbps, args.repeat)
+            print(f"{num_pages:>6}  {mode:>9}  {result['size'] / 1024:>7.1f}Ko  "
+                  f"{result['first_page_bytes'] / 1024:>7.1f}Ko  {result['render'] * 1000:>6.1f}ms  "
+                  f"{result['ttfp'] * 1000:>7.0f}ms")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark du traitement des images lors du masquage des zones
+
+Devis chargés en images (logo haute résolution en en-tête, bannière photo et
+photo produit débordant dans la marge basse sur chaque page), nettoyés avec:
+- 'pixels' partout (comportement par défaut de apply_redactions),
+- le traitement choisi par zone (PDFProcessorComplete.zones_to_clean),
+- 'none' partout (images laissées sous le remplissage blanc).
+
+Usage:
+    python benchmark_masquage.py [--pages 1 10 30] [--repeat 3]
+"""
+
+import argparse
+import io
+import logging
+import statistics
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+from pdf_processor_complete import PDFProcessorComplete
+
+def _photo(width: int, height: int, seed: int) -> bytes:
+    """Photo JPEG synthétique (bruit sur dégradé, peu compressible)"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(30, 220, width)[None, :, None]
+    pixels = (rng.random((height, width, 3)) * 35 + gradient).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def create_image_quote(num_pages: int) -> bytes:
+    """Devis de num_pages pages chargé en images"""
+    logo, banner, product = _photo(1600, 600, 1), _photo(2400, 140, 2), _photo(2000, 1500, 3)
+    doc = fitz.open()
+    for page_num in range(num_pages):
+        page = doc.new_page(width=595, height=842)
+        if page_num == 0:
+            page.insert_image(fitz.Rect(400, 25, 560, 95), stream=logo)
+            page.insert_text((50, 150), "Code interne : 4521   Date actuelle : 12/03/2024", fontsize=9)
+        page.insert_text((50, 300), f"Fenêtre PVC double vitrage - page {page_num + 1}", fontsize=10)
+        page.insert_image(fitz.Rect(300, 560, 560, 775), stream=product)
+        page.insert_image(fitz.Rect(25, 765, 565, 795), stream=banner)
+    return doc.tobytes()
+
+def with_image_mode(zones: dict, mode: str) -> dict:
+    return {scope: [dict(zone, images=mode) for zone in scope_zones] for scope, scope_zones in zones.items()}
+
+def bench_clean(data: bytes, zones: dict, repeat: int) -> tuple:
+    """Durée médiane de _clean_pdf (secondes) et taille du PDF enregistré"""
+    processor = PDFProcessorComplete()
+    durations = []
+    for _ in range(repeat):
+        with fitz.open("pdf", data) as doc:
+            start = time.perf_counter()
+            processor._clean_pdf(doc, doc[0], zones)
+            durations.append(time.perf_counter() - start)
+            size = len(doc.tobytes(garbage=1))
+    return statistics.median(durations), size
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Traitement des images lors du masquage des zones")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 30])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    default_zones = PDFProcessorComplete().zones_to_clean
+    variants = {
+        'pixels': with_image_mode(default_zones, 'pixels'),
+        'par zone': default_zones,
+        'none': with_image_mode(default_zones, 'none'),
+    }
+    print(f"{'pages':>6}  " + "  ".join(f"{name:>18}" for name in variants))
+    for num_pages in args.pages:
+        data = create_image_quote(num_pages)
+        cells = []
+        for zones in variants.values():
+            duration, size = bench_clean(data, zones, args.repeat)
+            cells.append(f"{duration * 1000:>7.0f}ms {size / 1024:>6.0f}Ko")
+        print(f"{num_pages:>6}  " + "  ".join(f"{cell:>18}" for cell in cells))
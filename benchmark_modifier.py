@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark des moteurs de PDFModifier: PyMuPDF contre overlay reportlab + PyPDF2
+
+Usage:
+    python benchmark_modifier.py [--pages 1 10 50] [--repeat 3] [--pdf devis.pdf]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import fitz  # PyMuPDF
+from config import COLORS
+from pdf_modifier import ENGINES, PDFModifier
+
+# Toutes les fonctionnalités actives, pour mesurer le pire cas
+BENCH_CONFIG = {
+    'modifications': {
+        'remove_logo': True,
+        'change_colors': True,
+        'add_text': True,
+        'add_watermark': True,
+    },
+    'texts_to_add': [{
+        'text': 'DEVIS MODIFIÉ AUTOMATIQUEMENT',
+        'position': (50, 780),
+        'font_size': 12,
+        'color': COLORS['accent'],
+        'font': 'Helvetica-Bold'
+    }],
+}
+
+def create_bench_pdf(output_path: str, num_pages: int, template: str = None):
+    """PDF de test de num_pages pages (copies du modèle ou du PDF d'exemple)"""
+    if template is None:
+        template = output_path + ".modele.pdf"
+        PDFModifier().create_sample_pdf(template)
+    with fitz.open(template) as src:
+        doc = fitz.open()
+        while len(doc) < num_pages:
+            doc.insert_pdf(src, to_page=min(len(src), num_pages - len(doc)) - 1)
+        doc.save(output_path)
+        doc.close()
+
+def bench_engine(engine: str, input_path: str, output_path: str, repeat: int) -> float:
+    """Durée médiane (secondes) de modify_pdf pour un moteur"""
+    modifier = PDFModifier(dict(BENCH_CONFIG, engine=engine))
+    modifier.color_bars = [
+        {'position': 'top', 'color': COLORS['primary'], 'thickness': 20},
+        {'position': 'bottom', 'color': COLORS['secondary'], 'thickness': 15},
+    ]
+    modifier.advanced_config['add_page_numbers'] = True
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if not modifier.modify_pdf(input_path, output_path):
+            raise RuntimeError(f"Échec du moteur {engine}")
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Benchmark des moteurs de PDFModifier")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pdf", help="PDF modèle (par défaut: PDF d'exemple)")
+    args = parser.parse_args()
+
+    os.makedirs("output", exist_ok=True)
+    print(f"{'pages':>6}  " + "  ".join(f"{engine:>10}" for engine in ENGINES) + "   gain")
+    for num_pages in args.pages:
+        input_path = os.path.join("output", f"bench_modifier_{num_pages}.pdf")
+        create_bench_pdf(input_path, num_pages, args.pdf)
+        timings = {
+            engine: bench_engine(engine, input_path,
+                                 os.path.join("output", f"bench_modifier_{num_pages}_{engine}.pdf"),
+                                 args.repeat)
+            for engine in ENGINES
+        }
+        print(f"{num_pages:>6}  " + "  ".join(f"{timings[engine] * 1000:>8.1f}ms" for engine in ENGINES)
+              + f"   x{timings['reportlab'] / timings['pymupdf']:.1f}")
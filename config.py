@@ -3,6 +3,8 @@ Configuration pour le modificateur de PDF de devis ADF
 Modifiez ces paramètres selon vos besoins
 """
 
+import os
+
 from reportlab.lib.colors import Color
 
 # Configuration des modifications à appliquer
@@ -28,7 +30,8 @@ COLORS = {
 # Textes à ajouter sur le PDF (désactivé pour le nettoyage)
 TEXTS_TO_ADD = []
 
-# Remplacements de texte (désactivé pour le nettoyage)
+# Remplacements de texte {'texte recherché': 'remplacement'}, appliqués si modify_existing_text
+# (désactivé pour le nettoyage)
 TEXT_REPLACEMENTS = {}
 
 # Zones spécifiques à masquer pour le devis ADF
@@ -60,6 +63,7 @@ ADVANCED_CONFIG = {
     'preserve_original_colors': True,   # Conserver les couleurs originales pendant le nettoyage
     'add_page_numbers': False,          # Pas de numéros de page pour le nettoyage
     'compress_output': True,            # Compresser le PDF de sortie
+    'engine': 'pymupdf',                # Moteur de PDFModifier: 'pymupdf' ou 'reportlab' (overlay PyPDF2)
     'remove_metadata': False,           # Garder les métadonnées pour l'instant
     'add_custom_metadata': {            # Métadonnées de nettoyage
         'title': 'Devis Nettoyé',
@@ -69,6 +73,104 @@ ADVANCED_CONFIG = {
     }
 }
 
+# Configuration du traitement des devis (PDFProcessorComplete)
+PROCESSING_CONFIG = {
+    'parallel_threshold': 30,   # Pages à partir desquelles le traitement est réparti par plages (0 = jamais)
+    'parallel_workers': None,   # Processus pour le mode parallèle (None = nombre de CPU)
+    'auto_zones': True,         # Ajuster les zones de nettoyage à la mise en page (zone_detector.py)
+    'use_templates': False,     # Plans précompilés par modèle de devis (template_registry.py, templates.json):
+                                # à activer une fois un modèle ADF enregistré, sinon chaque devis est signalé inconnu
+    'verify_totals': True,      # Vérifier lignes et totaux du devis (line_items.py, en-têtes X-Totals-*)
+    'linearize': True,          # PDF linéarisé (« affichage web rapide »): page 1 visible avant la fin du téléchargement
+    'optimize_images': False,   # Réduire les photos trop lourdes après le design (image_optimizer.py, IMAGE_OPTIMIZATION_CONFIG):
+                                # recompression JPEG avec perte des photos du client, à activer explicitement
+    'pool_workers': int(os.environ.get('PDF_POOL_WORKERS', 2)),  # Processus de traitement par worker web
+    'max_jobs_per_worker': 50,      # Recycler un processus de traitement après N devis (0 = jamais)
+    'worker_memory_limit_mb': 512,  # Recycler un processus dont la RSS dépasse ce plafond (None = jamais)
+    'max_queued_jobs': 8,           # Devis en attente d'un processus libre avant de répondre 503
+    'job_timeout': 120,             # Budget de temps d'un devis en secondes (processus tué au-delà, None = illimité)
+    'quarantine_ttl': 7 * 86400,    # Refus d'un devis ayant dépassé le budget, en secondes (indépendant de RESULTS_CONFIG['ttl'])
+}
+
+# Stockage des devis traités (aperçus et téléchargements)
+RESULTS_CONFIG = {
+    'storage_dir': 'storage',   # Répertoire des fichiers stockés par empreinte SHA-256
+    'ttl': 3600,                # Durée de conservation en secondes
+    'download_ttl': 3600,       # Validité des jetons de téléchargement (/download/{jeton})
+}
+
+# Téléversements reprenables par morceaux (upload_sessions.py)
+UPLOAD_CONFIG = {
+    'sessions_dir': 'uploads/sessions',  # Sessions en cours (métadonnées et fichiers partiels)
+    'chunk_size': 1024 * 1024,           # Taille de morceau proposée au client
+    'max_chunk_size': 8 * 1024 * 1024,   # Morceau le plus gros accepté
+    'max_size': 50 * 1024 * 1024,        # Taille maximale d'un devis téléversé
+    'ttl': 86400,                        # Session conservée 24 h sans nouveau morceau
+}
+
+# Configuration des aperçus de pages
+PREVIEW_CONFIG = {
+    'default_dpi': 72,
+    'max_dpi': 200,
+    'max_pixels': 4_000_000,    # Borne du coût de rendu d'un aperçu
+    'cache_max_mb': 64,         # Taille du cache d'aperçus par worker
+}
+
+# Tableau des articles et vérification des totaux (line_items.py)
+TABLE_CONFIG = {
+    'columns': {                # Libellés d'en-tête des colonnes numériques
+        'quantity': ['Qté', 'Quantité', 'Qte', 'Qt'],
+        'unit_price': ['P.U. HT', 'P.U.', 'PU HT', 'Prix unitaire', 'Prix U.'],
+        'total': ['Total HT', 'Montant HT', 'Montant', 'Total'],
+    },
+    'totals': {                 # Libellés des lignes de totaux (montant en fin de ligne)
+        'total_ht': ['Total HT', 'TOTAL HT', 'Montant HT'],
+        'tva': ['TVA', 'T.V.A.', 'Total TVA'],
+        'total_ttc': ['Total TTC', 'TOTAL TTC', 'Montant TTC', 'Net à payer'],
+    },
+    'row_tolerance': 3,         # Écart vertical (points) entre mots d'une même ligne
+    'amount_tolerance': 0.01,   # Écart toléré sur les montants (arrondis)
+}
+
+# Extraction des données structurées des devis (quote_data.py, /extract/)
+EXTRACTION_CONFIG = {
+    'fields': {                 # Expressions cherchées sur la page 1 (groupe 1 = valeur)
+        'reference': [r"Code Unique du Devis\s*:?\s*(\S+)", r"DEVIS\s*N[°o]\s*:?\s*(\S+)"],
+        'date': [r"Date(?: actuelle| du devis)?\s*:?\s*(\d{2}/\d{2}/\d{4})", r"\b(\d{2}/\d{2}/\d{4})\b"],
+        'client': [r"Client\s*:\s*(.+)", r"(?:M\.|Mme|Mlle|Monsieur|Madame)\s+.+"],
+        'client_code': [r"Code client\s*:?\s*(\S+)"],
+    },
+    'payment_anchor': 'ACOMPTE 30%',   # Ligne précédée du total TTC (comme _process_payments)
+    'max_bulk': 200,                    # Devis par requête /extract/bulk
+}
+
+# Sonde rapide des métadonnées (/pdf-info/, pdf_probe.py)
+PROBE_CONFIG = {
+    'max_files': 500,           # Fichiers par requête
+}
+
+# Réduction des images incorporées (image_optimizer.py)
+IMAGE_OPTIMIZATION_CONFIG = {
+    'target_dpi': 150,      # Résolution effective maximale à la taille d'affichage
+    'max_image_kb': 300,    # Image recompressée au-delà de ce poids, même sous la résolution cible
+    'min_image_kb': 20,     # Images plus légères ignorées
+    'jpeg_quality': 80,
+    'min_gain': 0.1,        # Gain minimal (part du poids) pour remplacer une image
+}
+
+# Contrôle préalable des PDF reçus (preflight.py), avant tout traitement
+PREFLIGHT_CONFIG = {
+    'enabled': True,
+    'max_pages': 500,                # Pages par devis
+    'max_xref_entries': 100000,      # Objets dans la table xref
+    'max_image_pixels': 50_000_000,  # Pixels d'une image (A4 à 600 dpi ≈ 35 millions)
+    'max_stream_mb': 50,             # Taille compressée d'un flux
+    'max_decoded_mb': 256,           # Taille décodée estimée d'un flux...
+    'max_compression_ratio': 200,    # ...refusée si elle dépasse aussi ce taux de compression
+    'max_total_decoded_mb': 1024,    # Taille décodée estimée de toutes les images
+    'reject_repaired': False,        # Refuser (au lieu de signaler) les fichiers réparés à l'ouverture
+}
+
 # Messages et textes personnalisables
 MESSAGES = {
     'processing': 'Nettoyage en cours...',
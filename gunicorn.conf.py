@@ -0,0 +1,42 @@
+"""
+Configuration gunicorn pour la production
+
+Lancement : gunicorn main:app -c gunicorn.conf.py
+
+- Workers uvicorn dimensionnés d'après le nombre de CPU (WEB_CONCURRENCY pour forcer)
+- preload_app : PyMuPDF, le module de traitement et le logo sont chargés une fois
+  dans le maître puis partagés en copie sur écriture par les workers
+- Rechargement sans coupure :
+    kill -HUP <pid maître>   -> nouveaux workers, les anciens terminent leurs requêtes
+    kill -USR2 <pid maître>  -> nouveau maître avec le nouveau code (déploiement),
+                                puis kill -QUIT <ancien pid> une fois le nouveau prêt
+"""
+
+import multiprocessing
+import os
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", max(2, min(cpu_count, 8))))
+
+# Chaque worker web a son propre pool de traitement: répartir les CPU entre eux
+os.environ.setdefault("PDF_POOL_WORKERS", str(max(1, cpu_count // workers)))
+
+preload_app = True
+
+# Un devis volumineux peut prendre du temps: ne pas couper un upload en cours
+timeout = 120
+graceful_timeout = 120
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+forwarded_allow_ips = "*"
+
+
+def on_starting(server):
+    server.log.info(f"Démarrage: {workers} workers, "
+                    f"{os.environ['PDF_POOL_WORKERS']} processus de traitement chacun")
+
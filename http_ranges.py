@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Réponses de téléchargement reprenables: ETag fort, requêtes conditionnelles
+(If-None-Match, If-Range) et plages d'octets (Range), pour qu'un téléchargement
+interrompu reprenne où il s'est arrêté et qu'un fichier déjà reçu ne soit pas renvoyé.
+"""
+
+import os
+import re
+from urllib.parse import quote
+
+from fastapi.responses import Response
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def strong_etag(digest: str) -> str:
+    """ETag fort d'un contenu adressé par son empreinte"""
+    return f'"{digest}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Vérifie un en-tête If-None-Match (liste d'ETags ou *)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # Comparaison faible pour If-None-Match (RFC 9110 §13.1.2)
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def parse_range(header: str, size: int):
+    """
+    Interprète un en-tête Range à une seule plage
+
+    Args:
+        header: Valeur de l'en-tête Range (ex. 'bytes=500-', 'bytes=-200')
+        size: Taille du fichier
+
+    Returns:
+        tuple: (début, fin incluse), ou None si l'en-tête est absent ou
+        illisible (réponse complète)
+
+    Raises:
+        ValueError: Si la plage est hors du fichier (416)
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if match is None:
+        # Plages multiples ou unité inconnue: renvoyer le fichier complet
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffixe: les N derniers octets
+        length = int(end)
+        if length == 0:
+            raise ValueError("Plage vide")
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Plage hors du fichier")
+    return start, end
+
+
+def file_download_response(path: str, etag: str, filename: str, headers: dict,
+                           media_type: str = "application/pdf", max_age: int = 0,
+                           method: str = "GET") -> Response:
+    """
+    Réponse de téléchargement d'un fichier immuable identifié par un ETag fort
+
+    Gère 304 (If-None-Match), 206 (Range, conditionné par If-Range) et 416.
+
+    Args:
+        path: Chemin du fichier
+        etag: ETag fort du contenu
+        filename: Nom proposé au téléchargement
+        headers: En-têtes de la requête
+        media_type: Type MIME du fichier
+        max_age: Durée de mise en cache côté client, en secondes
+        method: 'GET' ou 'HEAD'
+    """
+    size = os.path.getsize(path)
+    response_headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={max(int(max_age), 0)}",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+    }
+
+    if etag_matches(headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+
+    byte_range = None
+    if_range = headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(headers.get("range"), size)
+        except ValueError:
+            response_headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=response_headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    content = b""
+    if method != "HEAD" and size:
+        with open(path, "rb") as f:
+            f.seek(start)
+            content = f.read(end - start + 1)
+
+    response = Response(content=content, status_code=status_code,
+                        media_type=media_type, headers=response_headers)
+    response.headers["Content-Length"] = str(end - start + 1 if size else 0)
+    return response
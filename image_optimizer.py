@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Sous-échantillonnage et recompression des images d'un devis
+Les photos produits sont souvent incorporées en résolution d'impression: toute
+image raster affichée au-delà de la résolution cible (ou trop lourde) est
+réduite puis recompressée en JPEG, en place (même xref, donc toutes ses
+occurrences). Le logo, les masques, les images bitonales et le contenu
+vectoriel ne sont pas touchés.
+"""
+
+import io
+import time
+import logging
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+try:
+    from config import IMAGE_OPTIMIZATION_CONFIG
+except ImportError:
+    IMAGE_OPTIMIZATION_CONFIG = {
+        'target_dpi': 150,
+        'max_image_kb': 300,
+        'min_image_kb': 20,
+        'jpeg_quality': 80,
+        'min_gain': 0.1,
+    }
+
+logger = logging.getLogger(__name__)
+
+# Filtres déjà efficaces pour les images bitonales (scans, plans)
+_BITONAL_FILTERS = ('/JBIG2Decode', '/CCITTFaxDecode')
+
+
+def _display_sizes(doc) -> dict:
+    """Plus grande taille d'affichage (points) de chaque image: {xref: (largeur, hauteur)}"""
+    sizes = {}
+    for page in doc:
+        for info in page.get_image_info(xrefs=True):
+            xref = info['xref']
+            if not xref:
+                continue  # image en ligne (BI ... EI): laissée telle quelle
+            a, b, c, d = info['transform'][:4]
+            width, height = (a * a + b * b) ** 0.5, (c * c + d * d) ** 0.5
+            known = sizes.get(xref, (0.0, 0.0))
+            sizes[xref] = (max(known[0], width), max(known[1], height))
+    return sizes
+
+
+def _is_excluded(doc, xref: int) -> bool:
+    """Masques, images avec transparence et images bitonales"""
+    if doc.xref_get_key(xref, "ImageMask")[1] == "true":
+        return True
+    if doc.xref_get_key(xref, "SMask")[0] != "null" or doc.xref_get_key(xref, "Mask")[0] != "null":
+        return True
+    if any(name in doc.xref_get_key(xref, "Filter")[1] for name in _BITONAL_FILTERS):
+        return True
+    return doc.xref_get_key(xref, "BitsPerComponent")[1] == "1"
+
+
+class ImageOptimizer:
+    """Réduction des images raster d'un document ouvert"""
+
+    def __init__(self, config: dict = None):
+        self.config = config or IMAGE_OPTIMIZATION_CONFIG
+
+    def _recompress(self, pix, scale: float) -> tuple:
+        """JPEG de l'image réduite: (données, largeur, hauteur, espace colorimétrique PDF)"""
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if pix.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        mode, colorspace = ("L", "/DeviceGray") if pix.n == 1 else ("RGB", "/DeviceRGB")
+        image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+        width = max(1, round(pix.width * scale))
+        height = max(1, round(pix.height * scale))
+        if (width, height) != image.size:
+            image = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=self.config['jpeg_quality'], optimize=True)
+        return buffer.getvalue(), width, height, colorspace
+
+    def optimize_image(self, doc, xref: int, display_size: tuple):
+        """
+        Réduit et recompresse une image si elle dépasse la résolution ou le poids cible
+
+        Returns:
+            tuple: (octets avant, octets après), ou None si l'image est laissée telle quelle
+        """
+        before = len(doc.xref_stream_raw(xref))
+        if before < self.config['min_image_kb'] * 1024:
+            return None
+
+        pix = fitz.Pixmap(doc, xref)
+        # Résolution effective à la plus grande taille d'affichage
+        dpi = min(pix.width / max(display_size[0] / 72, 1e-6),
+                  pix.height / max(display_size[1] / 72, 1e-6))
+        scale = min(1.0, self.config['target_dpi'] / dpi)
+        if scale >= 0.95 and before <= self.config['max_image_kb'] * 1024:
+            return None
+
+        data, width, height, colorspace = self._recompress(pix, scale)
+        if len(data) > before * (1 - self.config['min_gain']):
+            return None
+
+        doc.update_stream(xref, data, compress=False)
+        for key, value in (("Filter", "/DCTDecode"), ("Width", str(width)), ("Height", str(height)),
+                           ("ColorSpace", colorspace), ("BitsPerComponent", "8"),
+                           ("DecodeParms", "null"), ("Decode", "null")):
+            doc.xref_set_key(xref, key, value)
+        return before, len(data)
+
+    def optimize_document(self, doc, skip_xrefs=()) -> dict:
+        """
+        Optimise toutes les images affichées du document
+
+        Args:
+            doc: Document PyMuPDF ouvert (modifié en place)
+            skip_xrefs: Images à conserver telles quelles (logo)
+
+        Returns:
+            dict: {'images', 'optimized', 'skipped', 'bytes_before', 'bytes_after',
+                   'bytes_saved', 'duration'}
+        """
+        start = time.perf_counter()
+        report = {'images': 0, 'optimized': 0, 'skipped': 0,
+                  'bytes_before': 0, 'bytes_after': 0, 'bytes_saved': 0}
+
+        for xref, display_size in _display_sizes(doc).items():
+            report['images'] += 1
+            if xref in skip_xrefs or _is_excluded(doc, xref):
+                report['skipped'] += 1
+                continue
+            try:
+                result = self.optimize_image(doc, xref, display_size)
+            except (RuntimeError, ValueError) as e:
+                logger.warning(f"Image {xref} non optimisée: {e}")
+                result = None
+            if result is None:
+                report['skipped'] += 1
+                continue
+            report['optimized'] += 1
+            report['bytes_before'] += result[0]
+            report['bytes_after'] += result[1]
+
+        report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+        report['duration'] = round(time.perf_counter() - start, 3)
+        if report['optimized']:
+            logger.info(f"🖼️ {report['optimized']} images optimisées, "
+                        f"{report['bytes_saved'] / 1024:.0f} Ko gagnés en {report['duration']}s")
+        return report
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Extraction des lignes d'articles d'un devis et vérification des totaux
+Les lignes du tableau (désignation, quantité, prix unitaire, total) sont
+repérées par les colonnes de l'en-tête du tableau et stockées dans un tableau
+NumPy typé; l'arithmétique (quantité × prix unitaire = total de ligne, somme
+des lignes + TVA = TTC) est vérifiée en une seule opération vectorisée.
+"""
+
+import re
+import logging
+
+import numpy as np
+
+try:
+    from config import TABLE_CONFIG
+except ImportError:
+    TABLE_CONFIG = {
+        'columns': {
+            'quantity': ['Qté', 'Quantité', 'Qte', 'Qt'],
+            'unit_price': ['P.U. HT', 'P.U.', 'PU HT', 'Prix unitaire', 'Prix U.'],
+            'total': ['Total HT', 'Montant HT', 'Montant', 'Total'],
+        },
+        'totals': {
+            'total_ht': ['Total HT', 'TOTAL HT', 'Montant HT'],
+            'tva': ['TVA', 'T.V.A.', 'Total TVA'],
+            'total_ttc': ['Total TTC', 'TOTAL TTC', 'Montant TTC', 'Net à payer'],
+        },
+        'row_tolerance': 3,
+        'amount_tolerance': 0.01,
+    }
+
+logger = logging.getLogger(__name__)
+
+# Lignes d'articles: enregistrements compacts, une ligne par article
+ITEM_DTYPE = np.dtype([
+    ('page', np.uint16),
+    ('quantity', np.float64),
+    ('unit_price', np.float64),
+    ('total', np.float64),
+])
+
+_AMOUNT_CHARS_RE = re.compile(r"^[-+]?[\d\s.,]*\d[\d\s.,]*(?:€|EUR)?$")
+
+
+def parse_amount(text: str) -> float:
+    """
+    Montant au format français ('1 234,56 EUR', '1.234,56 €', '12,5') en float
+
+    Raises:
+        ValueError: Si le texte n'est pas un montant
+    """
+    cleaned = (text.replace("\u202f", "").replace("\xa0", "").replace(" ", "")
+               .replace("EUR", "").replace("€", "").strip())
+    if "," in cleaned and "." in cleaned:
+        # '.' séparateur de milliers, ',' décimale
+        cleaned = cleaned.replace(".", "")
+    cleaned = cleaned.replace(",", ".")
+    return float(cleaned)
+
+
+def _is_amount_word(word: str) -> bool:
+    return bool(_AMOUNT_CHARS_RE.match(word)) or word in ("€", "EUR")
+
+
+def _group_rows(words: list, tolerance: float) -> list:
+    """Regroupe les mots d'une page en lignes visuelles (triées de haut en bas, puis x)"""
+    rows = []
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        center = (word[1] + word[3]) / 2
+        if rows and abs(center - rows[-1][0]) <= tolerance:
+            rows[-1][1].append(word)
+        else:
+            rows.append([center, [word]])
+    return [sorted(row_words, key=lambda w: w[0]) for _, row_words in rows]
+
+
+def _find_phrase(row: list, phrase: str):
+    """Étendue horizontale (x0, x1) d'une suite de mots égale à phrase, ou None"""
+    target = phrase.lower().split()
+    texts = [w[4].lower() for w in row]
+    for start in range(len(row) - len(target) + 1):
+        if texts[start:start + len(target)] == target:
+            return row[start][0], row[start + len(target) - 1][2]
+    return None
+
+
+def _starts_with_label(row: list, labels: list):
+    """Nombre de mots du libellé par lequel commence la ligne, ou 0"""
+    texts = [w[4].lower() for w in row]
+    for label in sorted(labels, key=len, reverse=True):
+        target = label.lower().split()
+        if texts[:len(target)] == target:
+            return len(target)
+    return 0
+
+
+def _trailing_amount(row: list):
+    """Dernier montant d'une ligne (mots numériques consécutifs en fin de ligne)"""
+    collected = []
+    for word in reversed(row):
+        if not _is_amount_word(word[4]):
+            break
+        collected.insert(0, word[4])
+    if not collected:
+        return None
+    try:
+        return parse_amount(" ".join(collected))
+    except ValueError:
+        return None
+
+
+class LineItemExtractor:
+    """Extracteur du tableau d'articles (colonnes repérées par l'en-tête)"""
+
+    def __init__(self, config: dict = None):
+        self.config = config or TABLE_CONFIG
+
+    def _header_columns(self, row: list):
+        """Colonnes numériques {nom: (x0, x1)} si la ligne est l'en-tête du tableau"""
+        columns = {}
+        for name, keywords in self.config['columns'].items():
+            for keyword in sorted(keywords, key=len, reverse=True):
+                span = _find_phrase(row, keyword)
+                if span is not None and not any(_overlaps(span, other) for other in columns.values()):
+                    columns[name] = span
+                    break
+        if len(columns) == len(self.config['columns']):
+            return columns
+        return None
+
+    def _parse_item_row(self, row: list, columns: dict):
+        """(désignation, {colonne: montant}) d'une ligne du tableau"""
+        left_limit = min(x0 for x0, _ in columns.values()) - 5
+        centers = {name: (x0 + x1) / 2 for name, (x0, x1) in columns.items()}
+        designation, cells = [], {name: [] for name in columns}
+        for word in row:
+            center = (word[0] + word[2]) / 2
+            if center < left_limit or not _is_amount_word(word[4]):
+                designation.append(word[4])
+            else:
+                nearest = min(centers, key=lambda name: abs(centers[name] - center))
+                cells[nearest].append(word[4])
+
+        values = {}
+        for name, cell_words in cells.items():
+            if cell_words:
+                try:
+                    values[name] = parse_amount(" ".join(cell_words))
+                except ValueError:
+                    pass
+        return " ".join(designation), values
+
+    def extract(self, doc, texts=None) -> dict:
+        """
+        Extrait les lignes d'articles et les totaux d'un document
+
+        Args:
+            texts: TextPageCache partagé du document (optionnel)
+
+        Returns:
+            dict: {'items': tableau ITEM_DTYPE, 'designations': [...],
+                   'totals': {'total_ht', 'tva', 'total_ttc'} (absents si non trouvés)}
+        """
+        records, designations, totals = [], [], {}
+        columns = None
+
+        for page in doc:
+            words = texts.words(page) if texts is not None else page.get_text("words")
+            rows = _group_rows(words, self.config['row_tolerance'])
+            for row in rows:
+                # Totaux en pied de tableau
+                label_words = 0
+                for name, labels in self.config['totals'].items():
+                    label_words = _starts_with_label(row, labels)
+                    if label_words:
+                        amount = _trailing_amount(row[label_words:])
+                        if amount is not None and name not in totals:
+                            totals[name] = amount
+                        break
+                if label_words:
+                    columns = None  # fin du tableau
+                    continue
+
+                header = self._header_columns(row)
+                if header is not None:
+                    columns = header  # en-tête (répété en haut des pages suivantes)
+                    continue
+                if columns is None:
+                    continue
+
+                designation, values = self._parse_item_row(row, columns)
+                if len(values) == len(columns):
+                    records.append((page.number + 1, values['quantity'], values['unit_price'], values['total']))
+                    designations.append(designation)
+                elif designation and not values and records and records[-1][0] == page.number + 1:
+                    # Désignation sur plusieurs lignes
+                    designations[-1] = f"{designations[-1]} {designation}"
+
+        return {
+            'items': np.array(records, dtype=ITEM_DTYPE),
+            'designations': designations,
+            'totals': totals,
+        }
+
+
+def _overlaps(span_a, span_b) -> bool:
+    return span_a[0] < span_b[1] and span_b[0] < span_a[1]
+
+
+def verify_totals(items: np.ndarray, totals: dict, designations: list = None,
+                  tolerance: float = None) -> dict:
+    """
+    Vérifie l'arithmétique du devis en une opération vectorisée
+
+    Args:
+        items: Tableau ITEM_DTYPE
+        totals: Totaux lus sur le devis ('total_ht', 'tva', 'total_ttc')
+        designations: Désignations des lignes (pour le rapport)
+        tolerance: Écart toléré en euros (arrondis)
+
+    Returns:
+        dict: {'ok', 'items', 'sum_lines', totaux lus, 'discrepancies': [...]}
+    """
+    if tolerance is None:
+        tolerance = TABLE_CONFIG['amount_tolerance']
+    designations = designations or [""] * len(items)
+
+    expected = np.round(items['quantity'] * items['unit_price'], 2)
+    line_errors = np.flatnonzero(np.abs(expected - items['total']) > tolerance + 1e-9)
+    sum_lines = round(float(items['total'].sum()), 2)
+
+    discrepancies = [
+        {'type': 'line', 'line': int(i) + 1, 'page': int(items['page'][i]),
+         'designation': designations[i], 'expected': float(expected[i]),
+         'found': float(items['total'][i])}
+        for i in line_errors
+    ]
+
+    total_ht = totals.get('total_ht')
+    if total_ht is not None and len(items) and abs(total_ht - sum_lines) > tolerance:
+        discrepancies.append({'type': 'total_ht', 'expected': sum_lines, 'found': total_ht})
+
+    total_ttc = totals.get('total_ttc')
+    if total_ttc is not None and 'tva' in totals:
+        base = total_ht if total_ht is not None else sum_lines
+        expected_ttc = round(base + totals['tva'], 2)
+        if abs(expected_ttc - total_ttc) > tolerance:
+            discrepancies.append({'type': 'total_ttc', 'expected': expected_ttc, 'found': total_ttc})
+
+    return {
+        'ok': not discrepancies,
+        'items': int(len(items)),
+        'sum_lines': sum_lines,
+        **{name: value for name, value in totals.items()},
+        'discrepancies': discrepancies,
+    }
+
+
+def check_document(doc, extractor: LineItemExtractor = None, texts=None) -> dict:
+    """Extraction puis vérification des totaux d'un document"""
+    extractor = extractor or LineItemExtractor()
+    table = extractor.extract(doc, texts)
+    report = verify_totals(table['items'], table['totals'], table['designations'],
+                           extractor.config['amount_tolerance'])
+    if report['discrepancies']:
+        logger.warning(f"⚠️ {len(report['discrepancies'])} écarts dans les totaux du devis")
+    return report
@@ -1,11 +1,31 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import FileResponse, HTMLResponse, Response
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from typing import List
+import asyncio
 import os
+import json
+import time
 import shutil
 from pathlib import Path
 import uuid
-from pdf_processor_complete import PDFProcessorComplete  # Nouveau module complet
+import preload  # PyMuPDF et logo chargés avant le fork des workers (gunicorn --preload)
+from pdf_processor_complete import process_pdf_job  # Nouveau module complet
+from processing_pool import JobTimeoutError, ProcessingPool
+from admission import AdmissionController, AdmissionSlot
+from singleflight import FlightLocks, SingleFlight, flight_key
+from upload_sessions import UploadOffsetError, UploadSessions
+from result_store import ResultStore, sha256_bytes
+from http_ranges import etag_matches, file_download_response, strong_etag
+from pdf_preview import IMAGE_FORMATS, PreviewCache, render_page
+from pdf_cleaner import PDFCleaner
+from pdf_probe import probe_many
+from preflight import preflight_pdf, summarize
+from quote_data import EXTRACTION_VERSION, extract_quote_file, extract_quote_files
+from config import (PROCESSING_CONFIG, RESULTS_CONFIG, PREVIEW_CONFIG, PROBE_CONFIG, EXTRACTION_CONFIG,
+                    PREFLIGHT_CONFIG, UPLOAD_CONFIG)
 
 app = FastAPI(title="PDF Devis Modifier", description="Application pour modifier automatiquement les devis PDF")
 
@@ -42,6 +62,135 @@ def cleanup_old_files():
 # Nettoyer les anciens fichiers au démarrage
 cleanup_old_files()
 
+# Pool de processus de traitement (mesure mémoire et recyclage par job)
+processing_pool = ProcessingPool(
+    num_workers=PROCESSING_CONFIG['pool_workers'],
+    max_jobs_per_worker=PROCESSING_CONFIG['max_jobs_per_worker'],
+    memory_limit_mb=PROCESSING_CONFIG['worker_memory_limit_mb'],
+    job_timeout=PROCESSING_CONFIG['job_timeout']
+)
+
+# Admission des traitements: au plus un par processus du pool, plus une file bornée
+admission = AdmissionController(
+    max_active=PROCESSING_CONFIG['pool_workers'],
+    max_queued=PROCESSING_CONFIG['max_queued_jobs']
+)
+
+# Envois identiques simultanés (même devis, mêmes options): un seul traitement,
+# partagé dans le worker puis, par verrou sur fichier, entre les workers
+upload_flight = SingleFlight()
+flight_locks = FlightLocks(os.path.join(RESULTS_CONFIG['storage_dir'], "flights"))
+
+# Téléversements par morceaux, et traitements lancés à la réception du dernier morceau
+upload_sessions = UploadSessions(
+    UPLOAD_CONFIG['sessions_dir'],
+    max_size=UPLOAD_CONFIG['max_size'],
+    ttl=UPLOAD_CONFIG['ttl']
+)
+_upload_jobs = {}
+
+# Résultats stockés par empreinte, et cache des aperçus rendus
+result_store = ResultStore(
+    RESULTS_CONFIG['storage_dir'],
+    ttl=RESULTS_CONFIG['ttl'],
+    kind_ttls={'quarantine': PROCESSING_CONFIG['quarantine_ttl']}
+)
+preview_cache = PreviewCache(max_bytes=PREVIEW_CONFIG['cache_max_mb'] * 1024 * 1024)
+
+def _is_quarantined(source_id: str) -> bool:
+    """Devis dont un traitement a déjà dépassé le budget de temps"""
+    return result_store.path("quarantine", source_id) is not None
+
+def _quarantine(source_id: str, filename: str, error: JobTimeoutError):
+    """Enregistre l'empreinte d'un devis trop long: les envois suivants sont refusés d'emblée"""
+    record = {'filename': filename, 'error': str(error), 'time': time.time()}
+    result_store.put("quarantine", json.dumps(record, ensure_ascii=False).encode("utf-8"), digest=source_id)
+    print(f"🚫 Devis mis en quarantaine: {filename} ({source_id[:12]})")
+
+def _quarantined_error(source_id: str) -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=f"Ce document a déjà dépassé le budget de traitement ({PROCESSING_CONFIG['job_timeout']} s) "
+               f"et est refusé (empreinte {source_id})"
+    )
+
+def _record_processed(key: str, processed: dict):
+    """Associe empreinte et options (flight_key) au résultat, pour /upload-pdf/by-hash"""
+    record = {name: processed[name] for name in ('result_id', 'report', 'preflight')}
+    result_store.put("processed", json.dumps(record, ensure_ascii=False, default=str).encode("utf-8"), digest=key)
+
+def _known_result(source_id: str, options: dict):
+    """
+    Résultat déjà calculé pour ce devis et ces options
+
+    Returns:
+        dict: Comme _process_upload, ou None si inconnu ou expiré
+    """
+    data = result_store.get("processed", flight_key(source_id, options))
+    if data is None:
+        return None
+    record = json.loads(data)
+    pdf_content = result_store.get("results", record['result_id'])
+    if pdf_content is None:
+        return None
+    return {**record, 'pdf_content': pdf_content, 'source_id': source_id, 'coalesced': False}
+
+async def _preflight(pdf_path: str) -> dict:
+    """
+    Contrôle préalable d'un PDF reçu (quelques ms, aucun flux décodé)
+
+    Raises:
+        HTTPException: 422 si le document est refusé
+    """
+    if not PREFLIGHT_CONFIG['enabled']:
+        return {'ok': True, 'flags': []}
+    report = await run_in_threadpool(preflight_pdf, pdf_path)
+    if not report['ok']:
+        raise HTTPException(status_code=422, detail=f"Document refusé: {summarize(report)}")
+    return report
+
+def _preflight_headers(report: dict) -> dict:
+    flags = sorted({issue['check'] for issue in report['flags']})
+    return {"X-Preflight-Flags": ",".join(flags)} if flags else {}
+
+def _totals_headers(totals_check: dict, max_length: int = 4000) -> dict:
+    """
+    Résultat de la vérification des totaux en en-têtes
+
+    X-Totals-Discrepancies reste un JSON valide: au-delà de max_length
+    caractères, seuls les premiers écarts (totaux d'abord, puis lignes) y
+    figurent; X-Totals-Discrepancies-Count donne leur nombre total.
+    """
+    if not totals_check['items']:
+        headers = {"X-Totals-Check": "absent"}
+    else:
+        headers = {"X-Totals-Check": "ok" if totals_check['ok'] else "ecarts"}
+    discrepancies = totals_check['discrepancies']
+    if not discrepancies:
+        return headers
+    
+    ordered = sorted(discrepancies, key=lambda item: item['type'] == 'line')
+    parts, length = [], 2
+    for item in ordered:
+        part = json.dumps(item, ensure_ascii=True, separators=(",", ":"))
+        if length + len(part) + bool(parts) > max_length:
+            break
+        parts.append(part)
+        length += len(part) + (len(parts) > 1)
+    headers["X-Totals-Discrepancies"] = "[" + ",".join(parts) + "]"
+    headers["X-Totals-Discrepancies-Count"] = str(len(discrepancies))
+    return headers
+
+@app.on_event("startup")
+async def start_processing_pool():
+    """Démarre les processus de traitement (après le fork des workers web)"""
+    await run_in_threadpool(processing_pool.start)
+
+@app.on_event("shutdown")
+async def stop_processing_pool():
+    """Arrête les processus de traitement"""
+    await run_in_threadpool(processing_pool.shutdown)
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """Page d'accueil avec interface de téléchargement"""
@@ -248,6 +397,20 @@ async def read_root():
                 background: #2563eb;
             }
             
+            button.download-link {
+                border: none;
+                cursor: pointer;
+            }
+            
+            .preview {
+                display: block;
+                width: 100%;
+                margin-top: 12px;
+                border: 1px solid #e2e8f0;
+                border-radius: 6px;
+                background: white;
+            }
+            
             .loading {
                 display: none;
                 text-align: center;
@@ -308,7 +471,7 @@ async def read_root():
             
             <div id="loading" class="loading">
                 <div class="spinner"></div>
-                <p>Traitement en cours...</p>
+                <p id="loadingText">Traitement en cours...</p>
             </div>
             
             <div id="result" class="result"></div>
@@ -321,6 +484,7 @@ async def read_root():
             const processButton = document.getElementById('processButton');
             const form = document.getElementById('uploadForm');
             const loading = document.getElementById('loading');
+            const loadingText = document.getElementById('loadingText');
             const result = document.getElementById('result');
 
             let isProcessing = false; // Protection contre les soumissions multiples
@@ -378,56 +542,50 @@ async def read_root():
                 }
                 
                 isProcessing = true;
-                const formData = new FormData();
-                formData.append('file', file);
                 
                 // Afficher le loading
+                loadingText.textContent = 'Envoi en cours...';
                 loading.style.display = 'block';
                 result.style.display = 'none';
                 processButton.disabled = true;
                 
                 try {
-                    const response = await fetch('/upload-pdf/', {
-                        method: 'POST',
-                        body: formData
-                    });
+                    const response = await sendFile(file);
                     
                     if (response.ok) {
                         // Le serveur retourne directement le fichier PDF
                         const blob = await response.blob();
+                        const resultId = response.headers.get('X-Result-Id');
                         
                         // Créer un nom de fichier propre
                         const cleanFilename = file.name.replace('.pdf', '_traité.pdf');
                         
-                        // Méthode plus robuste pour le téléchargement
-                        if (window.navigator && window.navigator.msSaveOrOpenBlob) {
-                            // Pour Internet Explorer
-                            window.navigator.msSaveOrOpenBlob(blob, cleanFilename);
+                        // Afficher l'aperçu de la première page avant le téléchargement
+                        showResult("✅ Document traité avec succès ! Vérifiez l'aperçu puis téléchargez-le.", 'success');
+                        if (resultId) {
+                            const preview = document.createElement('img');
+                            preview.className = 'preview';
+                            preview.alt = 'Aperçu de la première page';
+                            preview.src = `/preview/${resultId}?page=1&dpi=60`;
+                            result.appendChild(preview);
+                        }
+                        const downloadUrl = response.headers.get('X-Download-Url');
+                        if (downloadUrl) {
+                            // Lien reprenable servi par le serveur (ETag, Range)
+                            const downloadLink = document.createElement('a');
+                            downloadLink.className = 'download-link';
+                            downloadLink.href = downloadUrl;
+                            downloadLink.download = cleanFilename;
+                            downloadLink.textContent = 'Télécharger le PDF';
+                            result.appendChild(downloadLink);
                         } else {
-                            // Pour les autres navigateurs
-                            const url = window.URL.createObjectURL(blob);
-                            const a = document.createElement('a');
-                            a.href = url;
-                            a.download = cleanFilename;
-                            a.style.display = 'none';
-                            
-                            // Ajouter au DOM, cliquer, puis supprimer
-                            document.body.appendChild(a);
-                            
-                            // Forcer le téléchargement avec un délai
-                            setTimeout(() => {
-                                a.click();
-                                
-                                // Nettoyer après un délai
-                                setTimeout(() => {
-                                    document.body.removeChild(a);
-                                    window.URL.revokeObjectURL(url);
-                                }, 100);
-                            }, 100);
+                            const downloadButton = document.createElement('button');
+                            downloadButton.className = 'download-link';
+                            downloadButton.textContent = 'Télécharger le PDF';
+                            downloadButton.addEventListener('click', () => downloadBlob(blob, cleanFilename));
+                            result.appendChild(downloadButton);
                         }
                         
-                        showResult('✅ Document traité et téléchargé avec succès !', 'success');
-                        
                         // Réinitialiser le formulaire après succès
                         fileInput.value = '';
                         selectedFileDiv.style.display = 'none';
@@ -445,6 +603,142 @@ async def read_root():
                 }
             });
             
+            // Téléversement reprenable par morceaux: après une coupure, l'envoi
+            // reprend au décalage reçu par le serveur (même après rechargement de la page)
+            const MAX_RETRIES = 8;
+            
+            function sleep(ms) {
+                return new Promise(resolve => setTimeout(resolve, ms));
+            }
+            
+            async function withRetries(action) {
+                for (let attempt = 0; ; attempt++) {
+                    try {
+                        return await action();
+                    } catch (error) {
+                        // Seules les coupures réseau sont réessayées
+                        if (error.response || attempt >= MAX_RETRIES) throw error;
+                        loadingText.textContent = 'Connexion interrompue, nouvelle tentative...';
+                        await sleep(Math.min(30000, 1000 * 2 ** attempt));
+                    }
+                }
+            }
+            
+            // Empreinte calculée dans le navigateur: un fichier déjà connu du
+            // serveur n'est pas renvoyé (crypto.subtle: HTTPS ou localhost)
+            async function sha256Hex(file) {
+                if (!window.crypto || !window.crypto.subtle) return null;
+                const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+                return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+            }
+            
+            async function sendFile(file) {
+                loadingText.textContent = 'Vérification du fichier...';
+                const sha256 = await sha256Hex(file).catch(() => null);
+                if (sha256) {
+                    const formData = new FormData();
+                    formData.append('sha256', sha256);
+                    formData.append('filename', file.name);
+                    try {
+                        const response = await fetch('/upload-pdf/by-hash', { method: 'POST', body: formData });
+                        if (response.status !== 404) return response;
+                    } catch (error) {
+                        // Coupure: l'envoi par morceaux réessaiera
+                    }
+                }
+                return uploadInChunks(file, sha256);
+            }
+            
+            async function openUpload(file, storageKey, sha256) {
+                const savedId = localStorage.getItem(storageKey);
+                if (savedId) {
+                    const response = await fetch(`/uploads/${savedId}`);
+                    if (response.ok) return response.json();
+                    localStorage.removeItem(storageKey);
+                }
+                const formData = new FormData();
+                formData.append('filename', file.name);
+                formData.append('size', file.size);
+                if (sha256) formData.append('sha256', sha256);
+                const response = await fetch('/uploads/', { method: 'POST', body: formData });
+                if (!response.ok) {
+                    const error = new Error(`HTTP ${response.status}`);
+                    error.response = response;
+                    throw error;
+                }
+                const upload = await response.json();
+                localStorage.setItem(storageKey, upload.upload_id);
+                return upload;
+            }
+            
+            async function uploadInChunks(file, sha256) {
+                const storageKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+                let upload;
+                try {
+                    upload = await withRetries(() => openUpload(file, storageKey, sha256));
+                } catch (error) {
+                    if (error.response) return error.response;
+                    throw error;
+                }
+                const chunkSize = upload.chunk_size;
+                let offset = upload.offset;
+                
+                while (offset < file.size) {
+                    loadingText.textContent = `Envoi en cours... ${Math.floor(100 * offset / file.size)} %`;
+                    const response = await withRetries(async () => {
+                        try {
+                            return await fetch(`/uploads/${upload.upload_id}?offset=${offset}`, {
+                                method: 'PUT',
+                                body: file.slice(offset, offset + chunkSize)
+                            });
+                        } catch (error) {
+                            // Coupure: reprendre au décalage réellement reçu
+                            const status = await fetch(`/uploads/${upload.upload_id}`);
+                            if (status.ok) offset = (await status.json()).offset;
+                            throw error;
+                        }
+                    });
+                    if (!response.ok && response.status !== 409) {
+                        localStorage.removeItem(storageKey);
+                        return response;
+                    }
+                    offset = parseInt(response.headers.get('Upload-Offset'), 10);
+                }
+                
+                loadingText.textContent = 'Traitement en cours...';
+                const response = await withRetries(() => fetch(`/uploads/${upload.upload_id}/complete`, {
+                    method: 'POST'
+                }));
+                if (response.status !== 503) localStorage.removeItem(storageKey);
+                return response;
+            }
+            
+            function downloadBlob(blob, filename) {
+                // Méthode plus robuste pour le téléchargement
+                if (window.navigator && window.navigator.msSaveOrOpenBlob) {
+                    // Pour Internet Explorer
+                    window.navigator.msSaveOrOpenBlob(blob, filename);
+                    return;
+                }
+                
+                // Pour les autres navigateurs
+                const url = window.URL.createObjectURL(blob);
+                const a = document.createElement('a');
+                a.href = url;
+                a.download = filename;
+                a.style.display = 'none';
+                
+                // Ajouter au DOM, cliquer, puis supprimer
+                document.body.appendChild(a);
+                a.click();
+                
+                // Nettoyer après un délai
+                setTimeout(() => {
+                    document.body.removeChild(a);
+                    window.URL.revokeObjectURL(url);
+                }, 100);
+            }
+            
             function showResult(message, type) {
                 result.innerHTML = message;
                 result.className = `result ${type}`;
@@ -456,19 +750,328 @@ async def read_root():
     """
     return HTMLResponse(content=html_content)
 
+def _admit() -> AdmissionSlot:
+    """Refuser tout de suite quand le pool et sa file sont pleins (503, Retry-After)"""
+    if not admission.try_acquire():
+        retry_after = admission.retry_after()
+        print(f"⏳ Serveur saturé, requête refusée (réessayer dans {retry_after}s)")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Serveur occupé, réessayez dans {retry_after} secondes",
+            headers={"Retry-After": str(retry_after)}
+        )
+    return AdmissionSlot(admission)
+
+def _check_pdf_filename(filename: str):
+    """Vérifier que c'est un fichier PDF"""
+    if not (filename or "").lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Le fichier doit être un PDF")
+
 @app.post("/upload-pdf/")
 async def upload_pdf(file: UploadFile = File(...)):
     """Endpoint pour télécharger et modifier un PDF"""
     
-    print(f"🔧 Début du traitement: {file.filename}")
+    slot = _admit()
+    try:
+        _check_pdf_filename(file.filename)
+        content = await file.read()
+        processed = await _process_upload(file.filename, content, slot)
+    finally:
+        slot.release()
+    return _upload_response(file.filename, processed)
+
+@app.post("/upload-pdf/by-hash")
+async def upload_pdf_by_hash(sha256: str = Form(...), filename: str = Form(...)):
+    """
+    Négociation par empreinte avant l'envoi: si le devis (ou son résultat pour
+    les options courantes) est déjà connu, le PDF modifié est retourné sans
+    transférer le fichier; sinon 404, et le client l'envoie normalement
+    """
+    _check_pdf_filename(filename)
+    source_id = sha256.lower()
+    if not ResultStore.is_valid_digest(source_id):
+        raise HTTPException(status_code=400, detail="Empreinte SHA-256 invalide")
+    if _is_quarantined(source_id):
+        raise _quarantined_error(source_id)
     
-    # Vérifier que c'est un fichier PDF
-    if not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Le fichier doit être un PDF")
+    processed = await run_in_threadpool(_known_result, source_id, _upload_options())
+    if processed is None:
+        content = await run_in_threadpool(result_store.get, "sources", source_id)
+        if content is None:
+            raise HTTPException(status_code=404, detail="Document inconnu: envoyer le fichier")
+        slot = _admit()
+        try:
+            processed = await _process_upload(filename, content, slot)
+        finally:
+            slot.release()
+    print(f"♻️ Envoi évité: {filename} ({source_id[:12]}) déjà connu")
+    return _upload_response(filename, processed, extra_headers={"X-Transfer-Skipped": "1"})
+
+@app.post("/uploads/")
+async def create_upload(filename: str = Form(...), size: int = Form(...), sha256: str = Form(None)):
+    """
+    Ouvre un téléversement reprenable: envoyer ensuite les morceaux
+    (PUT /uploads/{id}?offset=...), puis finaliser (POST /uploads/{id}/complete)
+    """
+    _check_pdf_filename(filename)
+    if sha256 is not None and not ResultStore.is_valid_digest(sha256.lower()):
+        raise HTTPException(status_code=400, detail="Empreinte SHA-256 invalide")
+    try:
+        session = await run_in_threadpool(upload_sessions.create, filename, size, sha256)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    print(f"📦 Téléversement par morceaux ouvert: {filename} ({size} bytes)")
+    return _upload_status(session, chunk_size=UPLOAD_CONFIG['chunk_size'])
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Décalage reçu d'un téléversement (reprise après une coupure)"""
+    session = await run_in_threadpool(upload_sessions.status, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Téléversement inconnu ou expiré")
+    return _upload_status(session, chunk_size=UPLOAD_CONFIG['chunk_size'])
+
+@app.put("/uploads/{upload_id}")
+async def put_upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Morceau du fichier à partir de offset; le dernier lance le traitement"""
+    data = await _read_chunk(request, UPLOAD_CONFIG['max_chunk_size'])
+    try:
+        session = await run_in_threadpool(upload_sessions.append, upload_id, offset, data)
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.offset)})
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if session is None:
+        raise HTTPException(status_code=404, detail="Téléversement inconnu ou expiré")
+    
+    processing = False
+    if session['complete']:
+        # Traitement lancé dès le dernier morceau reçu; la finalisation l'attend
+        try:
+            _start_upload_job(upload_id, session['filename'])
+            processing = True
+        except HTTPException:
+            pass  # Pool saturé: la finalisation réessaiera
+    return _upload_status(session, processing=processing)
+
+@app.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str):
+    """Finalise un téléversement: attend son traitement et retourne le PDF modifié"""
+    session = await run_in_threadpool(upload_sessions.status, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Téléversement inconnu ou expiré")
+    if not session['complete']:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Téléversement incomplet: {session['offset']}/{session['size']} octets",
+            headers={"Upload-Offset": str(session['offset'])}
+        )
+    
+    job = _start_upload_job(upload_id, session['filename'])
+    try:
+        # Une déconnexion du client n'interrompt pas le traitement: une nouvelle
+        # finalisation retrouve le même
+        processed = await asyncio.shield(job)
+    except Exception:
+        if _upload_jobs.get(upload_id) is job:
+            del _upload_jobs[upload_id]
+        raise
+    _upload_jobs.pop(upload_id, None)
+    upload_sessions.discard(upload_id)
+    return _upload_response(session['filename'], processed)
+
+async def _read_chunk(request: Request, max_size: int) -> bytes:
+    """
+    Corps d'un morceau, lu au fil de l'eau: jamais plus de max_size octets en mémoire
+
+    Raises:
+        HTTPException: 413 dès que le morceau (annoncé ou reçu) dépasse max_size
+    """
+    too_large = HTTPException(status_code=413, detail=f"Morceau trop volumineux (maximum {max_size} octets)")
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Content-Length invalide")
+        if declared > max_size:
+            raise too_large
+    
+    parts, received = [], 0
+    async for part in request.stream():
+        received += len(part)
+        if received > max_size:
+            raise too_large
+        parts.append(part)
+    return b"".join(parts)
+
+def _upload_status(session: dict, **extra) -> JSONResponse:
+    """État d'un téléversement, décalage reçu aussi en en-tête Upload-Offset"""
+    return JSONResponse(
+        {
+            'upload_id': session['upload_id'],
+            'filename': session['filename'],
+            'size': session['size'],
+            'offset': session['offset'],
+            'complete': session['offset'] == session['size'],
+            **extra
+        },
+        headers={"Upload-Offset": str(session['offset']), "Cache-Control": "no-store"}
+    )
+
+def _start_upload_job(upload_id: str, filename: str) -> asyncio.Task:
+    """Traitement d'un téléversement complet, lancé une seule fois (admission comprise)"""
+    job = _upload_jobs.get(upload_id)
+    if job is not None:
+        return job
+    # Oublier les traitements terminés dont la session a expiré sans finalisation
+    for stale_id, stale_job in list(_upload_jobs.items()):
+        if stale_job.done() and upload_sessions.status(stale_id) is None:
+            del _upload_jobs[stale_id]
+    
+    slot = _admit()
+    job = asyncio.ensure_future(_process_chunked_upload(upload_id, filename, slot))
+    job.add_done_callback(lambda done: done.cancelled() or done.exception())
+    _upload_jobs[upload_id] = job
+    return job
+
+async def _process_chunked_upload(upload_id: str, filename: str, slot: AdmissionSlot) -> dict:
+    """Traitement d'un téléversement par morceaux admis (voir _start_upload_job)"""
+    try:
+        try:
+            content = await run_in_threadpool(upload_sessions.read, upload_id)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if content is None:
+            raise HTTPException(status_code=404, detail="Téléversement inconnu ou expiré")
+        return await _process_upload(filename, content, slot)
+    finally:
+        slot.release()
+
+def _upload_options() -> dict:
+    """Options de traitement des devis téléversés (clé de partage avec l'empreinte)"""
+    return {
+        'auto_zones': PROCESSING_CONFIG['auto_zones'],
+        'use_templates': PROCESSING_CONFIG['use_templates'],
+        'verify_totals': PROCESSING_CONFIG['verify_totals'],
+        'linearize': PROCESSING_CONFIG['linearize'],
+        'optimize_images': PROCESSING_CONFIG['optimize_images'],
+        'parallel_threshold': PROCESSING_CONFIG['parallel_threshold'],
+        'max_workers': PROCESSING_CONFIG['parallel_workers'],
+    }
+
+async def _process_upload(filename: str, content: bytes, slot: AdmissionSlot) -> dict:
+    """
+    Traitement d'un devis admis (voir upload_pdf et complete_upload)
+    
+    Args:
+        slot: Place d'admission de la requête, marquée quand son traitement atteint le pool
+    
+    Returns:
+        dict: Calcul partagé (voir _process_source) avec 'source_id' et 'coalesced'
+    """
     
+    print(f"🔧 Début du traitement: {filename}")
+    print(f"💾 Fichier reçu: {len(content)} bytes")
+    
+    # Conserver la source par empreinte (extraction JSON ultérieure, /extract/)
+    source_id = result_store.put("sources", content)
+    if _is_quarantined(source_id):
+        raise _quarantined_error(source_id)
+    
+    # Un seul traitement pour les envois identiques simultanés: les suivants l'attendent
+    options = _upload_options()
+    (processed, shared), coalesced = await upload_flight.run(
+        flight_key(source_id, options),
+        lambda: _process_once(source_id, content, filename, options, slot)
+    )
+    coalesced = coalesced or shared
+    if coalesced:
+        print(f"🔗 Envoi identique en cours: résultat partagé {processed['result_id'][:12]}")
+    return {**processed, 'source_id': source_id, 'coalesced': coalesced}
+
+async def _process_once(source_id: str, content: bytes, filename: str, options: dict,
+                        slot: AdmissionSlot) -> tuple:
+    """
+    Traitement d'un devis sous le verrou de sa clé, commun à tous les workers web
+    
+    Returns:
+        tuple: (calcul, partagé) — partagé vaut True si le résultat est celui
+               d'un autre worker, attendu puis relu via l'enregistrement "processed"
+    """
+    key = flight_key(source_id, options)
+    lock, waited = await flight_locks.acquire(key)
+    try:
+        if waited:
+            processed = await run_in_threadpool(_known_result, source_id, options)
+            if processed is not None:
+                return processed, True
+            # Traitement de l'autre worker en échec: refaire les mêmes contrôles
+            if _is_quarantined(source_id):
+                raise _quarantined_error(source_id)
+        return await _process_source(source_id, content, filename, options, slot), False
+    finally:
+        flight_locks.release(key, lock)
+
+def _upload_response(filename: str, processed: dict, extra_headers: dict = None) -> Response:
+    """PDF modifié et en-têtes du traitement, avec un jeton de téléchargement propre à la requête"""
+    report = processed['report']
+    result_id = processed['result_id']
+    
+    # Nom de fichier propre pour le téléchargement
+    clean_filename = filename.replace('.pdf', '_traité.pdf')
+    download_token = result_store.issue_token(
+        "results", result_id, clean_filename, ttl=RESULTS_CONFIG['download_ttl']
+    )
+    
+    print(f"📤 Envoi du fichier: {clean_filename}")
+    
+    # Vérification des lignes et totaux du devis
+    totals_headers = {}
+    totals_check = report.get('totals_check')
+    if totals_check is not None:
+        totals_headers = _totals_headers(totals_check)
+    
+    # Images réduites: octets gagnés et temps passé
+    images_headers = {}
+    images = report.get('images')
+    if images is not None:
+        images_headers["X-Images-Optimized"] = str(images['optimized'])
+        images_headers["X-Images-Bytes-Saved"] = str(images['bytes_saved'])
+    
+    # Retourner le contenu depuis la mémoire
+    return Response(
+        content=processed['pdf_content'],
+        media_type='application/pdf',
+        headers={
+            "Content-Disposition": f"attachment; filename={clean_filename}",
+            "Cache-Control": "no-cache, no-store, must-revalidate",
+            "Pragma": "no-cache",
+            "Expires": "0",
+            "X-Result-Id": result_id,
+            "X-Source-Id": processed['source_id'],
+            "X-Download-Url": f"/download/{download_token}",
+            "X-Coalesced": "1" if processed['coalesced'] else "0",
+            "X-Template": report.get('template') or "inconnu",
+            "X-Template-Fingerprint": report.get('template_fingerprint') or "",
+            **_preflight_headers(processed['preflight']),
+            **images_headers,
+            **totals_headers,
+            **(extra_headers or {})
+        }
+    )
+
+async def _process_source(source_id: str, content: bytes, filename: str, options: dict,
+                          slot: AdmissionSlot) -> dict:
+    """
+    Contrôle et modification d'un devis dans le pool (calcul partagé, voir _process_upload)
+    
+    Returns:
+        dict: {'result_id', 'pdf_content', 'report', 'preflight'}
+    """
     # Générer un nom unique pour le fichier
     file_id = str(uuid.uuid4())
-    input_filename = f"{file_id}_{file.filename}"
+    input_filename = f"{file_id}_{filename}"
     output_filename = f"temp_{file_id}.pdf"  # Nom temporaire plus simple
     
     input_path = os.path.join("uploads", input_filename)
@@ -479,15 +1082,23 @@ async def upload_pdf(file: UploadFile = File(...)):
     try:
         # Sauvegarder le fichier téléchargé
         with open(input_path, "wb") as buffer:
-            content = await file.read()
             buffer.write(content)
         
-        print(f"💾 Fichier sauvegardé: {len(content)} bytes")
+        # Écarter les fichiers pathologiques avant le pool
+        preflight = await _preflight(input_path)
         
-        # Modifier le PDF
-        modifier = PDFProcessorComplete()
+        # Modifier le PDF dans un processus du pool (tué au-delà du budget de temps)
         print("🔧 Début du traitement PDF...")
-        success = modifier.process_pdf(input_path, output_path)
+        slot.mark_reached_pool()
+        try:
+            (success, report), metrics = await run_in_threadpool(
+                processing_pool.run, process_pdf_job, input_path, output_path, **options
+            )
+        except JobTimeoutError as e:
+            _quarantine(source_id, filename, e)
+            raise HTTPException(status_code=504, detail=str(e))
+        print(f"📊 Mesures: {metrics['duration']}s, pic RSS {metrics['peak_rss_mb']} Mo, "
+              f"store MuPDF {metrics['mupdf_store_mb']} Mo")
         
         if not success:
             print("❌ Échec du traitement PDF")
@@ -496,8 +1107,7 @@ async def upload_pdf(file: UploadFile = File(...)):
         print("✅ Traitement PDF terminé")
         
         # Vérifier que le fichier de sortie existe bien
-        import time
-        time.sleep(0.2)  # Réduire le délai à 200ms
+        await asyncio.sleep(0.2)  # Réduire le délai à 200ms
         
         if not os.path.exists(output_path):
             print(f"❌ Fichier de sortie non trouvé: {output_path}")
@@ -509,6 +1119,12 @@ async def upload_pdf(file: UploadFile = File(...)):
         
         print(f"📖 Fichier lu en mémoire: {len(pdf_content)} bytes")
         
+        # Conserver le résultat pour les aperçus et les téléchargements reprenables
+        result_id = result_store.put("results", pdf_content)
+        processed = {'result_id': result_id, 'pdf_content': pdf_content,
+                     'report': report, 'preflight': preflight}
+        _record_processed(flight_key(source_id, options), processed)
+        
         # Nettoyer immédiatement les fichiers temporaires
         if os.path.exists(input_path):
             os.remove(input_path)
@@ -517,21 +1133,12 @@ async def upload_pdf(file: UploadFile = File(...)):
             os.remove(output_path)
             print(f"🗑️ Fichier de sortie supprimé: {output_path}")
         
-        # Nom de fichier propre pour le téléchargement
-        clean_filename = file.filename.replace('.pdf', '_traité.pdf')
-        print(f"📤 Envoi du fichier: {clean_filename}")
+        images = report.get('images')
+        if images is not None:
+            print(f"🖼️ Images: {images['optimized']}/{images['images']} réduites, "
+                  f"{images['bytes_saved']} octets gagnés en {images['duration']}s")
         
-        # Retourner le contenu depuis la mémoire
-        return Response(
-            content=pdf_content,
-            media_type='application/pdf',
-            headers={
-                "Content-Disposition": f"attachment; filename={clean_filename}",
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                "Pragma": "no-cache",
-                "Expires": "0"
-            }
-        )
+        return processed
         
     except Exception as e:
         print(f"❌ Erreur lors du traitement: {str(e)}")
@@ -540,36 +1147,254 @@ async def upload_pdf(file: UploadFile = File(...)):
             os.remove(input_path)
         if os.path.exists(output_path):
             os.remove(output_path)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=f"Erreur lors du traitement: {str(e)}")
 
-@app.get("/download/{filename}")
-async def download_file(filename: str):
-    """Endpoint pour télécharger un fichier modifié"""
-    file_path = os.path.join("output", filename)
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Fichier non trouvé")
-    
-    # Nom de fichier plus propre pour le téléchargement
-    clean_filename = filename
-    if filename.startswith("modified_"):
-        # Enlever le préfixe "modified_" et l'UUID
-        parts = filename.split("_", 2)  # Split en 3 parties max
-        if len(parts) >= 3:
-            clean_filename = f"traité_{parts[2]}"
+@app.get("/preview/{result_id}")
+async def preview_result(
+    result_id: str,
+    page: int = 1,
+    dpi: int = PREVIEW_CONFIG['default_dpi'],
+    fmt: str = Query("png", alias="format"),
+    clip: str = None
+):
+    """Aperçu d'une page d'un devis traité (PNG ou WebP)"""
+    fmt = fmt.lower()
+    if fmt not in IMAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format non supporté: {fmt}")
+    if not 1 <= dpi <= PREVIEW_CONFIG['max_dpi']:
+        raise HTTPException(status_code=400, detail=f"DPI entre 1 et {PREVIEW_CONFIG['max_dpi']}")
+    
+    clip_rect = None
+    if clip:
+        try:
+            clip_rect = tuple(float(v) for v in clip.split(","))
+        except ValueError:
+            clip_rect = ()
+        if len(clip_rect) != 4:
+            raise HTTPException(status_code=400, detail="clip doit être de la forme x0,y0,x1,y1")
+    
+    # Résultat expiré ou supprimé: plus d'aperçu, même encore en cache
+    pdf_path = result_store.path("results", result_id)
+    if pdf_path is None:
+        raise HTTPException(status_code=404, detail="Résultat introuvable ou expiré")
+    
+    key = (result_id, page, dpi, fmt, clip_rect)
+    image = preview_cache.get(key)
+    if image is None:
+        try:
+            image = await run_in_threadpool(
+                render_page, pdf_path, page, dpi, fmt, clip_rect, PREVIEW_CONFIG['max_pixels']
+            )
+        except IndexError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        preview_cache.put(key, image)
+    
+    return Response(
+        content=image,
+        media_type=IMAGE_FORMATS[fmt],
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+@app.post("/preview-zones/")
+async def preview_zones(
+    file: UploadFile = File(...),
+    zones: str = Form(None),
+    dpi: int = Form(36),
+    fmt: str = Form("png", alias="format")
+):
+    """Aperçu image des zones de nettoyage (page 1 + pied de page) pour calibrer zones_to_clean"""
+    fmt = fmt.lower()
+    if fmt not in IMAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format non supporté: {fmt}")
+    if not 1 <= dpi <= PREVIEW_CONFIG['max_dpi']:
+        raise HTTPException(status_code=400, detail=f"DPI entre 1 et {PREVIEW_CONFIG['max_dpi']}")
+    
+    custom_zones = None
+    if zones:
+        try:
+            custom_zones = json.loads(zones)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="zones doit être un JSON au format de zones_to_clean")
+    
+    input_path = os.path.join("uploads", f"zones_{uuid.uuid4()}.pdf")
+    try:
+        with open(input_path, "wb") as buffer:
+            buffer.write(await file.read())
+        # Fichier reçu non fiable: mêmes refus que /upload-pdf/ avant tout rendu
+        preflight = await _preflight(input_path)
+        image = await run_in_threadpool(
+            PDFCleaner().preview_zones_image, input_path, dpi, fmt, custom_zones
+        )
+    except (ValueError, KeyError, TypeError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=f"Aperçu impossible: {str(e)}")
+    finally:
+        if os.path.exists(input_path):
+            os.remove(input_path)
+    
+    return Response(content=image, media_type=IMAGE_FORMATS[fmt], headers=_preflight_headers(preflight))
+
+@app.post("/pdf-info/")
+async def pdf_info(files: List[UploadFile] = File(...)):
+    """Pages, tailles, rotation et métadonnées d'un lot de PDF (sans charger les pages)"""
+    if len(files) > PROBE_CONFIG['max_files']:
+        raise HTTPException(status_code=400, detail=f"Au plus {PROBE_CONFIG['max_files']} fichiers par requête")
+    
+    entries = [(file.filename, await file.read()) for file in files]
+    
+    # Un lot contigu par processus du pool, sondés en parallèle
+    num_chunks = min(processing_pool.num_workers, len(entries))
+    size = -(-len(entries) // num_chunks)
+    chunks = [entries[i:i + size] for i in range(0, len(entries), size)]
+    outcomes = await asyncio.gather(*(
+        run_in_threadpool(processing_pool.run_with_budget, _chunk_budget(chunk), probe_many, chunk, 1)
+        for chunk in chunks
+    ))
+    return {'files': [info for infos, _ in outcomes for info in infos]}
+
+def _chunk_budget(chunk: list):
+    """Budget de temps d'un lot: celui d'un devis par fichier"""
+    if PROCESSING_CONFIG['job_timeout'] is None:
+        return None
+    return PROCESSING_CONFIG['job_timeout'] * len(chunk)
+
+class BulkExtractRequest(BaseModel):
+    source_ids: List[str]
+
+def _extraction_key(source_id: str) -> str:
+    """Clé du cache d'extraction: empreinte de la source et version du format"""
+    return sha256_bytes(f"{source_id}:v{EXTRACTION_VERSION}".encode())
+
+def _cached_extraction(source_id: str):
+    cached = result_store.get("extractions", _extraction_key(source_id))
+    return json.loads(cached) if cached is not None else None
+
+def _cache_extraction(source_id: str, data: dict):
+    result_store.put("extractions", json.dumps(data, ensure_ascii=False).encode("utf-8"),
+                     digest=_extraction_key(source_id))
+
+async def _extract_source(source_id: str, filename: str = None):
+    """Données d'un devis stocké, depuis le cache ou extraites dans le pool"""
+    data = _cached_extraction(source_id)
+    if data is not None:
+        return data
+    pdf_path = result_store.path("sources", source_id)
+    if pdf_path is None:
+        return None
+    if _is_quarantined(source_id):
+        raise _quarantined_error(source_id)
+    await _preflight(pdf_path)
+    try:
+        data, _ = await run_in_threadpool(processing_pool.run, extract_quote_file, pdf_path)
+    except JobTimeoutError as e:
+        _quarantine(source_id, filename or source_id, e)
+        raise HTTPException(status_code=504, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=422, detail=f"Extraction impossible: {str(e)}")
+    data['source_id'] = source_id
+    _cache_extraction(source_id, data)
+    return data
+
+@app.post("/extract/")
+async def extract_upload(file: UploadFile = File(...)):
+    """Données structurées d'un devis (client, référence, date, articles, totaux, acomptes)"""
+    content = await file.read()
+    source_id = result_store.put("sources", content)
+    return await _extract_source(source_id, file.filename)
+
+@app.get("/extract/{source_id}")
+async def extract_stored(source_id: str, request: Request):
+    """Données d'un devis déjà envoyé (X-Source-Id), mises en cache par empreinte"""
+    etag = strong_etag(_extraction_key(source_id))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag) and _cached_extraction(source_id) is not None:
+        return Response(status_code=304, headers=headers)
+    
+    data = await _extract_source(source_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Source introuvable ou expirée")
+    return Response(content=json.dumps(data, ensure_ascii=False), media_type="application/json",
+                    headers=headers)
+
+@app.post("/extract/bulk")
+async def extract_bulk(body: BulkExtractRequest):
+    """Extraction en lot de devis déjà envoyés (cache, puis extraction parallèle dans le pool)"""
+    if len(body.source_ids) > EXTRACTION_CONFIG['max_bulk']:
+        raise HTTPException(status_code=400, detail=f"Au plus {EXTRACTION_CONFIG['max_bulk']} devis par requête")
+    
+    results = {}
+    missing = []
+    for source_id in dict.fromkeys(body.source_ids):
+        data = _cached_extraction(source_id)
+        if data is not None:
+            results[source_id] = data
+            continue
+        pdf_path = result_store.path("sources", source_id)
+        if pdf_path is None:
+            results[source_id] = {'source_id': source_id, 'error': "Source introuvable ou expirée"}
+        elif _is_quarantined(source_id):
+            results[source_id] = {'source_id': source_id, 'error': _quarantined_error(source_id).detail}
         else:
-            clean_filename = f"traité_{filename.replace('modified_', '')}"
+            try:
+                await _preflight(pdf_path)
+            except HTTPException as e:
+                results[source_id] = {'source_id': source_id, 'error': e.detail}
+                continue
+            missing.append((source_id, pdf_path))
     
-    return FileResponse(
-        path=file_path,
-        filename=clean_filename,
-        media_type='application/pdf',
-        headers={
-            "Content-Disposition": f"attachment; filename={clean_filename}",
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0"
-        }
+    if missing:
+        # Un lot contigu par processus du pool
+        num_chunks = min(processing_pool.num_workers, len(missing))
+        size = -(-len(missing) // num_chunks)
+        chunks = [missing[i:i + size] for i in range(0, len(missing), size)]
+        outcomes = await asyncio.gather(*(
+            run_in_threadpool(processing_pool.run_with_budget, _chunk_budget(chunk), extract_quote_files, chunk)
+            for chunk in chunks
+        ), return_exceptions=True)
+        for chunk, outcome in zip(chunks, outcomes):
+            if isinstance(outcome, JobTimeoutError):
+                # Le devis fautif du lot n'est pas connu: pas de quarantaine
+                for source_id, _ in chunk:
+                    results[source_id] = {'source_id': source_id, 'error': str(outcome)}
+                continue
+            if isinstance(outcome, BaseException):
+                raise outcome
+            extracted, _ = outcome
+            for data in extracted:
+                if 'error' not in data:
+                    _cache_extraction(data['source_id'], data)
+                results[data['source_id']] = data
+    
+    return {'devis': [results[source_id] for source_id in body.source_ids]}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Mesures mémoire, recyclage et caches (dimensionnement)"""
+    return {
+        'processing_pool': processing_pool.get_stats(),
+        'admission': admission.get_stats(),
+        'single_flight': {**upload_flight.get_stats(), **flight_locks.get_stats()},
+        'preview_cache': preview_cache.get_stats()
+    }
+
+@app.api_route("/download/{token}", methods=["GET", "HEAD"])
+async def download_result(token: str, request: Request):
+    """Téléchargement reprenable d'un résultat (ETag, Range/If-Range, 304)"""
+    entry = result_store.resolve_token(token)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Lien de téléchargement inconnu ou expiré")
+    
+    return await run_in_threadpool(
+        file_download_response,
+        entry['path'],
+        strong_etag(entry['digest']),
+        entry['filename'],
+        request.headers,
+        max_age=entry['expires'] - time.time(),
+        method=request.method
     )
 
 if __name__ == "__main__":
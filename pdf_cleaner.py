@@ -5,6 +5,8 @@ Basé sur le code utilisateur avec des coordonnées précises
 """
 
 import fitz  # PyMuPDF
+from pdf_probe import probe_pdf
+from redaction import redact_zones
 import os
 import logging
 
@@ -21,17 +23,21 @@ class PDFCleaner:
         self.zones_to_clean = {
             'page1_only': [
                 # Logo ADF (haut droite)
-                {'rect': (400, 20, 570, 120), 'description': 'Logo ADF'},
+                {'rect': (400, 20, 570, 120), 'description': 'Logo ADF', 'keywords': ['ADF'],
+                 'images': 'remove'},
                 
                 # Tableau Code interne, Date actuelle, etc.
-                {'rect': (300, 125, 570, 200), 'description': 'Tableau informations'},
+                {'rect': (300, 125, 570, 200), 'description': 'Tableau informations',
+                 'keywords': ['Code interne', 'Date actuelle', 'Code client'], 'images': 'none'},
                 
                 # Code Unique du Devis + ID Unique
-                {'rect': (20, 170, 300, 210), 'description': 'Code Unique du Devis'},
+                {'rect': (20, 170, 300, 210), 'description': 'Code Unique du Devis',
+                 'keywords': ['Code Unique', 'ID Unique'], 'images': 'none'},
             ],
             'all_pages': [
                 # Bannière ADF en bas de chaque page
-                {'rect': (20, 760, 570, 800), 'description': 'Bannière ADF bas de page'},
+                {'rect': (20, 760, 570, 800), 'description': 'Bannière ADF bas de page', 'keywords': ['ADF'],
+                 'images': 'none'},
             ]
         }
         
@@ -41,7 +47,8 @@ class PDFCleaner:
             'viscogliosi_small': {'rect': (50, 130, 300, 170), 'description': 'VISCOGLIOSI (petit)'},
         }
 
-    def clean_pdf(self, input_path: str, output_path: str, include_optional: bool = False) -> bool:
+    def clean_pdf(self, input_path: str, output_path: str, include_optional: bool = False,
+                  auto_zones: bool = False) -> bool:
         """
         Nettoie un PDF selon les zones configurées
         
@@ -49,6 +56,7 @@ class PDFCleaner:
             input_path: Chemin vers le PDF d'entrée
             output_path: Chemin vers le PDF de sortie
             include_optional: Inclure les zones optionnelles (VISCOGLIOSI)
+            auto_zones: Ajuster les zones à la mise en page détectée (zone_detector.py)
             
         Returns:
             bool: True si le nettoyage a réussi, False sinon
@@ -59,32 +67,22 @@ class PDFCleaner:
             # Charger le PDF
             doc = fitz.open(input_path)
             
-            # PAGE 1 : Supprimer les éléments spécifiques
-            if len(doc) > 0:
-                page1 = doc[0]
-                
-                # Appliquer les zones spécifiques à la page 1
-                for zone in self.zones_to_clean['page1_only']:
-                    rect = fitz.Rect(zone['rect'])
-                    page1.add_redact_annot(rect, fill=(1, 1, 1))  # blanc
-                    logger.info(f"Zone masquée page 1: {zone['description']}")
-                
-                # Zones optionnelles si demandées
-                if include_optional:
-                    for zone_name, zone in self.optional_zones.items():
-                        rect = fitz.Rect(zone['rect'])
-                        page1.add_redact_annot(rect, fill=(1, 1, 1))
-                        logger.info(f"Zone optionnelle masquée: {zone['description']}")
+            zones = self.zones_to_clean
+            if auto_zones and len(doc) > 0:
+                from zone_detector import get_zone_detector
+                zones = get_zone_detector().plan_for(doc, zones)
+            
+            # PAGE 1 : Zones spécifiques, et zones optionnelles si demandées
+            page1_zones = list(zones['page1_only'])
+            if include_optional:
+                page1_zones += list(self.optional_zones.values())
             
             # TOUTES LES PAGES : Supprimer la bannière ADF en bas
             for page_num, page in enumerate(doc):
-                for zone in self.zones_to_clean['all_pages']:
-                    rect = fitz.Rect(zone['rect'])
-                    page.add_redact_annot(rect, fill=(1, 1, 1))
+                page_zones = (page1_zones if page_num == 0 else []) + zones['all_pages']
+                # Seules les zones qui recouvrent du contenu sont masquées (en blanc)
+                for zone in redact_zones(page, page_zones, fill=(1, 1, 1)):
                     logger.info(f"Zone masquée page {page_num + 1}: {zone['description']}")
-                
-                # Appliquer les masquages sur cette page
-                page.apply_redactions()
             
             # Sauvegarder le PDF nettoyé
             doc.save(output_path)
@@ -98,31 +96,9 @@ class PDFCleaner:
             return False
 
     def get_pdf_info(self, pdf_path: str) -> dict:
-        """Obtient des informations sur le PDF"""
+        """Obtient des informations sur le PDF (sonde rapide, voir pdf_probe.py)"""
         try:
-            doc = fitz.open(pdf_path)
-            
-            info = {
-                'num_pages': len(doc),
-                'title': doc.metadata.get('title', None),
-                'author': doc.metadata.get('author', None),
-                'creator': doc.metadata.get('creator', None),
-                'pages_info': []
-            }
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                page_info = {
-                    'page_number': page_num + 1,
-                    'width': page.rect.width,
-                    'height': page.rect.height,
-                    'rotation': page.rotation
-                }
-                info['pages_info'].append(page_info)
-            
-            doc.close()
-            return info
-            
+            return probe_pdf(pdf_path)
         except Exception as e:
             logger.error(f"Erreur lors de la lecture des informations PDF: {str(e)}")
             return {}
@@ -177,6 +153,74 @@ class PDFCleaner:
             logger.error(f"Erreur lors de la création de l'aperçu: {str(e)}")
             return False
 
+    def preview_zones_image(self, input_path: str, dpi: int = 36, fmt: str = "png",
+                            zones: dict = None) -> bytes:
+        """
+        Aperçu rapide des zones à masquer sous forme d'image (sans écrire de PDF)
+        
+        Seules la page 1 et la bande de pied de page de la page 2 sont rendues, à
+        basse résolution, et les rectangles sont tracés directement sur l'image.
+        
+        Args:
+            input_path: Chemin vers le PDF d'entrée
+            dpi: Résolution du rendu
+            fmt: 'png' ou 'webp'
+            zones: Zones à tester au format de zones_to_clean (par défaut les zones actuelles)
+            
+        Returns:
+            bytes: Image encodée
+        """
+        from pdf_preview import pixmap_to_image
+        
+        zones = zones or self.zones_to_clean
+        page1_zones = zones.get('page1_only', [])
+        all_pages_zones = zones.get('all_pages', [])
+        matrix = fitz.Matrix(dpi / 72, dpi / 72)
+        
+        with fitz.open(input_path) as doc:
+            if len(doc) == 0:
+                raise ValueError("Le PDF ne contient aucune page")
+            
+            # Page 1 entière, puis bande de pied de page d'une page suivante
+            strips = [(doc[0], doc[0].rect, [(z, (255, 0, 0)) for z in page1_zones] +
+                       [(z, (255, 128, 0)) for z in all_pages_zones])]
+            if len(doc) > 1 and all_pages_zones:
+                page2 = doc[1]
+                band = fitz.Rect()
+                for zone in all_pages_zones:
+                    band |= fitz.Rect(zone['rect'])
+                band = fitz.Rect(0, band.y0 - 20, page2.rect.width, band.y1 + 20) & page2.rect
+                strips.append((page2, band, [(z, (255, 128, 0)) for z in all_pages_zones]))
+            
+            pixmaps = []
+            for page, area, page_zones in strips:
+                pix = page.get_pixmap(matrix=matrix, clip=area, alpha=False)
+                for zone, color in page_zones:
+                    self._draw_zone_outline(pix, fitz.Rect(zone['rect']) * matrix, color)
+                pixmaps.append(pix)
+        
+        # Empiler les bandes dans une seule image
+        width = max(pix.width for pix in pixmaps)
+        height = sum(pix.height for pix in pixmaps)
+        image = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+        image.clear_with(255)
+        y = 0
+        for pix in pixmaps:
+            pix.set_origin(0, y)
+            image.copy(pix, pix.irect)
+            y += pix.height
+        
+        return pixmap_to_image(image, fmt)
+
+    @staticmethod
+    def _draw_zone_outline(pix, rect, color, width: int = 2):
+        """Trace le contour d'un rectangle (en pixels) sur un pixmap"""
+        r = rect.irect
+        pix.set_rect(fitz.IRect(r.x0, r.y0, r.x1, r.y0 + width), color)
+        pix.set_rect(fitz.IRect(r.x0, r.y1 - width, r.x1, r.y1), color)
+        pix.set_rect(fitz.IRect(r.x0, r.y0, r.x0 + width, r.y1), color)
+        pix.set_rect(fitz.IRect(r.x1 - width, r.y0, r.x1, r.y1), color)
+
     def update_zones(self, new_zones: dict):
         """Met à jour les zones à nettoyer"""
         self.zones_to_clean.update(new_zones)
@@ -205,6 +249,11 @@ if __name__ == "__main__":
                 preview_path = os.path.join("output", f"aperçu_{pdf_file}")
                 cleaner.preview_zones(input_path, preview_path)
                 
+                # Aperçu image rapide (page 1 + pied de page)
+                image_path = os.path.join("output", f"aperçu_{os.path.splitext(pdf_file)[0]}.png")
+                with open(image_path, "wb") as f:
+                    f.write(cleaner.preview_zones_image(input_path))
+                
                 # Nettoyer le PDF
                 output_path = os.path.join("output", f"nettoyé_pymupdf_{pdf_file}")
                 success = cleaner.clean_pdf(input_path, output_path)
@@ -1,4 +1,8 @@
 import PyPDF2
+import fitz  # PyMuPDF
+from pdf_probe import probe_pdf
+from text_cache import TextPageCache
+from text_replacer import TextReplacer
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.colors import Color, white, black, red, blue, green
@@ -9,6 +13,7 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 import io
 import os
+import shutil
 from PIL import Image
 import logging
 
@@ -64,7 +69,7 @@ except ImportError:
         {'position': 'top', 'color': COLORS['primary'], 'thickness': 20},
         {'position': 'bottom', 'color': COLORS['secondary'], 'thickness': 15}
     ]
-    ADVANCED_CONFIG = {'add_page_numbers': True}
+    ADVANCED_CONFIG = {'add_page_numbers': True, 'engine': 'pymupdf'}
     LOGGING_CONFIG = {'level': 'INFO'}
 
 # Configuration du logging
@@ -72,6 +77,37 @@ log_level = getattr(logging, LOGGING_CONFIG.get('level', 'INFO'))
 logging.basicConfig(level=log_level)
 logger = logging.getLogger(__name__)
 
+# Moteurs de modification: PyMuPDF (rapide) ou overlay reportlab fusionné par PyPDF2
+ENGINES = ('pymupdf', 'reportlab')
+
+# Polices standard reportlab -> noms des polices Base-14 de PyMuPDF
+PYMUPDF_FONTS = {
+    'Helvetica': 'helv',
+    'Helvetica-Bold': 'hebo',
+    'Helvetica-Oblique': 'heit',
+    'Helvetica-BoldOblique': 'hebi',
+    'Times-Roman': 'tiro',
+    'Times-Bold': 'tibo',
+    'Times-Italic': 'tiit',
+    'Times-BoldItalic': 'tibi',
+    'Courier': 'cour',
+    'Courier-Bold': 'cobo',
+    'Courier-Oblique': 'coit',
+    'Courier-BoldOblique': 'cobi',
+    'Symbol': 'symb',
+    'ZapfDingbats': 'zadb',
+}
+
+def _fitz_color(color):
+    """Couleur reportlab (ou tuple RGB/RGBA) -> (rgb, opacité) pour PyMuPDF"""
+    if color is None:
+        return None, 1
+    if hasattr(color, 'rgb'):
+        return tuple(color.rgb()), getattr(color, 'alpha', 1)
+    if len(color) == 4:
+        return tuple(color[:3]), color[3]
+    return tuple(color), 1
+
 class PDFModifier:
     """Classe pour modifier les PDF de devis automatiquement"""
     
@@ -90,6 +126,7 @@ class PDFModifier:
         self.watermark_config = WATERMARK_CONFIG.copy()
         self.color_bars = COLOR_BARS.copy()
         self.advanced_config = ADVANCED_CONFIG.copy()
+        self.engine = self.advanced_config.get('engine', 'pymupdf')
         
         # Appliquer la configuration personnalisée si fournie
         if custom_config:
@@ -105,6 +142,8 @@ class PDFModifier:
             self.texts_to_add = custom_config['texts_to_add']
         if 'text_replacements' in custom_config:
             self.text_replacements.update(custom_config['text_replacements'])
+        if 'engine' in custom_config:
+            self.engine = custom_config['engine']
 
     def modify_pdf(self, input_path: str, output_path: str) -> bool:
         """
@@ -117,16 +156,209 @@ class PDFModifier:
         Returns:
             bool: True si la modification a réussi, False sinon
         """
+        if self.engine not in ENGINES:
+            logger.error(f"Moteur de modification inconnu: {self.engine} (attendu: {', '.join(ENGINES)})")
+            return False
+        if not (self._has_invariant_layer() or self._has_page_deltas() or self._has_text_replacements()):
+            # Rien à dessiner: ne pas construire ni fusionner d'overlay
+            return self._copy_without_overlay(input_path, output_path)
+        if self.engine == 'pymupdf':
+            return self._modify_pdf_pymupdf(input_path, output_path)
+        return self._modify_pdf_reportlab(input_path, output_path)
+
+    def _has_invariant_layer(self) -> bool:
+        """Couche identique sur toutes les pages de même taille: logos, barres, filigrane"""
+        return bool(
+            (self.modifications.get('remove_logo', False) and self.logo_zones)
+            or (self.modifications.get('change_colors', False) and self.color_bars)
+            or self.modifications.get('add_watermark', False)
+        )
+
+    def _has_text_replacements(self) -> bool:
+        """Remplacements du texte existant (TEXT_REPLACEMENTS) à appliquer"""
+        return bool(self.modifications.get('modify_existing_text', False) and self.text_replacements)
+
+    def _has_page_deltas(self) -> bool:
+        """Éléments propres à chaque page: textes décalés et numéros de page"""
+        return bool(
+            (self.modifications.get('add_text', False) and self.texts_to_add)
+            or self.advanced_config.get('add_page_numbers', False)
+        )
+
+    def _copy_without_overlay(self, input_path: str, output_path: str) -> bool:
+        """Copie le PDF sans overlay (seules les métadonnées éventuelles changent)"""
+        try:
+            logger.info(f"Aucune modification à dessiner: {input_path}")
+            metadata = self.advanced_config.get('add_custom_metadata')
+            if not metadata:
+                shutil.copyfile(input_path, output_path)
+                return True
+            with fitz.open(input_path) as doc:
+                doc_metadata = dict(doc.metadata or {})
+                doc_metadata.update(metadata)
+                doc.set_metadata(doc_metadata)
+                doc.save(output_path, garbage=1)
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors de la modification du PDF: {str(e)}")
+            return False
+
+    def _modify_pdf_pymupdf(self, input_path: str, output_path: str) -> bool:
+        """
+        Modification directe des pages avec PyMuPDF
+        
+        La couche invariante est compilée une fois par taille de page puis posée
+        sur chaque page comme un même XObject; seuls les éléments propres à la
+        page sont dessinés ensuite.
+        """
+        layers = {}
+        replacer = TextReplacer(self.text_replacements) if self._has_text_replacements() else None
+        try:
+            logger.info(f"Début de la modification du PDF (PyMuPDF): {input_path}")
+            
+            with fitz.open(input_path) as doc, TextPageCache(doc) as texts:
+                for page in doc:
+                    logger.info(f"Traitement de la page {page.number + 1}")
+                    page_width, page_height = page.rect.width, page.rect.height
+                    
+                    # Remplacer le texte existant avant de poser les overlays
+                    if replacer is not None:
+                        replacer.replace_in_page(page, texts)
+                    
+                    if self._has_invariant_layer():
+                        key = (round(page_width, 2), round(page_height, 2))
+                        if key not in layers:
+                            layers[key] = self._build_invariant_layer(page_width, page_height)
+                        page.show_pdf_page(page.rect, layers[key], 0, overlay=True)
+                    
+                    if self._has_page_deltas():
+                        shape = page.new_shape()
+                        self._draw_page_deltas_shape(shape, page.number, page_width, page_height)
+                        shape.commit(overlay=True)
+                
+                # Ajouter des métadonnées personnalisées si configuré
+                if self.advanced_config.get('add_custom_metadata'):
+                    metadata = dict(doc.metadata or {})
+                    metadata.update(self.advanced_config['add_custom_metadata'])
+                    doc.set_metadata(metadata)
+                
+                if self.advanced_config.get('compress_output', False):
+                    doc.save(output_path, garbage=3, deflate=True)
+                else:
+                    doc.save(output_path)
+            
+            logger.info(f"PDF modifié sauvegardé: {output_path}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la modification du PDF: {str(e)}")
+            return False
+        finally:
+            for layer in layers.values():
+                layer.close()
+
+    def _build_invariant_layer(self, page_width: float, page_height: float):
+        """Document d'une page contenant la couche invariante pour une taille de page"""
+        layer = fitz.open()
+        page = layer.new_page(width=page_width, height=page_height)
+        shape = page.new_shape()
+        self._draw_invariant_shape(shape, page_width, page_height)
+        shape.commit()
+        return layer
+
+    def _draw_invariant_shape(self, shape, page_width: float, page_height: float):
+        """
+        Dessine logos masqués, barres de couleur et filigrane via une forme PyMuPDF
+        
+        Les positions de la configuration sont celles de reportlab (origine en bas
+        à gauche): y est retourné par rapport à la hauteur de page.
+        """
+        
+        # 1. Masquer les logos
+        if self.modifications.get('remove_logo', False):
+            for x, y, width, height in self.logo_zones:
+                adj_x = min(x, page_width - width) if x + width > page_width else x
+                adj_y = min(y, page_height - height) if y + height > page_height else y
+                shape.draw_rect(fitz.Rect(adj_x, page_height - adj_y - height,
+                                          adj_x + width, page_height - adj_y))
+                shape.finish(fill=(1, 1, 1), color=None, width=0)
+        
+        # 2. Ajouter des éléments de couleur
+        if self.modifications.get('change_colors', False):
+            for bar_config in self.color_bars:
+                thickness = bar_config['thickness']
+                rect = {
+                    'top': (0, 0, page_width, thickness),
+                    'bottom': (0, page_height - thickness, page_width, page_height),
+                    'left': (0, 0, thickness, page_height),
+                    'right': (page_width - thickness, 0, page_width, page_height),
+                }.get(bar_config['position'])
+                if rect is None:
+                    continue
+                fill, opacity = _fitz_color(bar_config['color'])
+                shape.draw_rect(fitz.Rect(rect))
+                shape.finish(fill=fill, color=None, width=0, fill_opacity=opacity)
+        
+        # 3. Ajouter un filigrane (centré, tourné autour du centre de la page)
+        if self.modifications.get('add_watermark', False):
+            text = self.watermark_config.get('text', 'MODIFIÉ')
+            font_size = self.watermark_config.get('font_size', 40)
+            fontname = PYMUPDF_FONTS.get(self.watermark_config.get('font', 'Helvetica'), 'helv')
+            color, opacity = _fitz_color(self.watermark_config['color'])
+            center = fitz.Point(page_width / 2, page_height / 2)
+            text_width = fitz.get_text_length(text, fontname=fontname, fontsize=font_size)
+            shape.insert_text(
+                center - (text_width / 2, 0), text,
+                fontsize=font_size, fontname=fontname, color=color, fill_opacity=opacity,
+                morph=(center, fitz.Matrix(-self.watermark_config.get('rotation', 45)))
+            )
+
+    def _draw_page_deltas_shape(self, shape, page_num: int, page_width: float, page_height: float):
+        """Dessine les textes personnalisés et le numéro de la page via une forme PyMuPDF"""
+        
+        # 4. Ajouter du texte personnalisé
+        if self.modifications.get('add_text', False):
+            for text_config in self.texts_to_add:
+                x, y = text_config['position']
+                # Ajuster la position pour les pages suivantes
+                if page_num > 0:
+                    y -= 20 * page_num
+                color, opacity = _fitz_color(text_config['color'])
+                shape.insert_text(
+                    (x, page_height - y), text_config['text'],
+                    fontsize=text_config['font_size'],
+                    fontname=PYMUPDF_FONTS.get(text_config.get('font', 'Helvetica-Bold'), 'hebo'),
+                    color=color, fill_opacity=opacity
+                )
+        
+        # 5. Ajouter des numéros de page
+        if self.advanced_config.get('add_page_numbers', False):
+            page_text = f"Page {page_num + 1}"
+            color, _ = _fitz_color(self.color_replacements.get('text', black))
+            text_width = fitz.get_text_length(page_text, fontname='helv', fontsize=10)
+            shape.insert_text((page_width - 50 - text_width, page_height - 30), page_text,
+                              fontsize=10, fontname='helv', color=color)
+
+    def _modify_pdf_reportlab(self, input_path: str, output_path: str) -> bool:
+        """Modification par overlay reportlab fusionné page par page avec PyPDF2"""
         try:
             logger.info(f"Début de la modification du PDF: {input_path}")
             
-            # Lire le PDF original
-            with open(input_path, 'rb') as file:
+            # Lire le PDF original (texte existant remplacé avec PyMuPDF si configuré)
+            if self._has_text_replacements():
+                with fitz.open(input_path) as doc, TextPageCache(doc) as texts:
+                    TextReplacer(self.text_replacements).replace_in_document(doc, texts)
+                    source = io.BytesIO(doc.tobytes())
+            else:
+                source = open(input_path, 'rb')
+            
+            with source as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 
                 # Créer un nouveau PDF avec les modifications
                 packet = io.BytesIO()
                 can = canvas.Canvas(packet, pagesize=A4)
+                forms = set()  # Couches invariantes déjà compilées (par taille de page)
                 
                 # Traiter chaque page
                 for page_num in range(len(pdf_reader.pages)):
@@ -138,7 +370,7 @@ class PDFModifier:
                     page_height = float(page.mediabox.height)
                     
                     # Appliquer les modifications sur cette page
-                    self._apply_modifications_to_page(can, page_num, page_width, page_height)
+                    self._apply_modifications_to_page(can, page_num, page_width, page_height, forms)
                     
                     # Nouvelle page pour la suivante (sauf pour la dernière)
                     if page_num < len(pdf_reader.pages) - 1:
@@ -179,8 +411,37 @@ class PDFModifier:
             logger.error(f"Erreur lors de la modification du PDF: {str(e)}")
             return False
 
-    def _apply_modifications_to_page(self, canvas_obj, page_num: int, page_width: float, page_height: float):
-        """Applique les modifications à une page spécifique"""
+    def _apply_modifications_to_page(self, canvas_obj, page_num: int, page_width: float, page_height: float,
+                                     forms: set = None):
+        """
+        Applique les modifications à une page spécifique
+        
+        La couche invariante (logos, barres, filigrane) est compilée une fois par
+        taille de page en forme reportlab réutilisée (doForm); seuls les textes et
+        le numéro de page sont dessinés à chaque page.
+        """
+        if forms is None:
+            forms = set()
+        
+        if self._has_invariant_layer():
+            form_name = f"invariant_{round(page_width * 100)}x{round(page_height * 100)}"
+            if form_name not in forms:
+                canvas_obj.beginForm(form_name, 0, 0, page_width, page_height)
+                self._draw_invariant_layer(canvas_obj, page_width, page_height)
+                canvas_obj.endForm()
+                forms.add(form_name)
+            canvas_obj.doForm(form_name)
+        
+        # 4. Ajouter du texte personnalisé
+        if self.modifications.get('add_text', False):
+            self._add_custom_text(canvas_obj, page_num)
+        
+        # 5. Ajouter des numéros de page
+        if self.advanced_config.get('add_page_numbers', False):
+            self._add_page_number(canvas_obj, page_num, page_width, page_height)
+
+    def _draw_invariant_layer(self, canvas_obj, page_width: float, page_height: float):
+        """Dessine les éléments identiques sur toutes les pages de même taille"""
         
         # 1. Masquer les logos
         if self.modifications.get('remove_logo', False):
@@ -190,17 +451,9 @@ class PDFModifier:
         if self.modifications.get('change_colors', False):
             self._add_color_elements(canvas_obj, page_width, page_height)
         
-        # 3. Ajouter du texte personnalisé
-        if self.modifications.get('add_text', False):
-            self._add_custom_text(canvas_obj, page_num)
-        
-        # 4. Ajouter un filigrane
+        # 3. Ajouter un filigrane
         if self.modifications.get('add_watermark', False):
             self._add_watermark(canvas_obj, page_width, page_height)
-        
-        # 5. Ajouter des numéros de page
-        if self.advanced_config.get('add_page_numbers', False):
-            self._add_page_number(canvas_obj, page_num, page_width, page_height)
 
     def _remove_logos(self, canvas_obj, page_width: float, page_height: float):
         """Masque les logos en ajoutant des rectangles blancs"""
@@ -291,30 +544,9 @@ class PDFModifier:
         self.logo_zones = new_zones
 
     def get_pdf_info(self, pdf_path: str) -> dict:
-        """Obtient des informations sur le PDF"""
+        """Obtient des informations sur le PDF (sonde rapide, voir pdf_probe.py)"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                info = {
-                    'num_pages': len(pdf_reader.pages),
-                    'title': pdf_reader.metadata.title if pdf_reader.metadata else None,
-                    'author': pdf_reader.metadata.author if pdf_reader.metadata else None,
-                    'creator': pdf_reader.metadata.creator if pdf_reader.metadata else None,
-                    'pages_info': []
-                }
-                
-                for i, page in enumerate(pdf_reader.pages):
-                    page_info = {
-                        'page_number': i + 1,
-                        'width': float(page.mediabox.width),
-                        'height': float(page.mediabox.height),
-                        'rotation': page.rotation if hasattr(page, 'rotation') else 0
-                    }
-                    info['pages_info'].append(page_info)
-                
-                return info
-                
+            return probe_pdf(pdf_path)
         except Exception as e:
             logger.error(f"Erreur lors de la lecture des informations PDF: {str(e)}")
             return {}
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Rendu d'aperçus (vignettes PNG/WebP) des pages de devis traités
+Seule la page demandée est chargée et rendue, limitée à sa zone visible ou à
+un rectangle de découpe.
+"""
+
+import threading
+import logging
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+}
+
+
+def pixmap_to_image(pix, fmt: str = "png") -> bytes:
+    """Encode un pixmap en PNG (MuPDF) ou WebP (Pillow)"""
+    if fmt == "png":
+        return pix.tobytes("png")
+    if fmt == "webp":
+        return pix.pil_tobytes(format="WEBP", quality=80)
+    raise ValueError(f"Format d'image non supporté: {fmt}")
+
+
+def render_page(pdf_path: str, page_number: int = 1, dpi: int = 72, fmt: str = "png",
+                clip: tuple = None, max_pixels: int = 4_000_000) -> bytes:
+    """
+    Rend une seule page d'un PDF en image
+
+    Args:
+        pdf_path: Chemin du PDF
+        page_number: Numéro de page (à partir de 1)
+        dpi: Résolution demandée (réduite si l'image dépasse max_pixels)
+        fmt: 'png' ou 'webp'
+        clip: Rectangle (x0, y0, x1, y1) en points à rendre (optionnel)
+        max_pixels: Nombre maximal de pixels de l'image
+
+    Returns:
+        bytes: Image encodée
+
+    Raises:
+        IndexError: Si la page n'existe pas
+    """
+    with fitz.open(pdf_path) as doc:
+        if not 1 <= page_number <= len(doc):
+            raise IndexError(f"Page {page_number} inexistante ({len(doc)} pages)")
+        page = doc.load_page(page_number - 1)
+
+        area = page.rect
+        if clip is not None:
+            area = area & fitz.Rect(clip)
+            if area.is_empty:
+                raise ValueError("La zone demandée est hors de la page")
+
+        # Borner le coût du rendu: au plus max_pixels pixels
+        pixels = area.width * area.height * (dpi / 72) ** 2
+        if pixels > max_pixels:
+            dpi = int(dpi * (max_pixels / pixels) ** 0.5)
+
+        pix = page.get_pixmap(dpi=dpi, clip=area, alpha=False)
+        return pixmap_to_image(pix, fmt)
+
+
+class PreviewCache:
+    """Cache LRU des aperçus encodés, borné en octets"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            image = self._items.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image: bytes):
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._items), 'bytes': self._size,
+                    'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Sonde rapide des métadonnées d'un PDF (nombre de pages, tailles, rotation)
+Seuls le trailer, le dictionnaire Info et l'arbre des pages sont lus: aucune
+page n'est chargée ni aucun flux de contenu décodé.
+
+Usage:
+    python pdf_probe.py devis/*.pdf [--workers 8] [--json]
+"""
+
+import argparse
+import json
+import os
+import re
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+_REF_RE = re.compile(r"(\d+)\s+\d+\s+R")
+_NUMBER_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)")
+_VALUE = r"\s*(\[[^\]]*\]|\d+\s+\d+\s+R|[-+]?\d+)"
+_KEY_RES = {
+    key: re.compile(f"/{key}(?![A-Za-z]){_VALUE}")
+    for key in ('MediaBox', 'CropBox', 'Rotate', 'Kids')
+}
+
+# Attributs hérités des nœuds /Pages par les pages (PDF 32000 §7.7.3.4)
+INHERITED_KEYS = ('MediaBox', 'CropBox', 'Rotate')
+
+
+def _read_key(doc, obj: str, key: str):
+    """Valeur brute d'une clé d'un objet compressé, en suivant une référence indirecte"""
+    match = _KEY_RES[key].search(obj)
+    if match is None:
+        return None
+    value = match.group(1)
+    ref = _REF_RE.fullmatch(value)
+    if ref is not None:
+        value = doc.xref_object(int(ref.group(1)), compressed=True)
+    return value
+
+
+def _parse_attribute(key: str, value: str):
+    if key == 'Rotate':
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+    numbers = [float(n) for n in _NUMBER_RE.findall(value)]
+    return tuple(numbers) if len(numbers) == 4 else None
+
+
+def _walk_page_tree(doc):
+    """
+    Parcourt l'arbre des pages depuis le catalogue (un objet lu par nœud)
+
+    Returns:
+        list: (xref de la page, attributs hérités) dans l'ordre des pages
+    """
+    root = doc.xref_get_key(doc.pdf_catalog(), 'Pages')
+    if root[0] != 'xref':
+        raise ValueError("Arbre des pages introuvable")
+
+    pages = []
+    visited = set()
+    stack = [(int(root[1].split()[0]), {})]
+    while stack:
+        xref, inherited = stack.pop()
+        if xref in visited:
+            raise ValueError("Arbre des pages cyclique")
+        visited.add(xref)
+        obj = doc.xref_object(xref, compressed=True)
+
+        attributes = inherited
+        for key in INHERITED_KEYS:
+            value = _read_key(doc, obj, key)
+            if value is not None:
+                value = _parse_attribute(key, value)
+            if value is not None:
+                attributes = dict(attributes, **{key: value})
+
+        kids = _read_key(doc, obj, 'Kids')
+        if kids is None:
+            pages.append((xref, attributes))
+            continue
+        # Pile: empiler à l'envers pour conserver l'ordre des pages
+        for kid in reversed(_REF_RE.findall(kids)):
+            stack.append((int(kid), attributes))
+    return pages
+
+
+A4 = (0.0, 0.0, 595.0, 842.0)
+
+
+def _page_info(page_number: int, attributes: dict) -> dict:
+    """Taille visible (CropBox ∩ MediaBox, tournée) comme page.rect de PyMuPDF"""
+    mx0, my0, mx1, my1 = _normalize(attributes.get('MediaBox') or A4)
+    x0, y0, x1, y1 = _normalize(attributes.get('CropBox') or (mx0, my0, mx1, my1))
+    width = min(x1, mx1) - max(x0, mx0)
+    height = min(y1, my1) - max(y0, my0)
+    if width <= 0 or height <= 0:
+        width, height = mx1 - mx0, my1 - my0
+    rotation = attributes.get('Rotate', 0) % 360
+    if rotation in (90, 270):
+        width, height = height, width
+    return {
+        'page_number': page_number,
+        'width': width,
+        'height': height,
+        'rotation': rotation,
+    }
+
+
+def _normalize(box):
+    x0, y0, x1, y1 = box
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+def probe_document(doc) -> dict:
+    """Informations d'un document PyMuPDF ouvert, sans charger ses pages"""
+    metadata = doc.metadata or {}
+    info = {
+        'num_pages': doc.page_count,
+        'title': metadata.get('title', None),
+        'author': metadata.get('author', None),
+        'creator': metadata.get('creator', None),
+        'producer': metadata.get('producer', None),
+        'format': metadata.get('format', None),
+        'encrypted': doc.needs_pass,
+        'pages_info': [],
+    }
+    if doc.needs_pass or not doc.is_pdf:
+        return info
+
+    try:
+        pages = _walk_page_tree(doc)
+        if len(pages) != doc.page_count:
+            raise ValueError("Arbre des pages incohérent")
+        info['pages_info'] = [_page_info(i + 1, attributes) for i, (_, attributes) in enumerate(pages)]
+    except (ValueError, RuntimeError) as e:
+        # Arbre des pages abîmé (réparé par MuPDF): lire les pages une par une
+        logger.warning(f"Sonde rapide impossible ({e}), lecture des pages")
+        info['pages_info'] = [
+            {'page_number': page.number + 1, 'width': page.rect.width,
+             'height': page.rect.height, 'rotation': page.rotation}
+            for page in doc
+        ]
+    return info
+
+
+def probe_pdf(pdf_path: str = None, stream: bytes = None) -> dict:
+    """
+    Informations d'un PDF (chemin ou contenu en mémoire)
+
+    Returns:
+        dict: num_pages, title, author, creator, producer, format, encrypted,
+        pages_info [{page_number, width, height, rotation}]
+
+    Raises:
+        RuntimeError: Si le fichier n'est pas un PDF lisible
+    """
+    if stream is not None:
+        doc = fitz.open(stream=stream, filetype="pdf")
+    else:
+        doc = fitz.open(pdf_path)
+    with doc:
+        info = probe_document(doc)
+    if pdf_path is not None:
+        info['file_size'] = os.path.getsize(pdf_path)
+    else:
+        info['file_size'] = len(stream)
+    return info
+
+
+def _probe_entry(entry) -> dict:
+    """Sonde un (nom, chemin ou contenu) sans lever d'exception (traitement en lot)"""
+    name, source = entry
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            info = probe_pdf(stream=bytes(source))
+        else:
+            info = probe_pdf(source)
+        return dict(info, file=name)
+    except Exception as e:
+        return {'file': name, 'error': str(e)}
+
+
+def probe_many(entries: list, max_workers: int = None) -> list:
+    """
+    Sonde un lot de PDF en parallèle
+
+    Args:
+        entries: Chemins, ou couples (nom, chemin ou contenu)
+        max_workers: Processus à utiliser (None = nombre de CPU)
+
+    Returns:
+        list: Informations de chaque fichier, dans l'ordre ('error' en cas d'échec)
+    """
+    entries = [entry if isinstance(entry, tuple) else (entry, entry) for entry in entries]
+    if len(entries) <= 1 or max_workers == 1:
+        return [_probe_entry(entry) for entry in entries]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(entries))
+    chunksize = max(1, len(entries) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_probe_entry, entries, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sonde rapide des métadonnées de PDF")
+    parser.add_argument("pdf", nargs="+", help="Fichiers PDF (ou répertoires)")
+    parser.add_argument("--workers", type=int, default=None, help="Processus (défaut: nombre de CPU)")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON complète")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.pdf:
+        if os.path.isdir(path):
+            paths += sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith('.pdf'))
+        else:
+            paths.append(path)
+
+    results = probe_many(paths, args.workers)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        for info in results:
+            if 'error' in info:
+                print(f"❌ {info['file']}: {info['error']}")
+                continue
+            sizes = {(round(p['width']), round(p['height']), p['rotation']) for p in info['pages_info']}
+            sizes = ", ".join(f"{w}x{h}" + (f" ↻{r}" if r else "") for w, h, r in sorted(sizes))
+            print(f"📄 {info['file']}: {info['num_pages']} pages, {sizes}, "
+                  f"{info['file_size'] / 1024:.0f} Ko, {info['producer'] or '?'}")
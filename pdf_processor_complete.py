@@ -5,25 +5,94 @@ Basé sur le code final de l'utilisateur : nettoyage + design + calculs automati
 """
 
 import fitz  # PyMuPDF
+from pdf_probe import probe_pdf
+from line_items import check_document
+from quote_data import compute_payments, find_total_ttc
+from image_optimizer import ImageOptimizer
+from redaction import redact_zones
+from text_cache import TextPageCache
 import re
 import os
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Logos déjà lus, partagés par tous les traitements du processus
+_logo_cache = {}
+
+def load_logo(logo_path: str):
+    """Lit un logo une seule fois par processus (None s'il n'existe pas)"""
+    if logo_path not in _logo_cache:
+        if not os.path.exists(logo_path):
+            return None
+        with open(logo_path, "rb") as f:
+            _logo_cache[logo_path] = f.read()
+    return _logo_cache[logo_path]
+
 class PDFProcessorComplete:
     """Classe complète pour traiter les PDF de devis ADF"""
     
-    def __init__(self, logo_path="logo.png"):
+    def __init__(self, logo_path="logo.png", parallel_threshold=0, max_workers=None, zone_detector=None,
+                 template_registry=None, verify_totals=False, linearize=False, optimize_images=False):
         """
         Initialise le processeur PDF complet
         
         Args:
             logo_path: Chemin vers le fichier logo à insérer
+            parallel_threshold: Nombre de pages à partir duquel le nettoyage et le
+                footer sont répartis sur plusieurs processus (0 = désactivé)
+            max_workers: Nombre maximum de processus pour le mode parallèle
+                (par défaut: nombre de CPU)
+            zone_detector: ZoneDetector pour ajuster les zones au document (optionnel)
+            template_registry: TemplateRegistry des plans par modèle de devis (optionnel)
+            verify_totals: Vérifier les lignes d'articles et les totaux (voir line_items.py)
+            linearize: Enregistrer un PDF linéarisé (« affichage web rapide »): la
+                première page s'affiche avant la fin du téléchargement
+            optimize_images: Réduire et recompresser les photos trop lourdes (voir image_optimizer.py)
         """
         self.logo_path = logo_path
+        self.parallel_threshold = parallel_threshold
+        self.max_workers = max_workers
+        self.min_pages_per_worker = 8
+        self.zone_detector = zone_detector
+        self.template_registry = template_registry
+        self.verify_totals = verify_totals
+        self.linearize = linearize
+        self.optimize_images = optimize_images
+        self.logo_rect = fitz.Rect(30, 20, 130, 100)
+        
+        # Compte rendu du dernier traitement (modèle reconnu, etc.)
+        self.report = {}
+        
+        # Zones à nettoyer (même format que PDFCleaner.zones_to_clean)
+        # 'images': logo supprimé entier; ailleurs les images restent sous le
+        # remplissage blanc ('pixels' réencoderait les photos qui débordent
+        # dans la marge, pour un rendu identique)
+        self.zones_to_clean = {
+            'page1_only': [
+                {'rect': (30, 20, 570, 120), 'description': 'En-tête et logo ADF',
+                 'keywords': ['ADF'], 'images': 'remove'},
+                {'rect': (30, 125, 570, 200), 'description': 'Tableau informations',
+                 'keywords': ['Code interne', 'Date actuelle', 'Code client'], 'images': 'none'},
+                {'rect': (20, 170, 300, 210), 'description': 'Code Unique du Devis',
+                 'keywords': ['Code Unique', 'ID Unique'], 'images': 'none'},
+            ],
+            'all_pages': [
+                {'rect': (20, 760, 570, 800), 'description': 'Bannière ADF bas de page',
+                 'keywords': ['ADF'], 'images': 'none'},
+            ]
+        }
+        
+        # Ancre du total TTC et positions des acomptes sur la dernière page
+        self.payment_layout = {
+            'anchor': 'ACOMPTE 30%',
+            'acompte_30': (110, 463),
+            'acompte_50': (251, 473),
+            'solde_20': (190, 484)
+        }
         
         # Configuration des couleurs
         self.colors = {
@@ -68,24 +137,63 @@ class PDFProcessorComplete:
         Returns:
             bool: True si le traitement a réussi, False sinon
         """
+        texts = None
         try:
             logger.info(f"Début du traitement complet du PDF: {input_path}")
             
+            self.report = {}
+            
             # Charger le PDF
             doc = fitz.open(input_path)
-            page1 = doc[0]
             
-            # 1. NETTOYAGE - Supprimer les éléments indésirables
-            self._clean_pdf(doc, page1)
+            # Analyse du texte de chaque page, partagée par toutes les étapes de
+            # lecture et faite sur le document reçu (avant nettoyage et design)
+            texts = TextPageCache(doc)
+            
+            # Plan précompilé du modèle de devis, s'il est connu
+            plan = {}
+            if self.template_registry is not None:
+                fingerprint, template = self.template_registry.match(doc)
+                self.report['template_fingerprint'] = fingerprint
+                self.report['template'] = template['name'] if template else None
+                plan = template or {}
+            payment_layout = dict(self.payment_layout, **plan.get('payment_layout', {}))
+            
+            # Vérifier les lignes et totaux sur le document d'origine
+            if self.verify_totals:
+                self.report['totals_check'] = check_document(doc, texts=texts)
+            
+            # Zones à nettoyer, ajustées à la mise en page du document si possible
+            zones = plan.get('zones')
+            if zones is None:
+                zones = self.zones_to_clean
+                if self.zone_detector is not None:
+                    zones = self.zone_detector.plan_for(doc, zones, texts)
+            
+            # Dernière page analysée avant modification (acomptes)
+            texts.textpage(-1)
             
-            # 2. DESIGN - Ajouter le nouveau design
-            self._add_design(doc, page1, client_info)
+            if self.parallel_threshold and len(doc) >= self.parallel_threshold:
+                # 1 + 2. NETTOYAGE et DESIGN répartis par plages de pages
+                self._process_pages_parallel(doc, input_path, client_info, zones)
+            else:
+                page1 = doc[0]
+                
+                # 1. NETTOYAGE - Supprimer les éléments indésirables
+                self._clean_pdf(doc, page1, zones)
+                
+                # 2. DESIGN - Ajouter le nouveau design
+                self._add_design(doc, page1, client_info)
             
             # 3. CALCULS - Traiter les acomptes automatiquement
-            self._process_payments(doc)
+            self._process_payments(doc, payment_layout, texts)
+            
+            # 4. IMAGES - Réduire les photos au-delà de la résolution cible (logo exclu)
+            if self.optimize_images:
+                self.report['images'] = ImageOptimizer().optimize_document(doc, skip_xrefs=self._logo_xrefs(doc))
             
             # Sauvegarder le PDF traité
-            doc.save(output_path)
+            self._save(doc, output_path)
             doc.close()
             
             logger.info(f"PDF traité sauvegardé: {output_path}")
@@ -94,25 +202,106 @@ class PDFProcessorComplete:
         except Exception as e:
             logger.error(f"Erreur lors du traitement du PDF: {str(e)}")
             return False
+        
+        finally:
+            if texts is not None:
+                texts.release()
+
+    def _save(self, doc, output_path):
+        """Enregistre le document, linéarisé si demandé"""
+        if self.linearize:
+            try:
+                doc.save(output_path, garbage=1, linear=True)
+                self.report['linearized'] = True
+                return
+            except (RuntimeError, ValueError) as e:
+                # Linéarisation absente de certaines versions de MuPDF
+                logger.warning(f"Linéarisation impossible ({e}), enregistrement standard")
+        doc.save(output_path)
+        self.report['linearized'] = False
+
+    def _process_pages_parallel(self, doc, input_path, client_info=None, zones=None):
+        """
+        Phases 1 et 2 en parallèle : chaque processus nettoie et décore une plage
+        de pages, puis les plages sont réassemblées dans l'ordre dans `doc`.
+        
+        Chaque plage passe par les mêmes méthodes que le chemin séquentiel, dans
+        le même ordre, ce qui donne des pages identiques.
+        """
+        num_pages = len(doc)
+        max_workers = self.max_workers or os.cpu_count() or 1
+        num_chunks = max(1, min(max_workers, num_pages // self.min_pages_per_worker))
+        chunk_size = -(-num_pages // num_chunks)
+        ranges = [(start, min(start + chunk_size, num_pages))
+                  for start in range(0, num_pages, chunk_size)]
+        
+        logger.info(f"Phases 1-2 en parallèle: {num_pages} pages, {len(ranges)} plages")
+        
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(self._process_page_range, input_path, start, stop, client_info, zones)
+                       for start, stop in ranges]
+            chunks = [future.result() for future in futures]
+        
+        # Ajouter les plages traitées à la suite, puis retirer les pages d'origine
+        for chunk in chunks:
+            with fitz.open("pdf", chunk) as chunk_doc:
+                doc.insert_pdf(chunk_doc)
+        doc.delete_pages(0, num_pages - 1)
 
-    def _clean_pdf(self, doc, page1):
+    def __getstate__(self):
+        """
+        État transmis aux processus de plages: les zones y sont passées en
+        argument, le détecteur et le registre (verrous) restent ici
+        """
+        state = self.__dict__.copy()
+        state['zone_detector'] = None
+        state['template_registry'] = None
+        return state
+
+    def _process_page_range(self, input_path, start, stop, client_info=None, zones=None):
+        """Nettoie et décore les pages [start, stop[ (exécuté dans un processus séparé)"""
+        doc = fitz.open(input_path)
+        doc.select(range(start, stop))
+        
+        page1 = doc[0] if start == 0 else None
+        self._clean_pdf(doc, page1, zones)
+        if page1 is not None:
+            self._add_page1_design(page1, client_info)
+        self._add_footer_all_pages(doc)
+        
+        chunk = doc.tobytes()
+        doc.close()
+        return chunk
+
+    def _clean_pdf(self, doc, page1, zones=None):
         """Phase 1: Nettoyage des éléments indésirables"""
         logger.info("Phase 1: Nettoyage en cours...")
+        zones = zones or self.zones_to_clean
         
-        # Nettoyage en-tête et zones spécifiques page 1
-        page1.add_redact_annot(fitz.Rect(30, 20, 570, 120), fill=self.colors['white'])
-        page1.add_redact_annot(fitz.Rect(30, 125, 570, 200), fill=self.colors['white'])
-        page1.add_redact_annot(fitz.Rect(20, 170, 300, 210), fill=self.colors['white'])
-        
-        # Nettoyage pied de page sur toutes les pages
+        # En-tête et zones spécifiques en page 1, bannière sur toutes les pages;
+        # les pages sans contenu dans leurs zones ne sont pas réécrites
+        skipped = 0
         for page in doc:
-            page.add_redact_annot(fitz.Rect(20, 760, 570, 800), fill=self.colors['white'])
-            page.apply_redactions()
+            page_zones = zones['all_pages']
+            if page1 is not None and page.number == page1.number:
+                page_zones = zones['page1_only'] + page_zones
+            if not redact_zones(page, page_zones, fill=self.colors['white']):
+                skipped += 1
+        if skipped:
+            logger.info(f"{skipped} pages sans contenu à masquer")
 
     def _add_design(self, doc, page1, client_info=None):
         """Phase 2: Ajout du nouveau design"""
         logger.info("Phase 2: Ajout du design...")
         
+        # 1 à 5. EN-TÊTE DE LA PREMIÈRE PAGE
+        self._add_page1_design(page1, client_info)
+        
+        # 6. FOOTER SUR TOUTES LES PAGES
+        self._add_footer_all_pages(doc)
+
+    def _add_page1_design(self, page1, client_info=None):
+        """Ajouter le design spécifique à la première page"""
         # Utiliser les infos client fournies ou par défaut
         client = client_info if client_info else self.client_info
         
@@ -130,19 +319,21 @@ class PDFProcessorComplete:
         
         # 5. LIGNE DE SÉPARATION
         self._add_separator_line(page1)
-        
-        # 6. FOOTER SUR TOUTES LES PAGES
-        self._add_footer_all_pages(doc)
 
     def _add_logo(self, page1):
         """Ajouter le logo"""
-        if os.path.exists(self.logo_path):
-            logo_rect = fitz.Rect(30, 20, 130, 100)
-            page1.insert_image(logo_rect, filename=self.logo_path)
+        logo = load_logo(self.logo_path)
+        if logo is not None:
+            page1.insert_image(self.logo_rect, stream=logo)
             logger.info(f"Logo ajouté: {self.logo_path}")
         else:
             logger.warning(f"Logo non trouvé: {self.logo_path}")
 
+    def _logo_xrefs(self, doc) -> set:
+        """Images placées à l'emplacement du logo en page 1 (aussi après réassemblage parallèle)"""
+        return {info['xref'] for info in doc[0].get_image_info(xrefs=True)
+                if info['xref'] and fitz.Rect(info['bbox']) in self.logo_rect + (-1, -1, 1, 1)}
+
     def _add_company_info(self, page1):
         """Ajouter les informations de l'entreprise"""
         # Zone de fond grise
@@ -212,32 +403,29 @@ class PDFProcessorComplete:
             ligne_zone_1 = fitz.Rect(30, 802, 570, 803)
             page.draw_rect(ligne_zone_1, fill=self.colors['accent_blue'], color=None)
 
-    def _process_payments(self, doc):
-        """Phase 3: Traitement automatique des acomptes"""
+    def _process_payments(self, doc, payment_layout=None, texts=None):
+        """Phase 3: Traitement automatique des acomptes (texte lu dans texts s'il est fourni)"""
         logger.info("Phase 3: Calcul des acomptes...")
+        layout = payment_layout or self.payment_layout
         
         try:
             last_page = doc[-1]
-            texte = last_page.get_text()
-            lines = texte.splitlines()
             
             # Chercher la ligne "ACOMPTE 30%" puis regarder la valeur juste avant
-            i = lines.index('ACOMPTE 30%')
-            montant_str = lines[i - 1]  # Juste avant
-            montant_str = montant_str.replace("\u202f", "").replace(" ", "").replace(",", ".").replace("EUR", "").strip()
-            total_ttc = float(montant_str)
+            total_ttc = find_total_ttc(last_page, layout['anchor'], texts)
             
             # Calculer les acomptes
-            acompte_30 = round(total_ttc * 0.30, 2)
-            acompte_50 = round(total_ttc * 0.50, 2)
-            solde_20 = round(total_ttc * 0.20, 2)
+            payments = compute_payments(total_ttc)
+            acompte_30 = payments['acompte_30']
+            acompte_50 = payments['acompte_50']
+            solde_20 = payments['solde_20']
             
             # Insérer les montants calculés
-            last_page.insert_text((110, 463), f": {acompte_30:.2f}  EUR", 
+            last_page.insert_text(layout['acompte_30'], f": {acompte_30:.2f}  EUR", 
                                  fontsize=10, fontname="Helvetica")
-            last_page.insert_text((251, 463 + 10), f"{acompte_50:.2f}  EUR", 
+            last_page.insert_text(layout['acompte_50'], f"{acompte_50:.2f}  EUR", 
                                  fontsize=10, fontname="Helvetica")
-            last_page.insert_text((190, 463 + 21), f" {solde_20:.2f} EUR", 
+            last_page.insert_text(layout['solde_20'], f" {solde_20:.2f} EUR", 
                                  fontsize=10, fontname="Helvetica")
             
             logger.info(f"✅ Total TTC détecté: {total_ttc:.2f} €")
@@ -246,7 +434,7 @@ class PDFProcessorComplete:
             logger.info(f"   Solde 20%: {solde_20:.2f} €")
             
         except (ValueError, IndexError) as e:
-            logger.warning(f"❌ Impossible de détecter le montant avant 'ACOMPTE 30%': {e}")
+            logger.warning(f"❌ Impossible de détecter le montant avant '{layout['anchor']}': {e}")
 
     def update_company_info(self, new_info: dict):
         """Met à jour les informations de l'entreprise"""
@@ -257,35 +445,31 @@ class PDFProcessorComplete:
         self.footer_info.update(new_info)
 
     def get_pdf_info(self, pdf_path: str) -> dict:
-        """Obtient des informations sur le PDF"""
+        """Obtient des informations sur le PDF (sonde rapide, voir pdf_probe.py)"""
         try:
-            doc = fitz.open(pdf_path)
-            
-            info = {
-                'num_pages': len(doc),
-                'title': doc.metadata.get('title', None),
-                'author': doc.metadata.get('author', None),
-                'creator': doc.metadata.get('creator', None),
-                'pages_info': []
-            }
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                page_info = {
-                    'page_number': page_num + 1,
-                    'width': page.rect.width,
-                    'height': page.rect.height,
-                    'rotation': page.rotation
-                }
-                info['pages_info'].append(page_info)
-            
-            doc.close()
-            return info
-            
+            return probe_pdf(pdf_path)
         except Exception as e:
             logger.error(f"Erreur lors de la lecture des informations PDF: {str(e)}")
             return {}
 
+def process_pdf_job(input_path: str, output_path: str, client_info: dict = None,
+                    auto_zones: bool = False, use_templates: bool = False, **processor_options):
+    """
+    Job de traitement exécuté dans un processus du pool (voir processing_pool.py)
+    
+    Returns:
+        tuple: (succès, compte rendu du traitement)
+    """
+    if auto_zones:
+        from zone_detector import get_zone_detector
+        processor_options['zone_detector'] = get_zone_detector()
+    if use_templates:
+        from template_registry import get_template_registry
+        processor_options['template_registry'] = get_template_registry()
+    processor = PDFProcessorComplete(**processor_options)
+    success = processor.process_pdf(input_path, output_path, client_info)
+    return success, processor.report
+
 # Exemple d'utilisation et de test
 if __name__ == "__main__":
     processor = PDFProcessorComplete()
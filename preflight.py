@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Contrôle préalable des PDF reçus, avant tout traitement
+Seuls le trailer et les dictionnaires des objets sont lus (aucun flux décodé):
+fichier chiffré, trop de pages, table xref démesurée, images géantes, bombes
+de décompression (taille décodée estimée sans commune mesure avec la taille
+compressée) sont refusés; les fichiers réparés à l'ouverture sont signalés.
+
+Usage:
+    python preflight.py devis/*.pdf [--json]
+"""
+
+import argparse
+import json
+import re
+import time
+import logging
+
+import fitz  # PyMuPDF
+
+try:
+    from config import PREFLIGHT_CONFIG
+except ImportError:
+    PREFLIGHT_CONFIG = {
+        'enabled': True,
+        'max_pages': 500,
+        'max_xref_entries': 100000,
+        'max_image_pixels': 50_000_000,
+        'max_stream_mb': 50,
+        'max_decoded_mb': 256,
+        'max_total_decoded_mb': 1024,
+        'max_compression_ratio': 200,
+        'reject_repaired': False,
+    }
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+_IMAGE_RE = re.compile(r"/Subtype\s*/Image(?![A-Za-z])")
+_IMAGE_MASK_RE = re.compile(r"/ImageMask\s+true")
+_INT_RES = {
+    key: re.compile(f"/{key}(?![A-Za-z0-9])\\s*(\\d+)(\\s+\\d+\\s+R)?")
+    for key in ('Length', 'DL', 'Width', 'Height', 'BitsPerComponent')
+}
+_FILTER_RE = re.compile(r"/Filter\s*(\[[^\]]*\]|/[A-Za-z0-9]+)")
+_COLORSPACE_RE = re.compile(r"/ColorSpace\s*(\[\s*/[A-Za-z]+|/[A-Za-z]+)")
+
+# Composantes par espace colorimétrique (les autres comptent pour 3)
+_COMPONENTS = {'DeviceGray': 1, 'CalGray': 1, 'Indexed': 1, 'Separation': 1,
+               'DeviceCMYK': 4, 'G': 1, 'CMYK': 4, 'I': 1}
+
+
+def _read_int(doc, obj: str, key: str):
+    """Entier d'un dictionnaire compressé, en suivant une référence indirecte"""
+    match = _INT_RES[key].search(obj)
+    if match is None:
+        return None
+    if match.group(2):
+        try:
+            return int(doc.xref_object(int(match.group(1)), compressed=True).strip())
+        except (ValueError, RuntimeError):
+            return None
+    return int(match.group(1))
+
+
+def _components(obj: str) -> int:
+    match = _COLORSPACE_RE.search(obj)
+    if match is None:
+        return 3
+    name = match.group(1).lstrip("[ \t\r\n/")
+    return _COMPONENTS.get(name, 3)
+
+
+def _decoded_estimate(doc, obj: str, is_image: bool):
+    """Taille décodée d'un flux: dimensions d'une image, ou /DL s'il est déclaré"""
+    if is_image:
+        width = _read_int(doc, obj, 'Width') or 0
+        height = _read_int(doc, obj, 'Height') or 0
+        if _IMAGE_MASK_RE.search(obj):
+            bits = 1
+        else:
+            bits = (_read_int(doc, obj, 'BitsPerComponent') or 8) * _components(obj)
+        return width * height, (width * height * bits + 7) // 8
+    return None, _read_int(doc, obj, 'DL')
+
+
+def _issue(check: str, detail: str, **values) -> dict:
+    return dict(values, check=check, detail=detail)
+
+
+def preflight_document(doc, config: dict = None) -> dict:
+    """
+    Contrôle d'un document PyMuPDF ouvert (dictionnaires seulement)
+
+    Returns:
+        dict: {'ok', 'rejections': [...], 'flags': [...], 'stats': {...}}
+    """
+    config = config or PREFLIGHT_CONFIG
+    rejections, flags = [], []
+    stats = {'num_pages': None, 'xref_entries': None, 'streams': 0, 'images': 0,
+             'stream_bytes': 0, 'decoded_bytes_estimate': 0}
+    report = {'ok': False, 'rejections': rejections, 'flags': flags, 'stats': stats}
+
+    if doc.needs_pass or doc.is_encrypted:
+        rejections.append(_issue('encrypted', "Document chiffré"))
+        return report
+
+    if doc.is_repaired:
+        issue = _issue('repaired', "Structure abîmée, réparée à l'ouverture")
+        (rejections if config['reject_repaired'] else flags).append(issue)
+
+    stats['num_pages'] = doc.page_count
+    if doc.page_count > config['max_pages']:
+        rejections.append(_issue('pages', f"{doc.page_count} pages (maximum {config['max_pages']})"))
+
+    xref_length = doc.xref_length()
+    stats['xref_entries'] = xref_length
+    if xref_length > config['max_xref_entries']:
+        # Inutile de parcourir une table démesurée
+        rejections.append(_issue('xref', f"{xref_length} objets (maximum {config['max_xref_entries']})"))
+        report['ok'] = not rejections
+        return report
+
+    max_stream = config['max_stream_mb'] * MB
+    max_decoded = config['max_decoded_mb'] * MB
+    max_ratio = config['max_compression_ratio']
+    for xref in range(1, xref_length):
+        try:
+            obj = doc.xref_object(xref, compressed=True)
+        except RuntimeError:
+            continue
+        length = _read_int(doc, obj, 'Length') if "/Length" in obj else None
+        if length is None:
+            continue
+
+        stats['streams'] += 1
+        stats['stream_bytes'] += length
+        is_image = bool(_IMAGE_RE.search(obj))
+        pixels, decoded = _decoded_estimate(doc, obj, is_image)
+        if is_image:
+            stats['images'] += 1
+
+        if length > max_stream:
+            rejections.append(_issue('stream_size', f"Flux {xref} de {length / MB:.0f} Mo", xref=xref))
+        if pixels is not None and pixels > config['max_image_pixels']:
+            rejections.append(_issue('image_pixels', f"Image {xref} de {pixels / 1e6:.0f} mégapixels",
+                                     xref=xref))
+        if decoded:
+            stats['decoded_bytes_estimate'] += decoded
+            ratio = decoded / max(length, 1)
+            if decoded > max_decoded and ratio > max_ratio:
+                rejections.append(_issue('decompression_bomb',
+                                         f"Flux {xref}: {decoded / MB:.0f} Mo décodés pour "
+                                         f"{length / 1024:.0f} Ko", xref=xref))
+            elif ratio > max_ratio and not is_image:
+                flags.append(_issue('high_compression', f"Flux {xref} compressé {ratio:.0f}x", xref=xref))
+
+        filters = _FILTER_RE.search(obj)
+        if filters is not None and filters.group(1).count("/") > 2:
+            flags.append(_issue('nested_filters', f"Flux {xref}: filtres {filters.group(1)}", xref=xref))
+
+    if stats['decoded_bytes_estimate'] > config['max_total_decoded_mb'] * MB:
+        rejections.append(_issue('decompression_bomb',
+                                 f"{stats['decoded_bytes_estimate'] / MB:.0f} Mo décodés au total "
+                                 f"(maximum {config['max_total_decoded_mb']} Mo)"))
+
+    report['ok'] = not rejections
+    return report
+
+
+def preflight_pdf(pdf_path: str = None, stream: bytes = None, config: dict = None) -> dict:
+    """
+    Contrôle préalable d'un PDF (chemin ou contenu en mémoire), sans lever d'exception
+
+    Returns:
+        dict: {'ok', 'rejections', 'flags', 'stats', 'duration_ms'}; chaque
+        problème est un dict {'check', 'detail'[, 'xref']}
+    """
+    start = time.perf_counter()
+    try:
+        if stream is not None:
+            doc = fitz.open(stream=stream, filetype="pdf")
+        else:
+            doc = fitz.open(pdf_path, filetype="pdf")
+    except (RuntimeError, ValueError) as e:
+        report = {'ok': False, 'rejections': [_issue('unreadable', f"PDF illisible: {e}")],
+                  'flags': [], 'stats': {}}
+    else:
+        with doc:
+            report = preflight_document(doc, config)
+    report['duration_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    if not report['ok']:
+        logger.warning(f"🛑 Contrôle préalable: {summarize(report)}")
+    return report
+
+
+def summarize(report: dict) -> str:
+    """Motifs de refus lisibles (message d'erreur HTTP)"""
+    return "; ".join(issue['detail'] for issue in report['rejections'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôle préalable de PDF (sans décoder les flux)")
+    parser.add_argument("pdfs", nargs="+", help="Fichiers PDF")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args()
+
+    reports = {path: preflight_pdf(path) for path in args.pdfs}
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+        return
+    for path, report in reports.items():
+        status = "✅" if report['ok'] else "🛑"
+        flags = ", ".join(issue['check'] for issue in report['flags'])
+        print(f"{status} {path} ({report['duration_ms']} ms){' ⚠️ ' + flags if flags else ''}")
+        for issue in report['rejections']:
+            print(f"   - {issue['detail']}")
+
+
+if __name__ == "__main__":
+    main()
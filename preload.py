@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Préchargement des ressources partagées avant fork
+Importé par le maître gunicorn (preload_app) via main.py, et par le forkserver du
+pool de traitement : les processus créés ensuite partagent PyMuPDF, le module de
+traitement et le logo en copie sur écriture au lieu de les recharger chacun.
+"""
+
+import logging
+
+import fitz  # PyMuPDF
+from pdf_processor_complete import load_logo
+
+logger = logging.getLogger(__name__)
+
+
+def preload_resources(logo_path: str = "logo.png"):
+    """Charge une fois les ressources utilisées par chaque traitement"""
+    if load_logo(logo_path) is None:
+        logger.warning(f"Logo non préchargé (introuvable): {logo_path}")
+    logger.info(f"Ressources préchargées (PyMuPDF {fitz.VersionBind})")
+
+
+preload_resources()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Pool de processus pour le traitement des devis
+Chaque job PDF s'exécute dans un processus fils qui mesure sa consommation mémoire.
+Les processus sont recyclés après un nombre de jobs ou au-delà d'un plafond mémoire,
+car ni le cache de MuPDF ni l'allocateur Python ne rendent la mémoire au système.
+Un job qui dépasse son budget de temps est interrompu en tuant son processus
+(et les processus qu'il a lancés), qui est remplacé.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import logging
+from collections import deque
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashedError(RuntimeError):
+    """Le processus de traitement s'est arrêté pendant un job"""
+
+
+class JobTimeoutError(RuntimeError):
+    """Le job a dépassé son budget de temps: son processus a été tué"""
+
+
+def _read_proc_status_kb(field: str):
+    """Lit un champ mémoire (en kB) de /proc/self/status (Linux uniquement)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Remet à zéro le pic de RSS (VmHWM) du processus courant, si possible"""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def _mupdf_store_size():
+    """Taille actuelle du cache (store) de MuPDF en octets, None si indisponible"""
+    size = fitz.TOOLS.store_size
+    if callable(size):
+        size = size()
+    return size
+
+
+def memory_snapshot() -> dict:
+    """Mesure la mémoire du processus courant (en Mo) et la taille du store MuPDF"""
+    rss_kb = _read_proc_status_kb("VmRSS")
+    peak_kb = _read_proc_status_kb("VmHWM")
+    if peak_kb is None:
+        try:
+            import resource
+            peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            pass
+    store_size = _mupdf_store_size()
+    return {
+        'rss_mb': round(rss_kb / 1024, 1) if rss_kb is not None else None,
+        'peak_rss_mb': round(peak_kb / 1024, 1) if peak_kb is not None else None,
+        'mupdf_store_mb': round(store_size / (1024 * 1024), 1) if store_size is not None else None,
+    }
+
+
+def _worker_main(conn):
+    """Boucle d'un processus de traitement: exécute les jobs reçus par le pipe"""
+    # Groupe de processus propre: un dépassement de budget tue aussi les
+    # processus du mode parallèle lancés par le job
+    if hasattr(os, "setsid"):
+        os.setsid()
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        func, args, kwargs = message
+        _reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            result, error = func(*args, **kwargs), None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+
+        metrics = memory_snapshot()
+        metrics['duration'] = round(time.perf_counter() - start, 3)
+        metrics['pid'] = os.getpid()
+
+        # Vider le cache MuPDF: il n'est pas réutilisé d'un devis à l'autre
+        fitz.TOOLS.store_shrink(100)
+
+        conn.send((result, error, metrics))
+    conn.close()
+
+
+class _Worker:
+    """Processus de traitement et son canal de communication"""
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        # Non démoniaque: le mode parallèle de PDFProcessorComplete lance ses propres processus
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=False)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.last_rss_mb = None
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def kill(self):
+        """Tue le processus et son groupe (job en cours abandonné)"""
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self, timeout=5):
+        """Arrête proprement le processus, ou le tue s'il ne répond plus"""
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ProcessingPool:
+    """Pool de processus de traitement avec comptabilité mémoire et recyclage"""
+
+    def __init__(self, num_workers: int = 2, max_jobs_per_worker: int = 50,
+                 memory_limit_mb: float = None, job_timeout: float = None,
+                 history_size: int = 200):
+        """
+        Initialise le pool (les processus sont lancés par start())
+
+        Args:
+            num_workers: Nombre de processus de traitement
+            max_jobs_per_worker: Nombre de jobs avant recyclage d'un processus (0 = illimité)
+            memory_limit_mb: Plafond de RSS par processus au-delà duquel il est recyclé
+            job_timeout: Budget de temps d'un job en secondes (None = illimité)
+            history_size: Nombre de mesures par requête conservées pour /metrics
+        """
+        self.num_workers = max(1, num_workers)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.memory_limit_mb = memory_limit_mb
+        self.job_timeout = job_timeout
+
+        self._ctx = self._get_context()
+        self._idle = queue.Queue()
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+        self.history = deque(maxlen=history_size)
+        self.stats = {
+            'jobs_total': 0,
+            'jobs_failed': 0,
+            'jobs_timed_out': 0,
+            'recycled': {'max_jobs': 0, 'memory': 0, 'crash': 0, 'timeout': 0},
+        }
+
+    @staticmethod
+    def _get_context():
+        """forkserver quand il existe: les processus partagent les ressources préchargées"""
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("forkserver")
+            ctx.set_forkserver_preload(["preload"])
+            return ctx
+        return multiprocessing.get_context("spawn")
+
+    def start(self):
+        """Lance les processus de traitement"""
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.num_workers):
+                self._spawn_worker()
+            self._started = True
+        logger.info(f"Pool de traitement démarré: {self.num_workers} processus")
+
+    def shutdown(self):
+        """Arrête tous les processus de traitement"""
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+            self._started = False
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for worker in workers:
+            worker.stop()
+        logger.info("Pool de traitement arrêté")
+
+    def _spawn_worker(self):
+        worker = _Worker(self._ctx)
+        self._workers[worker.pid] = worker
+        self._idle.put(worker)
+        return worker
+
+    def _recycle(self, worker, reason: str):
+        """Remplace un processus par un nouveau (tué sans attendre s'il a dépassé son budget)"""
+        logger.info(f"♻️ Recyclage du processus {worker.pid} ({reason}, {worker.jobs} jobs)")
+        with self._lock:
+            self._workers.pop(worker.pid, None)
+            self.stats['recycled'][reason] += 1
+            started = self._started
+        if reason == 'timeout':
+            worker.kill()
+        else:
+            worker.stop()
+        if started:
+            with self._lock:
+                self._spawn_worker()
+
+    def _recycle_reason(self, worker):
+        if self.max_jobs_per_worker and worker.jobs >= self.max_jobs_per_worker:
+            return 'max_jobs'
+        if (self.memory_limit_mb and worker.last_rss_mb is not None
+                and worker.last_rss_mb > self.memory_limit_mb):
+            return 'memory'
+        return None
+
+    def run(self, func, *args, **kwargs):
+        """
+        Exécute func(*args, **kwargs) dans un processus du pool (appel bloquant),
+        dans le budget de temps job_timeout
+
+        Args:
+            func: Fonction importable au niveau d'un module (elle est picklée)
+
+        Returns:
+            tuple: (résultat de func, mesures mémoire et durée du job)
+
+        Raises:
+            JobTimeoutError: Si le job dépasse job_timeout
+        """
+        return self.run_with_budget(self.job_timeout, func, *args, **kwargs)
+
+    def run_with_budget(self, budget, func, *args, **kwargs):
+        """
+        Comme run(), avec un budget de temps explicite en secondes (None = illimité),
+        par exemple proportionnel au nombre de fichiers d'un lot
+        """
+        if not self._started:
+            self.start()
+
+        worker = self._idle.get()
+        try:
+            worker.conn.send((func, args, kwargs))
+            # Le budget court à partir de l'envoi: l'attente d'un processus libre n'est pas comptée
+            finished = worker.conn.poll(budget)
+            if finished:
+                result, error, metrics = worker.conn.recv()
+        except (EOFError, OSError):
+            with self._lock:
+                self.stats['jobs_failed'] += 1
+            self._recycle(worker, 'crash')
+            raise WorkerCrashedError(f"Le processus {worker.pid} s'est arrêté pendant le traitement")
+        except Exception:
+            # Job impossible à envoyer (pickle) ou réponse illisible: le processus
+            # ne doit pas sortir du pool, et sa connexion n'est plus sûre
+            with self._lock:
+                self.stats['jobs_failed'] += 1
+            self._recycle(worker, 'crash')
+            raise
+        except BaseException:
+            self._recycle(worker, 'crash')
+            raise
+
+        if not finished:
+            with self._lock:
+                self.stats['jobs_failed'] += 1
+                self.stats['jobs_timed_out'] += 1
+            logger.warning(f"⏱️ Job interrompu après {budget}s (processus {worker.pid})")
+            self._recycle(worker, 'timeout')
+            raise JobTimeoutError(f"Traitement interrompu: budget de {budget} secondes dépassé")
+
+        worker.jobs += 1
+        worker.last_rss_mb = metrics['rss_mb']
+        self._record(metrics, failed=error is not None)
+
+        reason = self._recycle_reason(worker)
+        if reason:
+            self._recycle(worker, reason)
+        else:
+            self._idle.put(worker)
+
+        if error:
+            raise RuntimeError(error)
+        return result, metrics
+
+    def _record(self, metrics: dict, failed: bool = False):
+        with self._lock:
+            self.stats['jobs_total'] += 1
+            if failed:
+                self.stats['jobs_failed'] += 1
+            self.history.append(metrics)
+
+    def get_stats(self) -> dict:
+        """Statistiques du pool pour le dimensionnement (exposées par /metrics)"""
+        with self._lock:
+            history = list(self.history)
+            workers = [{'pid': w.pid, 'jobs': w.jobs, 'rss_mb': w.last_rss_mb}
+                       for w in self._workers.values()]
+            stats = {
+                'num_workers': self.num_workers,
+                'max_jobs_per_worker': self.max_jobs_per_worker,
+                'memory_limit_mb': self.memory_limit_mb,
+                'job_timeout': self.job_timeout,
+                'jobs_total': self.stats['jobs_total'],
+                'jobs_failed': self.stats['jobs_failed'],
+                'jobs_timed_out': self.stats['jobs_timed_out'],
+                'recycled': dict(self.stats['recycled']),
+                'workers': workers,
+            }
+
+        def summary(key):
+            values = [m[key] for m in history if m.get(key) is not None]
+            if not values:
+                return None
+            return {'avg': round(sum(values) / len(values), 3), 'max': max(values)}
+
+        stats['recent_jobs'] = {
+            'count': len(history),
+            'duration': summary('duration'),
+            'peak_rss_mb': summary('peak_rss_mb'),
+            'rss_mb': summary('rss_mb'),
+            'mupdf_store_mb': summary('mupdf_store_mb'),
+        }
+        return stats
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Extraction des données structurées d'un devis (client, référence, date,
+articles, totaux, acomptes) pour le CRM et la facturation
+Le total TTC et les acomptes sont lus et calculés comme dans
+PDFProcessorComplete._process_payments, les articles et totaux comme dans
+line_items.py.
+"""
+
+import re
+import logging
+
+import fitz  # PyMuPDF
+from line_items import LineItemExtractor, parse_amount, verify_totals
+from text_cache import TextPageCache
+
+try:
+    from config import EXTRACTION_CONFIG
+except ImportError:
+    EXTRACTION_CONFIG = {
+        'fields': {
+            'reference': [r"Code Unique du Devis\s*:?\s*(\S+)", r"DEVIS\s*N[°o]\s*:?\s*(\S+)"],
+            'date': [r"Date(?: actuelle| du devis)?\s*:?\s*(\d{2}/\d{2}/\d{4})", r"\b(\d{2}/\d{2}/\d{4})\b"],
+            'client': [r"Client\s*:\s*(.+)", r"(?:M\.|Mme|Mlle|Monsieur|Madame)\s+.+"],
+            'client_code': [r"Code client\s*:?\s*(\S+)"],
+        },
+        'payment_anchor': 'ACOMPTE 30%',
+    }
+
+logger = logging.getLogger(__name__)
+
+# Version du format extrait: change la clé des extractions mises en cache
+EXTRACTION_VERSION = 1
+
+# Échéancier des acomptes (part du TTC)
+PAYMENT_SCHEDULE = {
+    'acompte_30': 0.30,
+    'acompte_50': 0.50,
+    'solde_20': 0.20,
+}
+
+
+def find_total_ttc(page, anchor: str = "ACOMPTE 30%", texts=None) -> float:
+    """
+    Total TTC lu juste avant la ligne d'ancre des acomptes
+
+    Args:
+        texts: TextPageCache partagé du document (optionnel)
+
+    Raises:
+        ValueError: Si l'ancre est absente ou le montant illisible
+    """
+    text = texts.text(page) if texts is not None else page.get_text()
+    lines = text.splitlines()
+    i = lines.index(anchor)
+    if i == 0:
+        raise ValueError(f"Aucun montant avant '{anchor}'")
+    return parse_amount(lines[i - 1])
+
+
+def compute_payments(total_ttc: float) -> dict:
+    """Acomptes et solde arrondis au centime"""
+    return {name: round(total_ttc * share, 2) for name, share in PAYMENT_SCHEDULE.items()}
+
+
+def _match_field(patterns: list, text: str):
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            value = match.group(1) if match.groups() else match.group(0)
+            return value.strip()
+    return None
+
+
+def extract_quote_data(doc, anchor: str = None, config: dict = None, texts=None) -> dict:
+    """
+    Données structurées d'un devis ouvert (chaque page analysée une seule fois)
+
+    Args:
+        texts: TextPageCache partagé du document (créé et libéré ici sinon)
+
+    Returns:
+        dict: {'client', 'client_code', 'reference', 'date', 'items', 'totals',
+               'acomptes', 'totals_check', 'num_pages'}
+    """
+    if texts is None:
+        with TextPageCache(doc) as texts:
+            return extract_quote_data(doc, anchor, config, texts)
+
+    config = config or EXTRACTION_CONFIG
+    anchor = anchor or config['payment_anchor']
+    first_page_text = texts.text(0)
+
+    data = {name: _match_field(patterns, first_page_text)
+            for name, patterns in config['fields'].items()}
+
+    table = LineItemExtractor().extract(doc, texts)
+    items = table['items']
+    data['items'] = [
+        {'designation': designation, 'quantity': float(item['quantity']),
+         'unit_price': float(item['unit_price']), 'total': float(item['total']),
+         'page': int(item['page'])}
+        for item, designation in zip(items, table['designations'])
+    ]
+    totals = dict(table['totals'])
+
+    # Même lecture du TTC que _process_payments
+    try:
+        totals['total_ttc'] = find_total_ttc(doc[-1], anchor, texts)
+    except ValueError as e:
+        logger.info(f"Ancre des acomptes introuvable ({e})")
+    data['totals'] = totals
+    data['acomptes'] = compute_payments(totals['total_ttc']) if 'total_ttc' in totals else None
+    data['totals_check'] = verify_totals(items, totals, table['designations']) if len(items) else None
+    data['num_pages'] = len(doc)
+    data['version'] = EXTRACTION_VERSION
+    return data
+
+
+def extract_quote_file(pdf_path: str) -> dict:
+    """Données structurées d'un devis sur disque (job du pool de traitement)"""
+    with fitz.open(pdf_path) as doc:
+        return extract_quote_data(doc)
+
+
+def extract_quote_files(entries: list) -> list:
+    """
+    Extraction en lot, sans lever d'exception
+
+    Args:
+        entries: Couples (identifiant, chemin)
+
+    Returns:
+        list: Données de chaque devis avec 'source_id' ('error' en cas d'échec)
+    """
+    results = []
+    for source_id, pdf_path in entries:
+        try:
+            results.append(dict(extract_quote_file(pdf_path), source_id=source_id))
+        except Exception as e:
+            results.append({'source_id': source_id, 'error': str(e)})
+    return results
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Masquage des zones d'une page (en-tête, bannière ADF)
+Le journal des boîtes englobantes de la page (get_bboxlog: texte, images,
+tracés, sans rendu) indique quelles zones recouvrent réellement du contenu;
+une page dont aucune zone n'est occupée n'est pas réécrite par
+apply_redactions(), l'opération coûteuse du nettoyage.
+
+Chaque zone choisit le sort des images qu'elle touche (clé 'images'):
+'none' les laisse intactes sous le remplissage, 'remove' supprime l'image
+entière, 'pixels' efface les pixels de la zone (image réencodée, coûteux
+pour les photos). 'remove' ne s'applique qu'aux images majoritairement
+dans la zone: une image qui la déborde largement (page scannée, fond de
+page) passe en 'pixels' plutôt que de disparaître entière.
+"""
+
+import logging
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MODES = {
+    'none': fitz.PDF_REDACT_IMAGE_NONE,
+    'remove': fitz.PDF_REDACT_IMAGE_REMOVE,
+    'pixels': fitz.PDF_REDACT_IMAGE_PIXELS,
+}
+
+# Comportement de apply_redactions() sans précision
+DEFAULT_IMAGE_MODE = 'pixels'
+
+_IMAGE_BOX_TYPES = ('fill-image', 'fill-imgmask')
+
+# Part minimale d'une image dans une zone 'remove' pour la supprimer entière
+REMOVE_MIN_INSIDE = 0.5
+
+
+def content_boxes(page) -> list:
+    """Boîtes englobantes du contenu de la page (texte, images, tracés)"""
+    return [fitz.Rect(bbox) for _, bbox in page.get_bboxlog()]
+
+
+def occupied_zones(page, zones: list, boxes: list = None) -> list:
+    """Zones ({'rect': ...}) qui recouvrent au moins un élément de contenu"""
+    if boxes is None:
+        boxes = content_boxes(page)
+    occupied = []
+    for zone in zones:
+        rect = fitz.Rect(zone['rect'])
+        if any(rect.intersects(box) for box in boxes):
+            occupied.append(zone)
+    return occupied
+
+
+def image_mode(zone: dict, default: str = DEFAULT_IMAGE_MODE) -> str:
+    """Traitement des images d'une zone ('none', 'remove' ou 'pixels')"""
+    mode = zone.get('images', default)
+    if mode not in IMAGE_MODES:
+        raise ValueError(f"Traitement d'image inconnu pour '{zone.get('description', zone['rect'])}': {mode}")
+    return mode
+
+
+def validate_zones(zones: list, default: str = DEFAULT_IMAGE_MODE):
+    """Vérifie le traitement d'image de chaque zone (ValueError au premier inconnu)"""
+    for zone in zones:
+        image_mode(zone, default)
+
+
+def redact_zones(page, zones: list, fill=(1, 1, 1), default_image_mode: str = DEFAULT_IMAGE_MODE) -> list:
+    """
+    Masque les zones occupées d'une page
+
+    Les zones qui ne touchent aucune image rejoignent le passage d'une autre
+    zone: un seul apply_redactions() par traitement d'image réellement utilisé.
+
+    Returns:
+        list: Zones masquées (vide: page laissée intacte)
+    """
+    if not zones:
+        return []
+    # Toutes les zones, même vides ou sans image: une faute de frappe échoue sur tout document
+    validate_zones(zones, default_image_mode)
+    log = page.get_bboxlog()
+    occupied = occupied_zones(page, zones, [fitz.Rect(bbox) for _, bbox in log])
+    if not occupied:
+        return []
+    image_boxes = [fitz.Rect(bbox) for kind, bbox in log if kind in _IMAGE_BOX_TYPES]
+
+    passes, without_images = {}, []
+    for zone in occupied:
+        rect = fitz.Rect(zone['rect'])
+        touched = [box for box in image_boxes if rect.intersects(box)]
+        if not touched:
+            without_images.append(zone)
+            continue
+        mode = image_mode(zone, default_image_mode)
+        if mode == 'remove' and any(
+            (box & rect).get_area() < REMOVE_MIN_INSIDE * box.get_area() for box in touched
+        ):
+            # Supprimer l'image entière effacerait bien plus que la zone
+            logger.debug(f"Image débordant de '{zone.get('description', zone['rect'])}': pixels effacés")
+            mode = 'pixels'
+        passes.setdefault(mode, []).append(zone)
+    if not passes:
+        passes['none'] = []
+    passes[next(iter(passes))].extend(without_images)
+
+    for mode, mode_zones in passes.items():
+        for zone in mode_zones:
+            page.add_redact_annot(fitz.Rect(zone['rect']), fill=fill)
+        page.apply_redactions(images=IMAGE_MODES[mode])
+    return occupied
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Stockage des fichiers traités, adressés par leur empreinte SHA-256
+Les fichiers sont écrits sur disque (partagés par tous les workers) et supprimés
+après expiration. Les téléchargements passent par des jetons opaques qui
+expirent, sans exposer l'empreinte ni de chemin.
+"""
+
+import hashlib
+import json
+import os
+import re
+import secrets
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{32}$")
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Empreinte SHA-256 hexadécimale d'un contenu"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultStore:
+    """Stockage disque adressé par contenu, avec expiration"""
+
+    def __init__(self, root: str = "storage", ttl: int = 3600, cleanup_interval: int = 300,
+                 kind_ttls: dict = None):
+        """
+        Initialise le stockage
+
+        Args:
+            root: Répertoire racine du stockage
+            ttl: Durée de conservation d'un fichier en secondes
+            cleanup_interval: Intervalle minimal entre deux nettoyages
+            kind_ttls: Durées de conservation propres à certaines catégories ({'quarantine': ...})
+        """
+        self.root = root
+        self.ttl = ttl
+        self.kind_ttls = kind_ttls or {}
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def is_valid_digest(digest: str) -> bool:
+        """Vérifie qu'un identifiant est bien une empreinte (pas un chemin)"""
+        return bool(_DIGEST_RE.match(digest or ""))
+
+    def ttl_for(self, kind: str) -> int:
+        """Durée de conservation des fichiers d'une catégorie"""
+        return self.kind_ttls.get(kind, self.ttl)
+
+    def _path(self, kind: str, digest: str) -> str:
+        return os.path.join(self.root, kind, digest)
+
+    def put(self, kind: str, data: bytes, digest: str = None) -> str:
+        """
+        Enregistre un contenu et retourne son empreinte
+
+        Args:
+            kind: Catégorie de fichier ('results', 'sources', ...)
+            data: Contenu à stocker
+            digest: Clé imposée (ex. empreinte de la source d'une donnée dérivée)
+
+        Returns:
+            str: Empreinte SHA-256 du contenu (ou clé imposée)
+        """
+        digest = digest or sha256_bytes(data)
+        path = self._path(kind, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if os.path.exists(path):
+            # Déjà présent: prolonger sa durée de vie
+            os.utime(path)
+        else:
+            # Écriture atomique: un autre worker ne lit jamais un fichier partiel
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        self.cleanup()
+        return digest
+
+    def path(self, kind: str, digest: str):
+        """Chemin du fichier s'il existe et n'a pas expiré, None sinon"""
+        if not self.is_valid_digest(digest):
+            return None
+        path = self._path(kind, digest)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_for(kind):
+                return None
+        except OSError:
+            return None
+        return path
+
+    def get(self, kind: str, digest: str):
+        """Contenu d'un fichier stocké, None s'il n'existe pas ou a expiré"""
+        path = self.path(kind, digest)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def issue_token(self, kind: str, digest: str, filename: str, ttl: int = None) -> str:
+        """
+        Crée un jeton de téléchargement opaque pour un fichier stocké
+
+        Args:
+            kind: Catégorie du fichier
+            digest: Empreinte du fichier
+            filename: Nom proposé au téléchargement
+            ttl: Durée de validité en secondes (au plus celle du stockage)
+
+        Returns:
+            str: Jeton à utiliser dans /download/{jeton}
+        """
+        ttl = min(ttl or self.ttl_for(kind), self.ttl_for(kind))
+        token = secrets.token_urlsafe(24)
+        record = {'kind': kind, 'digest': digest, 'filename': filename,
+                  'expires': time.time() + ttl}
+        path = self._path("tokens", token)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return token
+
+    def resolve_token(self, token: str):
+        """
+        Retrouve le fichier d'un jeton de téléchargement
+
+        Returns:
+            dict: {'path', 'digest', 'filename', 'expires'} ou None si le jeton
+            est inconnu, expiré, ou si le fichier a disparu
+        """
+        if not _TOKEN_RE.match(token or ""):
+            return None
+        try:
+            with open(self._path("tokens", token), encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record['expires'] < time.time():
+            return None
+        path = self.path(record['kind'], record['digest'])
+        if path is None:
+            return None
+        return {'path': path, 'digest': record['digest'],
+                'filename': record['filename'], 'expires': record['expires']}
+
+    def cleanup(self, force: bool = False):
+        """Supprime les fichiers expirés (au plus une fois par cleanup_interval)"""
+        now = time.time()
+        if not force and now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+
+        for kind in os.listdir(self.root):
+            kind_dir = os.path.join(self.root, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            ttl = self.ttl_for(kind)
+            for filename in os.listdir(kind_dir):
+                file_path = os.path.join(kind_dir, filename)
+                try:
+                    if now - os.path.getmtime(file_path) > ttl:
+                        os.remove(file_path)
+                except OSError as e:
+                    logger.warning(f"Impossible de supprimer {file_path}: {e}")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Calculs partagés entre requêtes identiques simultanées (« single-flight »)
+Tant qu'un calcul est en cours pour une clé (empreinte du devis + options de
+traitement), les requêtes suivantes de même clé l'attendent au lieu d'en
+lancer un second, et reçoivent toutes son résultat ou son erreur. La clé est
+oubliée dès la fin du calcul: la requête identique suivante recalcule.
+
+Le calcul tourne dans sa propre tâche asyncio: une requête abandonnée
+(client déconnecté) ne l'annule pas pour celles qui l'attendent encore.
+SingleFlight partage le calcul dans un worker web (une boucle asyncio);
+FlightLocks sérialise les calculs de même clé entre workers (verrou flock sur
+un fichier par clé): le worker qui a attendu relit le résultat enregistré
+par le premier au lieu de recalculer.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+
+
+def flight_key(content_id: str, options: dict) -> str:
+    """Clé d'un calcul: empreinte du contenu et options qui influent sur le résultat"""
+    encoded = json.dumps(options, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{content_id}:{encoded}".encode()).hexdigest()
+
+
+class SingleFlight:
+    """Calculs en cours par clé, dans la boucle asyncio du worker web"""
+
+    def __init__(self):
+        self._tasks = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, factory) -> tuple:
+        """
+        Exécute factory() pour cette clé, ou rejoint le calcul déjà en cours
+
+        Args:
+            key: Clé du calcul (voir flight_key)
+            factory: Fonction sans argument renvoyant la coroutine du calcul
+
+        Returns:
+            tuple: (résultat, partagé) — partagé vaut True si la requête a
+                   rejoint le calcul d'une autre
+        """
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: str, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Erreur consultée même si toutes les requêtes ont été abandonnées
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._tasks
+
+    def get_stats(self) -> dict:
+        return {
+            'in_flight': len(self._tasks),
+            'started': self.started,
+            'coalesced': self.coalesced,
+        }
+
+
+class FlightLocks:
+    """Verrous de calcul partagés entre processus: un fichier verrouillé (flock) par clé"""
+
+    def __init__(self, root: str, poll_interval: float = 0.1):
+        """
+        Args:
+            root: Répertoire des fichiers de verrou (commun à tous les workers)
+            poll_interval: Intervalle entre deux tentatives pendant l'attente, en secondes
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.acquired = 0
+        self.waited = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.lock")
+
+    def try_acquire(self, key: str):
+        """
+        Prend le verrou d'une clé sans attendre
+
+        Returns:
+            Fichier verrouillé (à rendre à release), ou None si un autre le détient
+        """
+        path = self._path(key)
+        while True:
+            handle = open(path, "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                return None
+            # Fichier supprimé par le détenteur précédent entre open et flock: recommencer
+            try:
+                if os.fstat(handle.fileno()).st_ino == os.stat(path).st_ino:
+                    self.acquired += 1
+                    return handle
+            except FileNotFoundError:
+                pass
+            handle.close()
+
+    async def acquire(self, key: str) -> tuple:
+        """
+        Prend le verrou d'une clé, en attendant que son détenteur le rende
+
+        Returns:
+            tuple: (fichier verrouillé, attendu) — attendu vaut True si un autre
+                   processus détenait le verrou
+        """
+        waited = False
+        while True:
+            handle = self.try_acquire(key)
+            if handle is not None:
+                if waited:
+                    self.waited += 1
+                return handle, waited
+            waited = True
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self, key: str, handle):
+        """Rend le verrou (le fichier est supprimé avant d'être déverrouillé)"""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        handle.close()
+
+    def get_stats(self) -> dict:
+        return {
+            'locks_acquired': self.acquired,
+            'locks_waited': self.waited,
+        }
@@ -37,8 +37,17 @@ def create_directories():
         Path(directory).mkdir(exist_ok=True)
     print("📁 Répertoires créés/vérifiés")
 
+def start_production():
+    """Démarre l'application en production (gunicorn, plusieurs workers, préchargement)"""
+    print("🚀 Démarrage en production avec gunicorn (gunicorn.conf.py)...")
+    try:
+        os.execvp("gunicorn", ["gunicorn", "main:app", "-c", "gunicorn.conf.py"])
+    except OSError as e:
+        print(f"❌ Impossible de lancer gunicorn: {e}")
+        print("💡 gunicorn n'est pas disponible sous Windows, utilisez le mode développement")
+
 def start_application():
-    """Démarre l'application FastAPI"""
+    """Démarre l'application FastAPI (développement, rechargement automatique)"""
     print("🚀 Démarrage de l'application...")
     print("📍 URL: http://localhost:8000")
     print("⏹️  Appuyez sur Ctrl+C pour arrêter")
@@ -75,7 +84,10 @@ def main():
     create_directories()
     
     # Démarrer l'application
-    start_application()
+    if "--prod" in sys.argv:
+        start_production()
+    else:
+        start_application()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Registre des modèles de devis (générations ADF, autres fournisseurs)
+Chaque document est identifié par une empreinte peu coûteuse (taille de page,
+producteur, mise en page de la page 1, sans extraction de texte) qui sélectionne
+un plan précompilé : zones à nettoyer, ancre des acomptes et positions d'insertion.
+Les empreintes inconnues sont signalées et journalisées.
+
+Usage:
+    python template_registry.py fingerprint devis.pdf [...]
+    python template_registry.py register devis.pdf --name "ADF 2024" [--detect]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+
+import fitz  # PyMuPDF
+from zone_detector import layout_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def template_fingerprint(doc) -> str:
+    """Empreinte du modèle d'un document: taille de page, producteur et mise en page"""
+    page1 = doc[0]
+    metadata = doc.metadata or {}
+    key = {
+        'size': (round(page1.rect.width), round(page1.rect.height)),
+        'producer': metadata.get('producer') or '',
+        'creator': metadata.get('creator') or '',
+        'layout': layout_fingerprint(page1),
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def compile_plan(name: str, plan: dict) -> dict:
+    """Valide et normalise un plan du registre (rectangles et positions en tuples)"""
+    compiled = {'name': name}
+
+    zones = plan.get('zones')
+    if zones is not None:
+        compiled['zones'] = {
+            scope: [dict(zone, rect=tuple(float(v) for v in zone['rect'])) for zone in scope_zones]
+            for scope, scope_zones in zones.items()
+        }
+        for scope_zones in compiled['zones'].values():
+            for zone in scope_zones:
+                if len(zone['rect']) != 4:
+                    raise ValueError(f"Modèle {name}: rectangle invalide {zone['rect']}")
+
+    layout = plan.get('payment_layout')
+    if layout is not None:
+        compiled['payment_layout'] = {
+            key: tuple(value) if isinstance(value, list) else value
+            for key, value in layout.items()
+        }
+    return compiled
+
+
+class TemplateRegistry:
+    """Registre indexé par empreinte des plans de traitement précompilés"""
+
+    def __init__(self, path: str = "templates.json", unknown_log: str = "plans/unknown_templates.jsonl"):
+        """
+        Initialise le registre
+
+        Args:
+            path: Fichier JSON des modèles {"templates": {empreinte: {"name", "zones", "payment_layout"}}}
+            unknown_log: Journal des empreintes inconnues (une ligne JSON par modèle)
+        """
+        self.path = path
+        self.unknown_log = unknown_log
+        self._index = {}
+        self._mtime = None
+        self._unknown_seen = set()
+        self._lock = threading.Lock()
+
+    def _reload_if_changed(self):
+        """Recharge et recompile le registre si le fichier a changé"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        index = {}
+        if mtime is not None:
+            with open(self.path, encoding="utf-8") as f:
+                templates = json.load(f).get('templates', {})
+            for fingerprint, plan in templates.items():
+                index[fingerprint] = compile_plan(plan.get('name', fingerprint), plan)
+            logger.info(f"Registre des modèles chargé: {len(index)} modèles")
+        self._index = index
+        self._mtime = mtime
+
+    def match(self, doc):
+        """
+        Cherche le plan du modèle d'un document
+
+        Returns:
+            tuple: (empreinte, plan compilé ou None si le modèle est inconnu)
+        """
+        fingerprint = template_fingerprint(doc)
+        with self._lock:
+            self._reload_if_changed()
+            plan = self._index.get(fingerprint)
+        if plan is None:
+            self._flag_unknown(fingerprint, doc)
+        return fingerprint, plan
+
+    def _flag_unknown(self, fingerprint: str, doc):
+        """Journalise une empreinte inconnue (une fois par processus)"""
+        metadata = doc.metadata or {}
+        logger.warning(f"⚠️ Modèle de devis inconnu: {fingerprint} "
+                       f"(producteur: {metadata.get('producer') or '?'})")
+        with self._lock:
+            if fingerprint in self._unknown_seen:
+                return
+            self._unknown_seen.add(fingerprint)
+        try:
+            os.makedirs(os.path.dirname(self.unknown_log) or ".", exist_ok=True)
+            with open(self.unknown_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    'fingerprint': fingerprint,
+                    'producer': metadata.get('producer'),
+                    'creator': metadata.get('creator'),
+                    'page_size': [round(doc[0].rect.width), round(doc[0].rect.height)],
+                    'seen_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"Impossible de journaliser le modèle inconnu: {e}")
+
+    def register(self, fingerprint: str, name: str, plan: dict):
+        """Ajoute ou remplace un modèle dans le fichier du registre"""
+        compile_plan(name, plan)  # valider avant d'écrire
+        with self._lock:
+            templates = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    templates = json.load(f).get('templates', {})
+            templates[fingerprint] = dict(plan, name=name)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({'templates': templates}, f, indent=2, ensure_ascii=False)
+            self._mtime = None
+
+
+_registry = None
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Registre partagé par tous les traitements du processus"""
+    global _registry
+    if _registry is None:
+        _registry = TemplateRegistry()
+    return _registry
+
+
+if __name__ == "__main__":
+    from pdf_processor_complete import PDFProcessorComplete
+    from zone_detector import ZoneDetector
+
+    parser = argparse.ArgumentParser(description="Registre des modèles de devis")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    fingerprint_parser = subparsers.add_parser("fingerprint", help="Afficher l'empreinte de PDF")
+    fingerprint_parser.add_argument("pdf", nargs="+")
+    register_parser = subparsers.add_parser("register", help="Enregistrer le modèle d'un PDF")
+    register_parser.add_argument("pdf")
+    register_parser.add_argument("--name", required=True)
+    register_parser.add_argument("--detect", action="store_true",
+                                 help="Ajuster les zones au document (zone_detector.py)")
+    args = parser.parse_args()
+
+    registry = get_template_registry()
+    if args.command == "fingerprint":
+        for pdf_path in args.pdf:
+            with fitz.open(pdf_path) as doc:
+                fingerprint, plan = registry.match(doc)
+            print(f"{fingerprint}  {plan['name'] if plan else 'inconnu'}  {pdf_path}")
+    else:
+        processor = PDFProcessorComplete()
+        with fitz.open(args.pdf) as doc:
+            fingerprint = template_fingerprint(doc)
+            zones = processor.zones_to_clean
+            if args.detect:
+                zones = ZoneDetector().detect(doc[0], zones)
+        registry.register(fingerprint, args.name, {
+            'zones': zones,
+            'payment_layout': processor.payment_layout,
+        })
+        print(f"✅ Modèle '{args.name}' enregistré: {fingerprint}")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Script de test du contrôle d'admission des traitements
+"""
+
+from admission import AdmissionController, AdmissionSlot
+
+def test_admission():
+    """Au-delà des traitements en cours et de la file, les requêtes sont refusées avec un délai estimé"""
+
+    print("🚦 Test du contrôle d'admission")
+    print("=" * 40)
+
+    admission = AdmissionController(max_active=2, max_queued=3, default_duration=4.0)
+    admis = [admission.try_acquire() for _ in range(7)]
+    assert admis == [True] * 5 + [False] * 2
+    assert admission.get_stats()['rejected'] == 2
+    # 5 traitements admis, 2 processus: un nouveau démarrerait après 2 vagues de 4 s
+    assert admission.retry_after() == 8
+    print("   ✅ Capacité respectée, Retry-After estimé sans historique")
+
+    for _ in range(5):
+        admission.release(duration=1.5)
+    assert admission.try_acquire()
+    assert admission.get_stats()['typical_duration'] == 1.5
+    assert admission.retry_after() == 2
+    print("   ✅ Places libérées, estimation d'après les durées récentes")
+    return True
+
+def test_duree_des_refus():
+    """Seules les places dont le traitement a atteint le pool alimentent l'estimation"""
+
+    admission = AdmissionController(max_active=1, max_queued=1, default_duration=4.0)
+    for reached_pool in (False, True):
+        assert admission.try_acquire()
+        slot = AdmissionSlot(admission)
+        if reached_pool:
+            slot.mark_reached_pool()
+        slot.release()
+    assert len(admission._durations) == 1 and admission.get_stats()['in_flight'] == 0
+    assert admission.typical_duration() < 1
+    print("   ✅ Refus immédiats libérés sans fausser la durée typique")
+    return True
+
+if __name__ == "__main__":
+    test_admission()
+    test_duree_des_refus()
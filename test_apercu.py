@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Script de test des aperçus de pages (pdf_preview.py et /preview/{result_id})
+"""
+
+import io
+import os
+
+import fitz  # PyMuPDF
+from PIL import Image
+from pdf_preview import PreviewCache, render_page
+
+def creer_devis(num_pages=2):
+    """Devis A4 de quelques pages, en octets"""
+    doc = fitz.open()
+    for page_num in range(num_pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 100), f"Devis - page {page_num + 1}", fontsize=14)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def taille_image(image):
+    return Image.open(io.BytesIO(image)).size
+
+def test_rendu_page():
+    """Taille rendue selon le DPI, découpe, plafond de pixels et pages inexistantes"""
+
+    print("🖼️ Test du rendu des aperçus")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    pdf_path = os.path.join("output", "apercu_test.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(creer_devis())
+
+    image = render_page(pdf_path, 1, dpi=72)
+    assert image.startswith(b"\x89PNG")
+    assert taille_image(image) == (595, 842)
+    assert taille_image(render_page(pdf_path, 2, dpi=36)) == (298, 421)
+    print("   ✅ Taille proportionnelle au DPI (72 dpi: 1 pixel par point)")
+
+    image = render_page(pdf_path, 1, dpi=144, clip=(0, 0, 100, 50))
+    assert taille_image(image) == (200, 100)
+    webp = render_page(pdf_path, 1, dpi=36, fmt="webp")
+    assert webp[8:12] == b"WEBP"
+    print("   ✅ Découpe et format WebP")
+
+    # 200 dpi: ~7,7 millions de pixels, ramenés sous le plafond
+    width, height = taille_image(render_page(pdf_path, 1, dpi=200, max_pixels=1_000_000))
+    assert width * height <= 1_000_000
+    assert width * height > 900_000
+    print(f"   ✅ Plafond de pixels: {width}x{height}")
+
+    for page_number in (0, 3):
+        try:
+            render_page(pdf_path, page_number)
+            assert False, "page inexistante rendue"
+        except IndexError:
+            pass
+    for fmt, clip in (("gif", None), ("png", (700, 900, 800, 1000))):
+        try:
+            render_page(pdf_path, 1, fmt=fmt, clip=clip)
+            assert False, "format ou découpe invalide accepté"
+        except ValueError:
+            pass
+    print("   ✅ Page, format et découpe invalides refusés")
+    return True
+
+def test_cache_apercus():
+    """Succès, échecs et éviction LRU bornée en octets"""
+
+    print("🗃️ Test du cache des aperçus")
+    print("=" * 40)
+
+    cache = PreviewCache(max_bytes=250)
+    assert cache.get("a") is None
+    cache.put("a", b"x" * 100)
+    cache.put("b", b"y" * 100)
+    assert cache.get("a") == b"x" * 100
+    # "b" est le moins récemment utilisé: c'est lui qui part
+    cache.put("c", b"z" * 100)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get_stats() == {'entries': 2, 'bytes': 200, 'hits': 3, 'misses': 2}
+    print("   ✅ Éviction du moins récent, taille bornée")
+
+    cache.put("gros", b"g" * 1000)
+    assert cache.get_stats()['bytes'] == 0
+    print("   ✅ Aperçu plus gros que le cache non conservé")
+    return True
+
+def test_endpoint_apercu():
+    """/preview/{result_id}: image servie puis relue depuis le cache, paramètres vérifiés"""
+    from fastapi.testclient import TestClient
+    import main
+
+    print("🌐 Test de /preview/{result_id}")
+    print("=" * 40)
+
+    client = TestClient(main.app)
+    result_id = main.result_store.put("results", creer_devis())
+
+    hits = main.preview_cache.get_stats()['hits']
+    for _ in range(2):
+        response = client.get(f"/preview/{result_id}", params={'page': 2, 'dpi': 36})
+        assert response.status_code == 200
+        assert response.headers['content-type'] == "image/png"
+        assert taille_image(response.content) == (298, 421)
+    assert main.preview_cache.get_stats()['hits'] == hits + 1
+    print("   ✅ Aperçu rendu puis servi depuis le cache")
+
+    assert client.get(f"/preview/{result_id}", params={'format': 'webp'}).headers['content-type'] == "image/webp"
+    assert client.get(f"/preview/{result_id}", params={'page': 5}).status_code == 404
+    assert client.get(f"/preview/{result_id}", params={'dpi': 1000}).status_code == 400
+    assert client.get(f"/preview/{result_id}", params={'clip': '1,2'}).status_code == 400
+    assert client.get(f"/preview/{'0' * 64}").status_code == 404
+
+    # Résultat supprimé: l'aperçu encore en cache n'est plus servi
+    os.remove(main.result_store.path("results", result_id))
+    assert client.get(f"/preview/{result_id}", params={'page': 2, 'dpi': 36}).status_code == 404
+    print("   ✅ Page, DPI, découpe et résultat inconnu ou supprimé refusés")
+    return True
+
+if __name__ == "__main__":
+    test_rendu_page()
+    test_cache_apercus()
+    test_endpoint_apercu()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Script de test du budget de temps des jobs du pool de traitement
+"""
+
+import os
+import pickle
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from processing_pool import JobTimeoutError, ProcessingPool
+from result_store import ResultStore
+
+def test_budget_depasse():
+    """Un job trop long est interrompu, son processus remplacé, et le pool reste utilisable"""
+
+    print("⏱️ Test du budget de temps par job")
+    print("=" * 40)
+
+    pool = ProcessingPool(num_workers=1, job_timeout=1)
+    pool.start()
+    try:
+        pid_avant, _ = pool.run(os.getpid)
+
+        start = time.monotonic()
+        try:
+            pool.run(time.sleep, 30)
+            assert False, "Le job aurait dû être interrompu"
+        except JobTimeoutError as e:
+            print(f"   ✅ {e}")
+        assert time.monotonic() - start < 10
+
+        stats = pool.get_stats()
+        assert stats['jobs_timed_out'] == 1
+        assert stats['recycled']['timeout'] == 1
+
+        pid_apres, _ = pool.run(os.getpid)
+        assert pid_apres != pid_avant
+        print(f"   ✅ Processus {pid_avant} remplacé par {pid_apres}")
+
+        # Budget explicite plus large pour un lot
+        _, metrics = pool.run_with_budget(5, time.sleep, 1.5)
+        assert metrics['duration'] >= 1.5
+        print("   ✅ Budget explicite respecté")
+    finally:
+        pool.shutdown()
+    return True
+
+def test_job_non_envoyable():
+    """Un job impossible à envoyer (pickle) ne fait pas perdre de processus au pool"""
+
+    print("📦 Test des jobs impossibles à envoyer")
+    print("=" * 40)
+
+    pool = ProcessingPool(num_workers=1, job_timeout=10)
+    pool.start()
+    try:
+        for _ in range(3):
+            try:
+                pool.run(lambda: None)
+            except (pickle.PicklingError, AttributeError, TypeError) as e:
+                print(f"   ✅ Refusé: {type(e).__name__}")
+            else:
+                assert False, "Une lambda ne peut pas être envoyée au processus"
+
+        # Avant correction, le processus unique n'était jamais rendu: attente infinie
+        executor = ThreadPoolExecutor(max_workers=1)
+        pid, _ = executor.submit(pool.run, os.getpid).result(timeout=30)
+        executor.shutdown(wait=False)
+        assert pid
+        assert pool.get_stats()['jobs_failed'] == 3
+        print("   ✅ Pool toujours utilisable")
+    finally:
+        pool.shutdown()
+    return True
+
+def test_duree_quarantaine():
+    """La quarantaine a sa propre durée, plus longue que celle des résultats"""
+
+    print("🚫 Test de la durée de quarantaine")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ResultStore(root, ttl=3600, kind_ttls={'quarantine': 7 * 86400})
+        digest = store.put("results", b"resultat")
+        store.put("quarantine", b"{}", digest=digest)
+
+        # Deux heures plus tard: résultat expiré, quarantaine toujours active
+        two_hours_ago = time.time() - 7200
+        for kind in ("results", "quarantine"):
+            os.utime(os.path.join(root, kind, digest), (two_hours_ago, two_hours_ago))
+        assert store.path("results", digest) is None
+        assert store.path("quarantine", digest) is not None
+        store.cleanup(force=True)
+        assert not os.path.exists(os.path.join(root, "results", digest))
+        assert os.path.exists(os.path.join(root, "quarantine", digest))
+    print("   ✅ Quarantaine conservée après l'expiration des résultats")
+    return True
+
+if __name__ == "__main__":
+    test_budget_depasse()
+    test_job_non_envoyable()
+    test_duree_quarantaine()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Script de test du cache des analyses de texte (un TextPage par page)
+"""
+
+import os
+import fitz  # PyMuPDF
+from pdf_processor_complete import PDFProcessorComplete
+from quote_data import extract_quote_data, find_total_ttc
+from text_cache import TextPageCache
+from zone_detector import ZoneDetector
+from test_parallele import creer_long_devis
+from test_totaux import creer_devis_articles
+
+def compter_textpages(fonction):
+    """Nombre de TextPage construits pendant l'appel"""
+    original = fitz.Page.get_textpage
+    appels = []
+
+    def get_textpage(page, *args, **kwargs):
+        appels.append(page.number)
+        return original(page, *args, **kwargs)
+
+    fitz.Page.get_textpage = get_textpage
+    try:
+        resultat = fonction()
+    finally:
+        fitz.Page.get_textpage = original
+    return resultat, appels
+
+def test_un_textpage_par_page():
+    """Totaux, zones et acomptes lisent la même analyse de chaque page"""
+
+    print("📚 Test du cache des analyses de texte")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    input_path = os.path.join("output", "cache_texte_devis.pdf")
+    creer_long_devis(input_path, num_pages=6)
+
+    processor = PDFProcessorComplete(
+        verify_totals=True,
+        zone_detector=ZoneDetector(plans_dir=os.path.join("output", "plans_cache_texte")))
+    succes, appels = compter_textpages(
+        lambda: processor.process_pdf(input_path, os.path.join("output", "cache_texte_traité.pdf")))
+    assert succes
+    assert sorted(appels) == list(range(6)), appels
+    print(f"   ✅ {len(appels)} analyses pour 6 pages")
+
+    with fitz.open(os.path.join("output", "cache_texte_traité.pdf")) as doc:
+        assert "3703.70  EUR" in doc[-1].get_text()  # 30% de 12 345,67
+    print("   ✅ Acomptes calculés depuis l'analyse partagée")
+
+def test_extraction_partagee():
+    """L'extraction des données réutilise les analyses déjà faites"""
+
+    devis_path = os.path.join("output", "cache_texte_articles.pdf")
+    creer_devis_articles(devis_path)
+    with fitz.open(devis_path) as doc:
+        attendu = extract_quote_data(doc)
+        with TextPageCache(doc) as texts:
+            texts.textpage(0)
+            donnees, appels = compter_textpages(lambda: extract_quote_data(doc, texts=texts))
+            assert appels == []
+            assert texts.builds == 1 and texts.hits >= 3
+        assert texts.builds == 1 and not texts._textpages
+    assert donnees == attendu
+    print("   ✅ Extraction sans nouvelle analyse, cache libéré")
+
+def test_meme_texte_que_get_text():
+    """Le cache lit le texte avec les options de page.get_text() (ligatures comprises)"""
+
+    doc = fitz.open()
+    page = doc.new_page()
+    writer = fitz.TextWriter(page.rect)
+    for y, ligne in ((100, "Total TTC certiﬁé"), (120, "1 234,50"), (140, "ACOMPTE 30%")):
+        writer.append((72, y), ligne, font=fitz.Font("helv"), fontsize=11)
+    writer.write_text(page)
+
+    with TextPageCache(doc) as texts:
+        assert texts.text(page) == page.get_text()
+        assert texts.words(page) == page.get_text("words")
+        assert find_total_ttc(page, texts=texts) == find_total_ttc(page) == 1234.5
+    print("   ✅ Même texte et même total TTC avec ou sans cache")
+
+if __name__ == "__main__":
+    test_un_textpage_par_page()
+    test_extraction_partagee()
+    test_meme_texte_que_get_text()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Script de test du partage des traitements entre envois identiques simultanés
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import fitz  # PyMuPDF
+from singleflight import FlightLocks, SingleFlight, flight_key
+
+def test_coalescence():
+    """Les requêtes identiques simultanées attendent un seul calcul et reçoivent son résultat"""
+
+    print("🔗 Test du partage des traitements identiques")
+    print("=" * 40)
+
+    options = {'auto_zones': True, 'linearize': True}
+    assert flight_key("abc", options) == flight_key("abc", dict(reversed(list(options.items()))))
+    assert flight_key("abc", options) != flight_key("abc", {**options, 'linearize': False})
+    assert flight_key("abc", options) != flight_key("abd", options)
+    print("   ✅ Clé: empreinte du contenu et options, indépendante de leur ordre")
+
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def compute(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return {'result_id': value}
+
+        key = flight_key("devis", options)
+        results = await asyncio.gather(*(flight.run(key, lambda: compute("r1")) for _ in range(5)),
+                                       flight.run(flight_key("autre", options), lambda: compute("r2")))
+        assert calls == ["r1", "r2"]
+        assert [shared for _, shared in results] == [False, True, True, True, True, False]
+        assert all(result is results[0][0] for result, _ in results[:5])
+        assert flight.get_stats() == {'in_flight': 0, 'started': 2, 'coalesced': 4}
+        print("   ✅ 5 envois identiques: un seul calcul, même résultat pour tous")
+
+        # Calcul terminé: l'envoi identique suivant recalcule
+        await flight.run(key, lambda: compute("r3"))
+        assert calls[-1] == "r3"
+
+        # L'erreur du calcul est remise à toutes les requêtes qui l'attendent
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise ValueError("devis illisible")
+
+        errors = await asyncio.gather(*(flight.run(key, failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(error, ValueError) for error in errors)
+        print("   ✅ Erreur partagée, clé oubliée en fin de calcul")
+
+        # Une requête abandonnée n'annule pas le calcul des autres
+        leader = asyncio.ensure_future(flight.run(key, lambda: compute("r4")))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run(key, lambda: compute("r5")))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result, shared = await follower
+        assert shared and result == {'result_id': "r4"} and "r5" not in calls
+        print("   ✅ Requête abandonnée: le calcul continue pour les autres")
+
+    asyncio.run(scenario())
+    return True
+
+def test_verrous_entre_workers():
+    """Un seul détenteur par clé; l'attente est signalée et le fichier de verrou supprimé"""
+
+    print("\n🔒 Test des verrous de calcul entre workers")
+    print("=" * 40)
+
+    root = os.path.join("output", "verrous_test")
+    shutil.rmtree(root, ignore_errors=True)
+    # Deux instances: chacune ouvre ses propres fichiers, comme deux workers
+    worker_a, worker_b = FlightLocks(root, poll_interval=0.01), FlightLocks(root, poll_interval=0.01)
+
+    async def scenario():
+        lock = worker_a.try_acquire("devis")
+        assert lock is not None and worker_b.try_acquire("devis") is None
+        assert worker_b.try_acquire("autre") is not None
+        waiting = asyncio.ensure_future(worker_b.acquire("devis"))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        worker_a.release("devis", lock)
+        handle, waited = await waiting
+        assert waited and worker_b.get_stats()['locks_waited'] == 1
+        worker_b.release("devis", handle)
+        assert not os.path.exists(os.path.join(root, "devis.lock"))
+
+    asyncio.run(scenario())
+    print("   ✅ Second worker en attente, puis verrou repris et supprimé")
+    return True
+
+def test_partage_entre_workers():
+    """Un envoi qui attend le traitement d'un autre worker relit son résultat sans retraiter"""
+    from fastapi.testclient import TestClient
+    import main
+
+    doc = fitz.open()
+    doc.new_page(width=595, height=842).insert_text((50, 300), f"Devis {uuid.uuid4()}", fontsize=10)
+    content = doc.tobytes()
+    doc.close()
+
+    client = TestClient(main.app)
+    files = {'file': ("devis.pdf", content, "application/pdf")}
+    assert client.post("/upload-pdf/", files=files).status_code == 200
+
+    # Un autre worker traite le même devis: le verrou de sa clé est pris
+    key = flight_key(hashlib.sha256(content).hexdigest(), main._upload_options())
+    autre_worker = FlightLocks(main.flight_locks.root)
+    lock = autre_worker.try_acquire(key)
+    jobs = main.processing_pool.get_stats()['jobs_total']
+    responses = []
+    envoi = threading.Thread(target=lambda: responses.append(client.post("/upload-pdf/", files=files)))
+    envoi.start()
+    time.sleep(0.3)
+    assert envoi.is_alive(), "L'envoi n'attend pas le verrou de l'autre worker"
+    autre_worker.release(key, lock)
+    envoi.join(timeout=30)
+
+    response, = responses
+    assert response.status_code == 200 and response.headers['x-coalesced'] == "1"
+    assert main.processing_pool.get_stats()['jobs_total'] == jobs, "Devis retraité"
+    print("   ✅ Résultat de l'autre worker relu, aucun nouveau traitement")
+    return True
+
+if __name__ == "__main__":
+    test_coalescence()
+    test_verrous_entre_workers()
+    test_partage_entre_workers()
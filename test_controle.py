@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Script de test du contrôle préalable des PDF reçus
+"""
+
+import os
+import fitz  # PyMuPDF
+from preflight import PREFLIGHT_CONFIG, preflight_pdf
+
+def creer_devis_image(output_path, width, height):
+    """Devis d'une page avec une image déclarée mais quasi vide (très compressible)"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((50, 100), "DEVIS N° 2024-001", fontsize=12)
+    xref = doc.get_new_xref()
+    doc.update_object(xref, f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 >>")
+    doc.update_stream(xref, bytes(width * height * 3))
+    doc.save(output_path)
+    doc.close()
+
+def test_controle_prealable():
+    """Bombes de décompression, documents chiffrés et réparés sont repérés sans décoder les flux"""
+
+    print("🛂 Test du contrôle préalable")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    sain_path = os.path.join("output", "controle_sain.pdf")
+    creer_devis_image(sain_path, 200, 100)
+    report = preflight_pdf(sain_path)
+    assert report['ok'] and not report['flags']
+    assert report['stats']['images'] == 1
+    print(f"   ✅ Devis sain accepté en {report['duration_ms']} ms")
+
+    bombe_path = os.path.join("output", "controle_bombe.pdf")
+    creer_devis_image(bombe_path, 3000, 3000)
+    config = dict(PREFLIGHT_CONFIG, max_decoded_mb=10)
+    report = preflight_pdf(bombe_path, config=config)
+    assert not report['ok']
+    assert [issue['check'] for issue in report['rejections']] == ['decompression_bomb']
+    print(f"   ✅ Bombe refusée: {report['rejections'][0]['detail']}")
+
+    config = dict(PREFLIGHT_CONFIG, max_image_pixels=1_000_000)
+    report = preflight_pdf(bombe_path, config=config)
+    assert 'image_pixels' in [issue['check'] for issue in report['rejections']]
+    print("   ✅ Image trop grande refusée")
+
+    doc = fitz.open(sain_path)
+    chiffre = doc.tobytes(encryption=fitz.PDF_ENCRYPT_AES_256, user_pw="devis", owner_pw="adf")
+    donnees = doc.tobytes()
+    doc.close()
+    report = preflight_pdf(stream=chiffre)
+    assert [issue['check'] for issue in report['rejections']] == ['encrypted']
+    print("   ✅ Document chiffré refusé")
+
+    # startxref faux: MuPDF reconstruit la table à l'ouverture
+    abime = donnees[:donnees.rfind(b"startxref")] + b"startxref\n999999\n%%EOF\n"
+    report = preflight_pdf(stream=abime)
+    assert report['ok'] and [issue['check'] for issue in report['flags']] == ['repaired']
+    report = preflight_pdf(stream=abime, config=dict(PREFLIGHT_CONFIG, reject_repaired=True))
+    assert not report['ok']
+    print("   ✅ Document réparé signalé")
+
+    report = preflight_pdf(stream=donnees, config=dict(PREFLIGHT_CONFIG, max_pages=0))
+    assert [issue['check'] for issue in report['rejections']] == ['pages']
+    print("   ✅ Limite de pages appliquée")
+    return True
+
+def test_controle_apercu_zones():
+    """/preview-zones/ applique le même contrôle que /upload-pdf/ avant le rendu"""
+    from fastapi.testclient import TestClient
+    import main
+
+    print("🛂 Test du contrôle préalable de /preview-zones/")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    sain_path = os.path.join("output", "controle_apercu_sain.pdf")
+    creer_devis_image(sain_path, 200, 100)
+    with open(sain_path, "rb") as f:
+        donnees = f.read()
+    with fitz.open(sain_path) as doc:
+        chiffre = doc.tobytes(encryption=fitz.PDF_ENCRYPT_AES_256, user_pw="devis", owner_pw="adf")
+
+    client = TestClient(main.app)
+    response = client.post("/preview-zones/", files={'file': ("devis.pdf", donnees, "application/pdf")})
+    assert response.status_code == 200 and response.headers['content-type'] == "image/png"
+    response = client.post("/preview-zones/", files={'file': ("devis.pdf", chiffre, "application/pdf")})
+    assert response.status_code == 422, response.text
+    print(f"   ✅ Devis chiffré refusé avant le rendu: {response.json()['detail']}")
+    assert not [name for name in os.listdir("uploads") if name.startswith("zones_")]
+    
+    # Refus avant le pool: place libérée sans durée pour l'estimation du Retry-After
+    durees = len(main.admission._durations)
+    response = client.post("/upload-pdf/", files={'file': ("devis.txt", donnees, "text/plain")})
+    assert response.status_code == 400
+    response = client.post("/upload-pdf/", files={'file': ("devis.pdf", chiffre, "application/pdf")})
+    assert response.status_code == 422
+    assert len(main.admission._durations) == durees
+    assert main.admission.get_stats()['in_flight'] == 0
+    print("   ✅ Refus de /upload-pdf/ sans durée de traitement enregistrée")
+    return True
+
+if __name__ == "__main__":
+    test_controle_prealable()
+    test_controle_apercu_zones()
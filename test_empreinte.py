@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script de test de la négociation par empreinte et du téléversement par morceaux
+(application démarrée sur le port 8000)
+"""
+
+import hashlib
+import os
+import uuid
+
+import requests
+
+def test_negociation_empreinte():
+    """Fichier inconnu: envoi par morceaux; fichier connu: résultat sans transfert"""
+    base_url = "http://localhost:8000"
+    test_pdf = os.path.join("static", "sample_devis.pdf")
+    if not os.path.exists(test_pdf):
+        print(f"❌ Fichier de test introuvable: {test_pdf}")
+        return
+
+    print("♻️ Test de la négociation par empreinte")
+    print("=" * 40)
+
+    # Commentaire unique après %%EOF: empreinte jamais vue, PDF inchangé
+    with open(test_pdf, "rb") as f:
+        data = f.read() + f"\n% {uuid.uuid4().hex}\n".encode()
+    sha256 = hashlib.sha256(data).hexdigest()
+    negotiation = {'sha256': sha256, 'filename': 'devis_empreinte.pdf'}
+
+    try:
+        response = requests.post(f"{base_url}/upload-pdf/by-hash", data=negotiation, timeout=30)
+    except requests.exceptions.ConnectionError:
+        print("❌ Impossible de se connecter à l'application")
+        print("💡 Assurez-vous que l'application est démarrée avec: python main.py")
+        return
+    assert response.status_code == 404
+    print("   ✅ Empreinte inconnue: fichier demandé")
+
+    upload = requests.post(f"{base_url}/uploads/", timeout=30, data={
+        'filename': 'devis_empreinte.pdf', 'size': len(data), 'sha256': sha256
+    }).json()
+    chunk_size = max(1, len(data) // 3)
+    for offset in range(0, len(data), chunk_size):
+        response = requests.put(f"{base_url}/uploads/{upload['upload_id']}?offset={offset}",
+                                data=data[offset:offset + chunk_size], timeout=30)
+        assert response.status_code == 200
+    assert requests.get(f"{base_url}/uploads/{upload['upload_id']}", timeout=30).json()['complete']
+    processed = requests.post(f"{base_url}/uploads/{upload['upload_id']}/complete", timeout=120)
+    assert processed.status_code == 200, processed.text
+    print(f"   ✅ Envoi par morceaux traité: {len(processed.content)} bytes")
+
+    response = requests.post(f"{base_url}/upload-pdf/by-hash", data=negotiation, timeout=30)
+    assert response.status_code == 200
+    assert response.headers.get('X-Transfer-Skipped') == "1"
+    assert response.headers['X-Result-Id'] == processed.headers['X-Result-Id']
+    print("   ✅ Empreinte connue: même résultat, sans renvoyer le fichier")
+
+if __name__ == "__main__":
+    test_negociation_empreinte()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script de test de l'extraction des données structurées d'un devis
+"""
+
+import os
+import fitz  # PyMuPDF
+from quote_data import extract_quote_data, extract_quote_files
+from test_totaux import creer_devis_articles
+
+def test_extraction_devis():
+    """Client, référence, date, articles, totaux et acomptes sont extraits"""
+
+    print("📋 Test d'extraction des données du devis")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    pdf_path = os.path.join("output", "devis_extraction.pdf")
+    creer_devis_articles(pdf_path)
+    doc = fitz.open(pdf_path)
+    page = doc[0]
+    page.insert_text((40, 100), "Code Unique du Devis : X9-221", fontsize=9)
+    page.insert_text((40, 115), "Date actuelle : 12/10/2026", fontsize=9)
+    page.insert_text((40, 130), "Code client : C4521", fontsize=9)
+    page.insert_text((300, 100), "Client : M. DUPONT Jean", fontsize=9)
+    page.insert_text((40, 700), "4 434,65 EUR", fontsize=10)
+    page.insert_text((40, 715), "ACOMPTE 30%", fontsize=10)
+    doc.saveIncr()
+
+    data = extract_quote_data(doc)
+    doc.close()
+    assert (data['reference'], data['date'], data['client_code']) == ("X9-221", "12/10/2026", "C4521")
+    assert data['client'] == "M. DUPONT Jean"
+    assert [item['total'] for item in data['items']] == [2500.0, 300.0, 1231.5]
+    assert data['totals']['total_ttc'] == 4434.65
+    assert data['acomptes'] == {'acompte_30': 1330.39, 'acompte_50': 2217.32, 'solde_20': 886.93}
+    print("   ✅ Champs, articles, totaux et acomptes extraits")
+
+    resultats = extract_quote_files([("a", pdf_path), ("b", os.path.join("output", "absent.pdf"))])
+    assert resultats[0]['source_id'] == "a" and 'error' in resultats[1]
+    print("   ✅ Extraction en lot, erreurs par devis")
+    return True
+
+if __name__ == "__main__":
+    test_extraction_devis()
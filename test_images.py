@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Script de test de la réduction des images incorporées
+"""
+
+import io
+import os
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+from pdf_processor_complete import PDFProcessorComplete
+
+def creer_devis_photos(output_path, num_pages=3):
+    """Devis avec une photo produit en résolution d'impression sur chaque page"""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 200, 2400)[None, :, None]
+    pixels = (rng.random((1800, 2400, 3)) * 40 + gradient).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=95)
+    photo = buffer.getvalue()
+
+    doc = fitz.open()
+    for page_num in range(num_pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 250), f"Fenêtre PVC - page {page_num + 1}", fontsize=10)
+        # 2400 px sur 200 pt: 864 dpi
+        page.insert_image(fitz.Rect(50, 300, 250, 450), stream=photo)
+    doc.save(output_path)
+    doc.close()
+
+def test_reduction_images():
+    """Les photos sont réduites à la résolution cible, le logo et le texte sont intacts"""
+
+    print("🖼️ Test de la réduction des images")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    input_path = os.path.join("output", "images_devis.pdf")
+    creer_devis_photos(input_path)
+
+    brut_path = os.path.join("output", "images_brut.pdf")
+    reduit_path = os.path.join("output", "images_reduit.pdf")
+    assert PDFProcessorComplete().process_pdf(input_path, brut_path)
+    processor = PDFProcessorComplete(optimize_images=True)
+    assert processor.process_pdf(input_path, reduit_path)
+
+    report = processor.report['images']
+    assert report['optimized'] == 1  # une seule photo, partagée par les pages
+    assert report['bytes_saved'] > 0
+    print(f"   ✅ {report['bytes_saved'] // 1024} Ko gagnés en {report['duration']}s")
+
+    brut_size, reduit_size = os.path.getsize(brut_path), os.path.getsize(reduit_path)
+    assert reduit_size < brut_size / 2
+    print(f"   ✅ Fichier: {brut_size // 1024} Ko -> {reduit_size // 1024} Ko")
+
+    with fitz.open(brut_path) as brut, fitz.open(reduit_path) as reduit:
+        for page_brut, page_reduit in zip(brut, reduit):
+            assert page_brut.get_text() == page_reduit.get_text()
+        logo_brut = [i for i in brut[0].get_image_info() if fitz.Rect(i['bbox']) in processor.logo_rect]
+        logo_reduit = [i for i in reduit[0].get_image_info() if fitz.Rect(i['bbox']) in processor.logo_rect]
+        assert [(i['width'], i['height']) for i in logo_brut] == [(i['width'], i['height']) for i in logo_reduit]
+        photo = [i for i in reduit[0].get_image_info() if fitz.Rect(i['bbox']) not in processor.logo_rect][0]
+        # 200 pt à 150 dpi
+        assert photo['width'] == round(2400 * 150 / 864)
+    print("   ✅ Logo et texte inchangés, photo à 150 dpi")
+    return True
+
+if __name__ == "__main__":
+    test_reduction_images()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Script de test de l'enregistrement linéarisé (affichage web rapide)
+"""
+
+import os
+import fitz  # PyMuPDF
+from pdf_processor_complete import PDFProcessorComplete
+from benchmark_linearisation import first_page_bytes
+from test_parallele import creer_long_devis
+
+def test_sortie_linearisee():
+    """La sortie linéarisée s'affiche avec le début du fichier seulement"""
+
+    print("🌐 Test de la sortie linéarisée")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    input_path = os.path.join("output", "lineaire_devis.pdf")
+    creer_long_devis(input_path, num_pages=12)
+
+    standard_path = os.path.join("output", "lineaire_standard.pdf")
+    lineaire_path = os.path.join("output", "lineaire_traité.pdf")
+    assert PDFProcessorComplete().process_pdf(input_path, standard_path)
+    processor = PDFProcessorComplete(linearize=True)
+    assert processor.process_pdf(input_path, lineaire_path)
+    assert processor.report['linearized']
+
+    with fitz.open(standard_path) as standard, fitz.open(lineaire_path) as lineaire:
+        assert not standard.is_fast_webaccess
+        assert lineaire.is_fast_webaccess
+        assert len(standard) == len(lineaire)
+        for page_standard, page_lineaire in zip(standard, lineaire):
+            assert page_standard.get_text() == page_lineaire.get_text()
+
+    with open(lineaire_path, "rb") as f:
+        data = f.read()
+    needed = first_page_bytes(data)
+    assert needed < len(data)
+    print(f"   ✅ Page 1 affichable après {needed} octets sur {len(data)}")
+    return True
+
+if __name__ == "__main__":
+    test_sortie_linearisee()
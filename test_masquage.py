@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Script de test du masquage des zones (pages sans contenu dans les zones)
+"""
+
+import fitz  # PyMuPDF
+from pdf_processor_complete import PDFProcessorComplete
+from redaction import occupied_zones, redact_zones
+from benchmark_masquage import create_image_quote
+
+def creer_devis_bannieres(num_pages=4):
+    """Devis dont seules les pages paires portent la bannière ADF"""
+    doc = fitz.open()
+    for page_num in range(num_pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 300), f"Ligne de devis page {page_num + 1}", fontsize=10)
+        if page_num % 2 == 0:
+            page.draw_rect(fitz.Rect(25, 765, 565, 795), fill=(0.8, 0.1, 0.1))
+            page.insert_text((40, 785), "NOUVEAU! VOLETS BATTANTS ADF", fontsize=9, color=(1, 1, 1))
+    return doc
+
+def test_pages_sans_banniere():
+    """Les pages sans contenu dans les zones ne sont pas réécrites"""
+
+    print("🩹 Test du masquage des zones occupées")
+    print("=" * 40)
+
+    doc = creer_devis_bannieres()
+    processor = PDFProcessorComplete()
+    banner_zones = processor.zones_to_clean['all_pages']
+    assert [len(occupied_zones(page, banner_zones)) for page in doc] == [1, 0, 1, 0]
+
+    contents_before = [page.read_contents() for page in doc]
+    processor._clean_pdf(doc, None)
+
+    for page, before in zip(doc, contents_before):
+        if page.number % 2:
+            assert page.read_contents() == before, f"Page {page.number + 1} réécrite"
+        else:
+            assert "VOLETS" not in page.get_text()
+            # Les tracés sont recouverts de blanc (PyMuPDF 1.23 ne les supprime pas)
+            pix = page.get_pixmap(clip=fitz.Rect(25, 765, 565, 795))
+            assert set(pix.samples) == {255}
+    print("   ✅ Bannières supprimées, pages sans bannière intactes")
+    return True
+
+def test_images_par_zone():
+    """Logo supprimé entier, photo débordant sous la bannière laissée intacte"""
+
+    print("🖼️ Test du traitement des images par zone")
+    print("=" * 40)
+
+    doc = fitz.open("pdf", create_image_quote(1))
+    page = doc[0]
+    photo_before = [info for info in page.get_image_info(hashes=True) if info['bbox'][1] > 500]
+
+    processor = PDFProcessorComplete()
+    processor._clean_pdf(doc, page)
+
+    page = doc.reload_page(page)  # get_image_info est mis en cache par page
+    images = page.get_image_info(hashes=True)
+    assert not [info for info in images if info['bbox'][3] < 120], "Logo toujours présent"
+    photos = [info for info in images if info['bbox'][1] > 500]
+    assert [info['digest'] for info in photos] == [info['digest'] for info in photo_before]
+    pix = page.get_pixmap(clip=fitz.Rect(20, 780, 570, 800))
+    assert set(pix.samples) == {255}
+    print("   ✅ Logo supprimé, photos non réencodées, bannière masquée")
+
+    # 'pixels': la photo est réencodée avec la zone effacée
+    doc = fitz.open("pdf", create_image_quote(1))
+    page = doc[0]
+    redact_zones(page, [dict(processor.zones_to_clean['all_pages'][0], images='pixels')])
+    page = doc.reload_page(page)
+    photos = [info for info in page.get_image_info(hashes=True) if info['bbox'][1] > 500]
+    assert [info['digest'] for info in photos] != [info['digest'] for info in photo_before]
+
+    try:
+        redact_zones(page, [{'rect': (20, 760, 570, 800), 'images': 'flou'}])
+        assert False, "Traitement inconnu accepté"
+    except ValueError:
+        pass
+
+    # Traitement inconnu refusé même sur une page sans image ni contenu dans la zone
+    sans_image = creer_devis_bannieres(2)[1]
+    for zones in ([{'rect': (20, 760, 570, 800), 'images': 'pixel'}],
+                  [{'rect': (20, 280, 570, 310)}, {'rect': (20, 20, 570, 60), 'images': 'pixel'}]):
+        try:
+            redact_zones(sans_image, zones)
+            assert False, "Traitement inconnu accepté sur une page sans image"
+        except ValueError:
+            pass
+    print("   ✅ Mode 'pixels' et traitement inconnu")
+    return True
+
+def test_page_scannee():
+    """Page scannée (une image pleine page): en-tête effacé, page conservée"""
+
+    print("\n📠 Test du masquage d'une page scannée")
+    print("=" * 40)
+
+    # Scan gris clair couvrant toute la page
+    scan = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 200, 280), False)
+    scan.set_rect(scan.irect, (200, 200, 200))
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_image(page.rect, pixmap=scan)
+
+    processor = PDFProcessorComplete()
+    processor._clean_pdf(doc, page)
+
+    page = doc.reload_page(page)
+    images = page.get_image_info()
+    assert len(images) == 1, "Scan supprimé avec le logo"
+    assert set(page.get_pixmap(clip=fitz.Rect(40, 30, 560, 110)).samples) == {255}, "En-tête non effacé"
+    assert set(page.get_pixmap(clip=fitz.Rect(40, 400, 560, 500)).samples) == {200}, "Corps du scan effacé"
+    print("   ✅ Scan conservé, seuls les pixels de l'en-tête effacés")
+    return True
+
+if __name__ == "__main__":
+    test_pages_sans_banniere()
+    test_images_par_zone()
+    test_page_scannee()
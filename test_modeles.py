@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Script de test du registre des modèles de devis
+"""
+
+import os
+import json
+import fitz  # PyMuPDF
+from pdf_processor_complete import PDFProcessorComplete
+from template_registry import TemplateRegistry, template_fingerprint
+from test_zones import creer_devis_adf
+
+def test_registre_modeles():
+    """Un modèle enregistré est reconnu et son plan appliqué, un modèle inconnu est journalisé"""
+
+    print("🗂️ Test du registre des modèles")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    registry_path = os.path.join("output", "templates_test.json")
+    unknown_log = os.path.join("output", "unknown_templates_test.jsonl")
+    for path in (registry_path, unknown_log):
+        if os.path.exists(path):
+            os.remove(path)
+    registry = TemplateRegistry(path=registry_path, unknown_log=unknown_log)
+    processor = PDFProcessorComplete(template_registry=registry)
+
+    # Modèle inconnu: traitement par défaut, empreinte journalisée une seule fois
+    inconnu = os.path.join("output", "devis_modele_inconnu.pdf")
+    creer_devis_adf(inconnu, decalage=40)
+    for _ in range(2):
+        assert processor.process_pdf(inconnu, os.path.join("output", "devis_modele_inconnu_traité.pdf"))
+        assert processor.report['template'] is None
+    with open(unknown_log) as f:
+        records = [json.loads(line) for line in f]
+    assert [r['fingerprint'] for r in records] == [processor.report['template_fingerprint']]
+    print("   ✅ Modèle inconnu signalé et journalisé")
+
+    # Modèle enregistré avec un en-tête décalé de 40 points
+    with fitz.open(inconnu) as doc:
+        fingerprint = template_fingerprint(doc)
+    zones = {
+        'page1_only': [{'rect': (30, 60, 570, 240), 'description': 'En-tête ADF décalé'}],
+        'all_pages': [{'rect': (20, 760, 570, 800), 'description': 'Bannière ADF bas de page'}],
+    }
+    registry.register(fingerprint, "ADF décalé", {'zones': zones})
+
+    client = "Mme LEROY"
+    input_path = os.path.join("output", "devis_modele_connu.pdf")
+    output_path = os.path.join("output", "devis_modele_connu_traité.pdf")
+    creer_devis_adf(input_path, decalage=40, client=client)
+    assert processor.process_pdf(input_path, output_path)
+    assert processor.report['template'] == "ADF décalé"
+
+    text = fitz.open(output_path)[0].get_text()
+    assert "Code Unique du Devis" not in text, "Zones du modèle non appliquées"
+    print("   ✅ Modèle reconnu, plan précompilé appliqué")
+    return True
+
+if __name__ == "__main__":
+    test_registre_modeles()
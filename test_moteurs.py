@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Script de test des moteurs de PDFModifier (PyMuPDF et reportlab)
+"""
+
+import os
+import fitz  # PyMuPDF
+from config import COLORS
+from pdf_modifier import PDFModifier
+
+def test_moteurs_identiques():
+    """Le moteur PyMuPDF produit le même rendu que l'overlay reportlab"""
+
+    print("⚙️ Test des moteurs de modification")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    modifier = PDFModifier({
+        'modifications': {'remove_logo': True, 'change_colors': True,
+                          'add_text': True, 'add_watermark': True},
+        'texts_to_add': [{'text': 'DEVIS MODIFIÉ', 'position': (50, 750), 'font_size': 12,
+                          'color': COLORS['accent'], 'font': 'Helvetica-Bold'}],
+    })
+    modifier.color_bars = [{'position': 'top', 'color': COLORS['primary'], 'thickness': 20}]
+    modifier.advanced_config['add_page_numbers'] = True
+
+    sample = os.path.join("output", "moteurs_exemple.pdf")
+    assert modifier.create_sample_pdf(sample)
+
+    rendus = {}
+    for engine in ('pymupdf', 'reportlab'):
+        modifier.engine = engine
+        output_path = os.path.join("output", f"moteurs_{engine}.pdf")
+        assert modifier.modify_pdf(sample, output_path), f"Échec du moteur {engine}"
+        with fitz.open(output_path) as doc:
+            rendus[engine] = doc[0].get_pixmap(dpi=40).samples
+            if engine == 'pymupdf':
+                text = doc[0].get_text()
+                assert "DEVIS MODIFIÉ" in text and "Page 1" in text
+
+    differences = sum(abs(a - b) > 60 for a, b in zip(rendus['pymupdf'], rendus['reportlab']))
+    assert differences < 0.001 * len(rendus['pymupdf']), f"{differences} pixels différents"
+    print("   ✅ Rendus PyMuPDF et reportlab identiques")
+    return True
+
+if __name__ == "__main__":
+    test_moteurs_identiques()
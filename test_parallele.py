@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le traitement parallèle des longs devis
+"""
+
+import os
+import fitz  # PyMuPDF
+from pdf_processor_complete import PDFProcessorComplete, process_pdf_job
+
+def creer_long_devis(output_path, num_pages=24):
+    """Crée un devis de plusieurs pages avec en-tête, bannière et acomptes"""
+    doc = fitz.open()
+    for page_num in range(num_pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((420, 60), "ADF MENUISERIES", fontsize=14)
+        page.insert_text((50, 300), f"Ligne de devis page {page_num + 1}", fontsize=10)
+        page.draw_rect(fitz.Rect(25, 765, 565, 795), fill=(0.8, 0.1, 0.1))
+        page.insert_text((40, 785), "NOUVEAU! VOLETS BATTANTS ADF", fontsize=9, color=(1, 1, 1))
+    last_page = doc[-1]
+    last_page.insert_text((50, 440), "12 345,67 EUR", fontsize=10)
+    last_page.insert_text((50, 455), "ACOMPTE 30%", fontsize=10)
+    doc.save(output_path)
+    doc.close()
+
+def comparer_pages(path_a, path_b):
+    """Vérifie que deux PDF ont le même texte et le même rendu, page par page"""
+    with fitz.open(path_a) as doc_a, fitz.open(path_b) as doc_b:
+        assert len(doc_a) == len(doc_b)
+        for page_a, page_b in zip(doc_a, doc_b):
+            assert page_a.get_text() == page_b.get_text()
+            pix_a = page_a.get_pixmap(dpi=50)
+            pix_b = page_b.get_pixmap(dpi=50)
+            assert pix_a.samples == pix_b.samples, f"Page {page_a.number + 1} différente"
+        return len(doc_a)
+
+def test_parallele_identique():
+    """Le mode parallèle doit produire les mêmes pages que le mode séquentiel"""
+
+    print("⚡ Test du traitement parallèle - Devis longs")
+    print("=" * 45)
+
+    os.makedirs("output", exist_ok=True)
+    input_path = os.path.join("output", "long_devis_test.pdf")
+    creer_long_devis(input_path)
+
+    serial_path = os.path.join("output", "long_devis_sequentiel.pdf")
+    parallel_path = os.path.join("output", "long_devis_parallele.pdf")
+
+    serial = PDFProcessorComplete(parallel_threshold=0)
+    parallel = PDFProcessorComplete(parallel_threshold=10, max_workers=3)
+    parallel.min_pages_per_worker = 4
+
+    assert serial.process_pdf(input_path, serial_path)
+    assert parallel.process_pdf(input_path, parallel_path)
+
+    num_pages = comparer_pages(serial_path, parallel_path)
+    print(f"   ✅ {num_pages} pages identiques entre les deux modes")
+    return True
+
+def test_parallele_zones_auto():
+    """Mode parallèle avec la détection des zones et les modèles, comme en configuration par défaut"""
+
+    print("⚡ Test du traitement parallèle - Zones détectées")
+    print("=" * 45)
+
+    os.makedirs("output", exist_ok=True)
+    input_path = os.path.join("output", "long_devis_zones_test.pdf")
+    creer_long_devis(input_path)
+
+    serial_path = os.path.join("output", "long_devis_zones_sequentiel.pdf")
+    parallel_path = os.path.join("output", "long_devis_zones_parallele.pdf")
+
+    # Job du pool: détecteur et registre (avec verrous) accompagnent le processeur envoyé aux processus
+    options = {'auto_zones': True, 'use_templates': True}
+    success, _ = process_pdf_job(input_path, serial_path, **options)
+    assert success
+    success, _ = process_pdf_job(input_path, parallel_path, parallel_threshold=10, max_workers=3, **options)
+    assert success
+
+    num_pages = comparer_pages(serial_path, parallel_path)
+    print(f"   ✅ {num_pages} pages identiques avec la détection des zones et les modèles")
+    return True
+
+if __name__ == "__main__":
+    test_parallele_identique()
+    test_parallele_zones_auto()
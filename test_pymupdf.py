@@ -3,7 +3,10 @@
 Script de test pour le nettoyage PyMuPDF du devis ADF
 """
 
+import io
 import os
+import fitz  # PyMuPDF
+from PIL import Image
 from pdf_cleaner import PDFCleaner
 
 def test_nettoyage_pymupdf():
@@ -83,6 +86,44 @@ def test_nettoyage_pymupdf():
     
     return True
 
+def test_apercu_zones_image():
+    """Aperçu image des zones: page 1 et bande de pied de page, zones personnalisées, formats"""
+
+    print("🖼️ Test de l'aperçu image des zones")
+    print("=" * 45)
+
+    os.makedirs("output", exist_ok=True)
+    input_path = os.path.join("output", "apercu_zones_test.pdf")
+    doc = fitz.open()
+    for page_num in range(3):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 300), f"Ligne de devis page {page_num + 1}", fontsize=10)
+    doc.save(input_path)
+    doc.close()
+
+    cleaner = PDFCleaner()
+    image = Image.open(io.BytesIO(cleaner.preview_zones_image(input_path, dpi=36)))
+    # Page 1 (298x421 à 36 dpi) + bande de 40 px autour de la bannière (740-820 pt) de la page 2
+    assert image.size == (298, 421 + 40)
+    print(f"   ✅ Page 1 et bande de pied de page: {image.size[0]}x{image.size[1]}")
+
+    zones = {'page1_only': [{'rect': (100, 100, 200, 200), 'description': 'Essai'}], 'all_pages': []}
+    image = Image.open(io.BytesIO(cleaner.preview_zones_image(input_path, dpi=72, zones=zones))).convert("RGB")
+    assert image.size == (595, 842)
+    assert image.getpixel((100, 150)) == (255, 0, 0)
+    assert image.getpixel((150, 150)) == (255, 255, 255)
+    print("   ✅ Zones personnalisées tracées en rouge, sans bande de pied de page")
+
+    webp = cleaner.preview_zones_image(input_path, dpi=36, fmt="webp")
+    assert webp[8:12] == b"WEBP"
+    try:
+        cleaner.preview_zones_image(input_path, fmt="gif")
+        assert False, "format non supporté accepté"
+    except ValueError:
+        pass
+    print("   ✅ WebP accepté, format inconnu refusé")
+    return True
+
 def afficher_zones_pymupdf():
     """Affiche les zones configurées dans PyMuPDF"""
     
@@ -119,6 +160,7 @@ def main():
     
     # Lancer le test de nettoyage
     success = test_nettoyage_pymupdf()
+    test_apercu_zones_image()
     
     if success:
         print("\n🎉 Test PyMuPDF terminé!")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Script de test du remplacement de texte existant (TEXT_REPLACEMENTS)
+"""
+
+import os
+import fitz  # PyMuPDF
+from text_cache import TextPageCache
+from text_replacer import TextReplacer
+
+def test_remplacements():
+    """Chaque motif est remplacé à sa position, le texte voisin est conservé"""
+
+    print("✏️ Test des remplacements de texte")
+    print("=" * 40)
+
+    doc = fitz.open()
+    for numero in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 100), f"DEVIS N° {numero + 1}", fontsize=20, fontname="hebo")
+        page.insert_text((72, 140), "Devis valable 30 jours", fontsize=10)
+
+    replacer = TextReplacer({'DEVIS': 'OFFRE', 'Devis': 'Offre', 'DEVIS N°': 'OFFRE No'})
+    matches = replacer.find_matches(doc[0])
+    assert [m['replacement'] for m in matches] == ['OFFRE No', 'Offre'], "Motif le plus long prioritaire"
+    assert matches[0]['fontsize'] == 20 and matches[0]['fontname'] == 'hebo'
+
+    assert replacer.replace_in_document(doc) == 6
+    for numero, page in enumerate(doc):
+        text = page.get_text()
+        assert "DEVIS" not in text and "Devis" not in text
+        assert f" {numero + 1}" in text and "valable 30 jours" in text, "Texte voisin supprimé"
+        assert "OFFRE No" in text and "Offre" in text
+        origin = page.search_for("OFFRE No")[0]
+        assert abs(origin.x0 - 72) < 1, "Remplacement mal positionné"
+    print("   ✅ Motifs remplacés en place, texte voisin conservé")
+    return True
+
+def test_ligatures():
+    """Un motif est trouvé dans un texte à ligatures, avec ou sans cache"""
+
+    doc = fitz.open()
+    for _ in range(2):
+        page = doc.new_page()
+        writer = fitz.TextWriter(page.rect)
+        writer.append((72, 100), "Devis certiﬁé conforme", font=fitz.Font("helv"), fontsize=11)
+        writer.write_text(page)
+
+    replacer = TextReplacer({'certifié': 'validé'})
+    assert replacer.replace_in_page(doc[0]) == 1
+    with TextPageCache(doc) as texts:
+        assert "certiﬁé" in texts.text(1), "Ligature conservée comme dans page.get_text()"
+        assert replacer.replace_in_page(doc[1], texts) == 1
+    for page in doc:
+        text = page.get_text()
+        assert "validé" in text and "conforme" in text and "certi" not in text
+    print("   ✅ Ligatures développées pour la recherche, avec ou sans cache")
+    return True
+
+if __name__ == "__main__":
+    test_remplacements()
+    test_ligatures()
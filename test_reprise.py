@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Script de test des téléchargements reprenables (jetons, ETag, plages d'octets)
+"""
+
+import os
+import shutil
+from result_store import ResultStore
+from http_ranges import file_download_response, parse_range, strong_etag
+
+def test_telechargement_reprenable():
+    """Un téléchargement interrompu reprend à l'octet près, un fichier déjà reçu donne 304"""
+
+    print("📥 Test des téléchargements reprenables")
+    print("=" * 40)
+
+    root = os.path.join("output", "stockage_test")
+    shutil.rmtree(root, ignore_errors=True)
+    store = ResultStore(root, ttl=60)
+    data = bytes(range(256)) * 40
+    digest = store.put("results", data)
+    token = store.issue_token("results", digest, "devis_traité.pdf")
+
+    entry = store.resolve_token(token)
+    assert entry['digest'] == digest
+    assert store.resolve_token("../" + token) is None
+    assert store.resolve_token("x" * 32) is None
+    print("   ✅ Jeton opaque résolu, jetons inconnus refusés")
+
+    etag = strong_etag(digest)
+    response = file_download_response(entry['path'], etag, entry['filename'], {})
+    assert response.status_code == 200 and response.body == data
+
+    # Reprise après coupure à 1000 octets
+    response = file_download_response(entry['path'], etag, entry['filename'],
+                                      {'range': 'bytes=1000-', 'if-range': etag})
+    assert response.status_code == 206
+    assert data[:1000] + response.body == data
+    assert response.headers['content-range'] == f"bytes 1000-{len(data) - 1}/{len(data)}"
+
+    # Contenu changé (If-Range différent): fichier complet
+    response = file_download_response(entry['path'], etag, entry['filename'],
+                                      {'range': 'bytes=1000-', 'if-range': '"autre"'})
+    assert response.status_code == 200 and len(response.body) == len(data)
+    print("   ✅ Range/If-Range respectés")
+
+    response = file_download_response(entry['path'], etag, entry['filename'], {'if-none-match': etag})
+    assert response.status_code == 304
+    response = file_download_response(entry['path'], etag, entry['filename'],
+                                      {'range': f'bytes={len(data)}-'})
+    assert response.status_code == 416
+    assert parse_range('bytes=-100', len(data)) == (len(data) - 100, len(data) - 1)
+    print("   ✅ 304 et 416 corrects")
+    return True
+
+if __name__ == "__main__":
+    test_telechargement_reprenable()
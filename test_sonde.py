@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script de test de la sonde rapide des métadonnées PDF
+"""
+
+import os
+import fitz  # PyMuPDF
+from pdf_probe import probe_many, probe_pdf
+
+def test_sonde_rapide():
+    """La sonde donne les mêmes tailles et rotations que le chargement des pages"""
+
+    print("🔎 Test de la sonde rapide")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    pdf_path = os.path.join("output", "sonde_pages.pdf")
+    doc = fitz.open()
+    for i in range(40):
+        page = doc.new_page(width=595 + i % 3, height=842)
+        if i % 7 == 0:
+            page.set_rotation(90)
+        if i % 11 == 0:
+            page.set_cropbox(fitz.Rect(10, 10, 300, 400))
+    doc.save(pdf_path)
+    doc.close()
+
+    info = probe_pdf(pdf_path)
+    with fitz.open(pdf_path) as doc:
+        attendu = [(page.rect.width, page.rect.height, page.rotation) for page in doc]
+    obtenu = [(p['width'], p['height'], p['rotation']) for p in info['pages_info']]
+    assert info['num_pages'] == 40
+    assert obtenu == attendu, "Tailles ou rotations différentes du chargement des pages"
+    print("   ✅ Tailles, CropBox et rotations identiques")
+
+    invalide = os.path.join("output", "sonde_invalide.pdf")
+    with open(invalide, "wb") as f:
+        f.write(b"pas un pdf")
+    resultats = probe_many([pdf_path, invalide, pdf_path], max_workers=2)
+    assert [r.get('num_pages') for r in resultats] == [40, None, 40]
+    assert 'error' in resultats[1]
+    print("   ✅ Lot sondé en parallèle, fichiers invalides signalés")
+    return True
+
+if __name__ == "__main__":
+    test_sonde_rapide()
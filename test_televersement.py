@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Script de test des téléversements reprenables par morceaux
+"""
+
+import hashlib
+import os
+import tempfile
+
+from upload_sessions import UploadOffsetError, UploadSessions
+
+def test_televersement_reprenable():
+    """Envoi par morceaux, reprise au décalage reçu après une coupure, vérification finale"""
+
+    print("📦 Test des téléversements reprenables")
+    print("=" * 40)
+
+    data = os.urandom(250_000)
+    with tempfile.TemporaryDirectory() as root:
+        sessions = UploadSessions(root, max_size=1_000_000)
+        session = sessions.create("devis.pdf", len(data), hashlib.sha256(data).hexdigest())
+        upload_id = session['upload_id']
+        assert session['offset'] == 0
+
+        assert sessions.append(upload_id, 0, data[:100_000])['offset'] == 100_000
+        # Coupure: le morceau suivant n'arrive qu'à moitié, le client demande où reprendre
+        sessions.append(upload_id, 100_000, data[100_000:150_000])
+        assert sessions.status(upload_id)['offset'] == 150_000
+        print("   ✅ Décalage reçu disponible pour la reprise")
+
+        # Morceau renvoyé (accusé perdu): mêmes octets réécrits, sans erreur
+        assert sessions.append(upload_id, 100_000, data[100_000:150_000])['offset'] == 150_000
+        try:
+            sessions.append(upload_id, 200_000, data[200_000:])
+            assert False, "trou dans le fichier accepté"
+        except UploadOffsetError as e:
+            assert e.offset == 150_000
+        try:
+            sessions.read(upload_id)
+            assert False, "session incomplète lue"
+        except UploadOffsetError:
+            pass
+        print("   ✅ Morceau renvoyé accepté, trou et lecture prématurée refusés")
+
+        status = sessions.append(upload_id, 150_000, data[150_000:])
+        assert status['complete']
+        assert sessions.read(upload_id) == data
+        sessions.discard(upload_id)
+        assert sessions.status(upload_id) is None
+        print("   ✅ Fichier reconstitué à l'identique, session supprimée")
+
+        # Empreinte annoncée différente du contenu reçu
+        other = sessions.create("devis.pdf", 10, "0" * 64)
+        sessions.append(other['upload_id'], 0, b"0123456789")
+        try:
+            sessions.read(other['upload_id'])
+            assert False, "empreinte différente acceptée"
+        except ValueError:
+            pass
+
+        for size in (0, 2_000_000):
+            try:
+                sessions.create("devis.pdf", size)
+                assert False, "taille invalide acceptée"
+            except ValueError:
+                pass
+        assert sessions.status("../../etc/passwd") is None
+        print("   ✅ Empreinte, taille et identifiant vérifiés")
+    return True
+
+def test_taille_des_morceaux():
+    """Un morceau trop gros est refusé d'après Content-Length, ou dès le dépassement en flux"""
+    from fastapi.testclient import TestClient
+    import main
+
+    print("📏 Test de la taille des morceaux")
+    print("=" * 40)
+
+    client = TestClient(main.app)
+    upload = client.post("/uploads/", data={'filename': "devis.pdf", 'size': 4096}).json()
+    url = f"/uploads/{upload['upload_id']}"
+    max_chunk_size = main.UPLOAD_CONFIG['max_chunk_size']
+    main.UPLOAD_CONFIG['max_chunk_size'] = 1024
+    try:
+        response = client.put(url, params={'offset': 0}, content=b"x" * 2048)
+        assert response.status_code == 413
+        print("   ✅ Refusé d'après Content-Length")
+
+        # Sans Content-Length (transfert par blocs): lecture interrompue au dépassement
+        def blocs():
+            for _ in range(64):
+                yield b"x" * 512
+        response = client.put(url, params={'offset': 0}, content=blocs())
+        assert response.status_code == 413
+        assert client.get(url).json()['offset'] == 0
+        print("   ✅ Refusé en flux, rien d'écrit")
+
+        response = client.put(url, params={'offset': 0}, content=b"x" * 1024)
+        assert response.status_code == 200 and response.json()['offset'] == 1024
+        print("   ✅ Morceau à la limite accepté")
+    finally:
+        main.UPLOAD_CONFIG['max_chunk_size'] = max_chunk_size
+        main.upload_sessions.discard(upload['upload_id'])
+    return True
+
+if __name__ == "__main__":
+    test_televersement_reprenable()
+    test_taille_des_morceaux()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Script de test de l'extraction des lignes d'articles et de la vérification des totaux
+"""
+
+import json
+import os
+import fitz  # PyMuPDF
+from line_items import LineItemExtractor, check_document
+
+LIGNES = [
+    ("Fenêtre PVC 120 x 80", "2", "1 250,00", "2 500,00"),
+    ("Pose et réglage", "1", "300,00", "300,00"),
+    ("Volet roulant", "3", "410,50", "1 231,50"),
+]
+
+def creer_devis_articles(output_path, lignes=LIGNES, total_ht="4 031,50"):
+    """Crée un devis avec un tableau d'articles et ses totaux"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    y = 250
+    for x, titre in [(40, "Désignation"), (340, "Qté"), (400, "P.U. HT"), (490, "Total HT")]:
+        page.insert_text((x, y), titre, fontsize=9)
+    for designation, quantite, prix, total in lignes:
+        y += 16
+        page.insert_text((40, y), designation, fontsize=9)
+        page.insert_text((345, y), quantite, fontsize=9)
+        page.insert_text((400, y), f"{prix} EUR", fontsize=9)
+        page.insert_text((490, y), f"{total} EUR", fontsize=9)
+    page.insert_text((40, y + 10), "double vitrage", fontsize=9)
+    for y, libelle, montant in [(620, "Total HT", total_ht), (635, "TVA 10%", "403,15"),
+                                (650, "Total TTC", "4 434,65")]:
+        page.insert_text((380, y), libelle, fontsize=9)
+        page.insert_text((480, y), f"{montant} EUR", fontsize=9)
+    doc.save(output_path)
+    doc.close()
+
+def test_verification_totaux():
+    """Les lignes sont extraites et les écarts de calcul signalés"""
+
+    print("🧮 Test de vérification des totaux")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    correct = os.path.join("output", "devis_articles.pdf")
+    creer_devis_articles(correct)
+    with fitz.open(correct) as doc:
+        table = LineItemExtractor().extract(doc)
+        rapport = check_document(doc)
+    assert table['items']['quantity'].tolist() == [2, 1, 3]
+    assert table['items']['total'].tolist() == [2500.0, 300.0, 1231.5]
+    assert table['designations'][-1] == "Volet roulant double vitrage"
+    assert rapport['ok'] and rapport['total_ttc'] == 4434.65
+    print("   ✅ Lignes et totaux extraits, calculs justes")
+
+    lignes = LIGNES[:2] + [("Volet roulant", "3", "410,50", "1 213,50")]
+    errone = os.path.join("output", "devis_articles_errone.pdf")
+    creer_devis_articles(errone, lignes)
+    with fitz.open(errone) as doc:
+        rapport = check_document(doc)
+    assert not rapport['ok']
+    assert [(d['type'], d.get('line')) for d in rapport['discrepancies']] == [('line', 3), ('total_ht', None)]
+    assert rapport['discrepancies'][0]['expected'] == 1231.5
+    print("   ✅ Ligne fausse et total HT incohérent signalés")
+    return True
+
+def test_entetes_ecarts():
+    """En-tête des écarts: JSON valide et borné même avec beaucoup d'écarts, totaux en tête"""
+    import main
+
+    print("📨 Test de l'en-tête des écarts")
+    print("=" * 40)
+
+    lignes = [{'type': 'line', 'line': i, 'page': 1, 'designation': f"Fenêtre PVC modèle {i}",
+               'expected': 1250.0, 'found': 1205.0} for i in range(1, 201)]
+    check = {'ok': False, 'items': 200,
+             'discrepancies': lignes + [{'type': 'total_ht', 'expected': 250000.0, 'found': 241000.0}]}
+    headers = main._totals_headers(check)
+    assert headers["X-Totals-Check"] == "ecarts"
+    assert len(headers["X-Totals-Discrepancies"]) <= 4000
+    shown = json.loads(headers["X-Totals-Discrepancies"])
+    assert shown[0]['type'] == 'total_ht'
+    assert 1 < len(shown) < 201
+    assert headers["X-Totals-Discrepancies-Count"] == "201"
+    print(f"   ✅ {len(shown)} écarts sur 201 en en-tête, JSON valide")
+
+    headers = main._totals_headers({'ok': True, 'items': 3, 'discrepancies': []})
+    assert headers == {"X-Totals-Check": "ok"}
+    assert main._totals_headers({'ok': True, 'items': 0, 'discrepancies': []})["X-Totals-Check"] == "absent"
+    print("   ✅ Sans écart: seul X-Totals-Check")
+    return True
+
+if __name__ == "__main__":
+    test_verification_totaux()
+    test_entetes_ecarts()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Script de test pour la détection automatique des zones ADF
+"""
+
+import os
+import shutil
+import fitz  # PyMuPDF
+from pdf_processor_complete import PDFProcessorComplete
+from zone_detector import ZoneDetector
+
+def creer_devis_adf(output_path, decalage=0, client="M. DUPONT", infos=()):
+    """
+    Crée un devis au modèle ADF, en-tête éventuellement décalé vers le bas
+    
+    infos: lignes supplémentaires du tableau d'informations, en (x, y, texte)
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    # En-tête ADF (logo + cadre d'informations)
+    page.draw_rect(fitz.Rect(420, 25 + decalage, 560, 80 + decalage), color=(0.8, 0.1, 0.1), width=2)
+    page.insert_text((430, 55 + decalage), "ADF MENUISERIES", fontsize=12)
+    page.insert_text((40, 117 + decalage), "ADF Agence Cannes", fontsize=10)
+    page.insert_text((320, 150 + decalage), "Code interne : 4521", fontsize=9)
+    page.insert_text((40, 195 + decalage), "Code Unique du Devis : X9-221", fontsize=9)
+    for x, y, texte in infos:
+        page.insert_text((x, y + decalage), texte, fontsize=9)
+    # Contenu réel du devis, juste sous les zones attendues
+    page.insert_text((40, 224), f"Désignation pour {client}", fontsize=10)
+    # Bannière ADF
+    page.draw_rect(fitz.Rect(25, 765, 565, 795), fill=(0.8, 0.1, 0.1))
+    page.insert_text((40, 785), "NOUVEAU! VOLETS BATTANTS ADF", fontsize=9, color=(1, 1, 1))
+    doc.save(output_path)
+    doc.close()
+
+def test_detection_zones():
+    """Les zones suivent un en-tête décalé et le plan est réutilisé par modèle"""
+
+    print("🔍 Test de détection des zones ADF")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    plans_dir = os.path.join("output", "plans_test")
+    shutil.rmtree(plans_dir, ignore_errors=True)
+    detector = ZoneDetector(plans_dir=plans_dir)
+    processor = PDFProcessorComplete(zone_detector=detector)
+
+    for i, client in enumerate(["M. DUPONT", "Mme MARTIN"]):
+        input_path = os.path.join("output", f"devis_decale_{i}.pdf")
+        output_path = os.path.join("output", f"devis_decale_{i}_traité.pdf")
+        creer_devis_adf(input_path, decalage=6, client=client)
+        assert processor.process_pdf(input_path, output_path)
+
+        text = fitz.open(output_path)[0].get_text()
+        assert "ADF Agence Cannes" not in text, "Texte ADF décalé non supprimé"
+        assert "Code Unique du Devis" not in text
+        assert f"Désignation pour {client}" in text, "Contenu réel supprimé"
+        print(f"   ✅ Devis {i + 1}: en-tête décalé nettoyé, contenu conservé")
+
+    assert detector.detections == 1, "La détection doit tourner une seule fois par modèle"
+    assert len(os.listdir(plans_dir)) == 1
+    print("   ✅ Plan détecté une fois puis réutilisé")
+    return True
+
+def test_plan_textes_variables():
+    """Un plan détecté sur un devis court couvre les textes plus longs du devis suivant"""
+
+    print("\n📏 Test du plan sur des textes de longueur variable")
+    print("=" * 40)
+
+    os.makedirs("output", exist_ok=True)
+    plans_dir = os.path.join("output", "plans_test_variables")
+    shutil.rmtree(plans_dir, ignore_errors=True)
+    detector = ZoneDetector(plans_dir=plans_dir)
+    processor = PDFProcessorComplete(zone_detector=detector)
+
+    # Même modèle: le tableau d'informations du second devis est plus long
+    devis = [
+        [(320, 165, "Code client : C-1")],
+        [(320, 165, "Code client : C-104425 RÉSIDENCE LES PINS"), (420, 150, "Date actuelle : 19/10/2026")],
+    ]
+    for i, infos in enumerate(devis):
+        input_path = os.path.join("output", f"devis_textes_{i}.pdf")
+        output_path = os.path.join("output", f"devis_textes_{i}_traité.pdf")
+        creer_devis_adf(input_path, client="M. DUPONT", infos=infos)
+        assert processor.process_pdf(input_path, output_path)
+
+        text = fitz.open(output_path)[0].get_text()
+        assert "Date actuelle" not in text, "Date du tableau ADF hors du plan détecté"
+        assert "Code client" not in text, "Code client hors du plan détecté"
+        assert "Désignation pour M. DUPONT" in text, "Contenu réel supprimé"
+        print(f"   ✅ Devis {i + 1}: tableau d'informations nettoyé")
+
+    assert detector.detections == 1, "Les deux devis doivent partager le plan"
+    print("   ✅ Plan partagé, zones jamais plus petites que les zones attendues")
+    return True
+
+if __name__ == "__main__":
+    test_detection_zones()
+    test_plan_textes_variables()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Cache des extractions de texte d'un document
+Chaque page n'est analysée (TextPage) qu'une fois, à la première demande;
+toutes les étapes (totaux, acomptes, détection des zones, extraction des
+données, remplacements) lisent la même analyse. Un TextPage est un instantané:
+une étape qui modifie le texte d'une page l'invalide. Le cache est libéré en
+fin de traitement.
+"""
+
+import fitz  # PyMuPDF
+
+# Options par défaut de page.get_text(): une étape lit le même texte avec ou
+# sans cache (ligatures conservées, voir TextReplacer pour les recherches)
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT
+
+
+class TextPageCache:
+    """TextPage de chaque page d'un document, construits à la demande"""
+
+    def __init__(self, doc, flags: int = TEXT_FLAGS):
+        self.doc = doc
+        self.flags = flags
+        self._textpages = {}
+        self.builds = 0
+        self.hits = 0
+
+    def _number(self, page) -> int:
+        if isinstance(page, int):
+            return page % len(self.doc)
+        return page.number
+
+    def textpage(self, page):
+        """TextPage d'une page (objet Page ou numéro, négatif depuis la fin)"""
+        number = self._number(page)
+        textpage = self._textpages.get(number)
+        if textpage is None:
+            textpage = self.doc[number].get_textpage(flags=self.flags)
+            self._textpages[number] = textpage
+            self.builds += 1
+        else:
+            self.hits += 1
+        return textpage
+
+    def text(self, page) -> str:
+        """Équivalent de page.get_text()"""
+        return self.textpage(page).extractText()
+
+    def words(self, page) -> list:
+        """Équivalent de page.get_text("words")"""
+        return self.textpage(page).extractWORDS()
+
+    def as_dict(self, page) -> dict:
+        """Équivalent de page.get_text("dict") (sans les images)"""
+        return self.textpage(page).extractDICT()
+
+    def as_rawdict(self, page) -> dict:
+        """Équivalent de page.get_text("rawdict") (sans les images)"""
+        return self.textpage(page).extractRAWDICT()
+
+    def invalidate(self, page):
+        """Oublie l'analyse d'une page dont le texte a changé"""
+        self._textpages.pop(self._number(page), None)
+
+    def release(self):
+        """Libère toutes les analyses"""
+        self._textpages.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
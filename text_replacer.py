@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Remplacement de texte existant dans un PDF (TEXT_REPLACEMENTS de config.py)
+Tous les motifs sont cherchés en une seule passe par page grâce à une expression
+régulière compilée; chaque occurrence est caviardée puis réécrite à la même
+position, dans la même taille et la même couleur. Les caviardages d'une page
+sont appliqués en un seul appel.
+"""
+
+import re
+import logging
+
+import fitz  # PyMuPDF
+from text_cache import TEXT_FLAGS
+
+logger = logging.getLogger(__name__)
+
+# Police Base-14 la plus proche selon les attributs de la police d'origine
+# (clé: serif, mono, gras, italique)
+_BASE14_FONTS = {
+    (False, False, False, False): 'helv', (False, False, True, False): 'hebo',
+    (False, False, False, True): 'heit', (False, False, True, True): 'hebi',
+    (True, False, False, False): 'tiro', (True, False, True, False): 'tibo',
+    (True, False, False, True): 'tiit', (True, False, True, True): 'tibi',
+}
+_MONO_FONTS = {
+    (False, False): 'cour', (True, False): 'cobo',
+    (False, True): 'coit', (True, True): 'cobi',
+}
+
+
+def _base14_font(span: dict) -> str:
+    """Police de remplacement d'un span (les polices incorporées sont souvent des sous-ensembles)"""
+    flags = span['flags']
+    name = span['font'].lower()
+    bold = bool(flags & 16) or 'bold' in name
+    italic = bool(flags & 2) or 'italic' in name or 'oblique' in name
+    if flags & 8:
+        return _MONO_FONTS[(bold, italic)]
+    return _BASE14_FONTS[(bool(flags & 4), False, bold, italic)]
+
+
+# Ligatures typographiques développées pour la recherche ('certiﬁé' contient 'certifié')
+_LIGATURES = {
+    '\ufb00': 'ff', '\ufb01': 'fi', '\ufb02': 'fl', '\ufb03': 'ffi',
+    '\ufb04': 'ffl', '\ufb05': 'st', '\ufb06': 'st',
+}
+
+
+def _searchable_text(chars: list) -> tuple:
+    """
+    Texte d'un span, ligatures développées
+
+    Returns:
+        tuple: (texte, indice du caractère d'origine de chaque caractère du texte)
+    """
+    parts, owners = [], []
+    for index, char in enumerate(chars):
+        text = _LIGATURES.get(char["c"], char["c"])
+        parts.append(text)
+        owners.extend([index] * len(text))
+    return "".join(parts), owners
+
+
+def _srgb_to_rgb(color: int) -> tuple:
+    return ((color >> 16) & 255) / 255, ((color >> 8) & 255) / 255, (color & 255) / 255
+
+
+class TextReplacer:
+    """Moteur de remplacement multi-motifs"""
+
+    def __init__(self, replacements: dict):
+        """
+        Compile les remplacements
+
+        Args:
+            replacements: {texte recherché: texte de remplacement}
+        """
+        self.replacements = {old: new for old, new in replacements.items() if old}
+        # Motifs les plus longs d'abord: 'DEVIS N°' l'emporte sur 'DEVIS'
+        patterns = sorted(self.replacements, key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(p) for p in patterns)) if patterns else None
+
+    def find_matches(self, page, texts=None) -> list:
+        """
+        Occurrences des motifs sur une page (une extraction, une recherche par ligne de span)
+
+        Args:
+            texts: TextPageCache partagé du document (optionnel)
+
+        Returns:
+            list: dicts {rect, origin, replacement, fontsize, fontname, color}
+        """
+        if self.pattern is None:
+            return []
+
+        if texts is not None:
+            rawdict = texts.as_rawdict(page)
+        else:
+            rawdict = page.get_text("rawdict", flags=TEXT_FLAGS)
+        matches = []
+        for block in rawdict["blocks"]:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    chars = span["chars"]
+                    text, owners = _searchable_text(chars)
+                    for match in self.pattern.finditer(text):
+                        matched = chars[owners[match.start()]:owners[match.end() - 1] + 1]
+                        rect = fitz.Rect(matched[0]["bbox"])
+                        for char in matched[1:]:
+                            rect |= char["bbox"]
+                        matches.append({
+                            'rect': rect,
+                            'origin': fitz.Point(matched[0]["origin"]),
+                            'replacement': self.replacements[match.group()],
+                            'fontsize': span["size"],
+                            'fontname': _base14_font(span),
+                            'color': _srgb_to_rgb(span["color"]),
+                        })
+        return matches
+
+    def replace_in_page(self, page, texts=None) -> int:
+        """
+        Remplace toutes les occurrences d'une page (son analyse partagée est invalidée)
+
+        Returns:
+            int: Nombre de remplacements
+        """
+        matches = self.find_matches(page, texts)
+        if not matches:
+            return 0
+
+        for match in matches:
+            # Rectangle resserré: ne pas toucher les caractères voisins
+            rect = match['rect']
+            inset = min(0.5, rect.width / 4)
+            page.add_redact_annot(rect + (inset, 0, -inset, 0), fill=False)
+        # Un seul passage de caviardage pour toute la page
+        page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
+
+        shape = page.new_shape()
+        for match in matches:
+            shape.insert_text(match['origin'], match['replacement'], fontsize=match['fontsize'],
+                              fontname=match['fontname'], color=match['color'])
+        shape.commit()
+        if texts is not None:
+            texts.invalidate(page)
+        return len(matches)
+
+    def replace_in_document(self, doc, texts=None) -> int:
+        """Remplace les occurrences sur toutes les pages, retourne leur nombre"""
+        total = 0
+        for page in doc:
+            count = self.replace_in_page(page, texts)
+            if count:
+                logger.info(f"Page {page.number + 1}: {count} remplacements de texte")
+            total += count
+        return total
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Téléversements reprenables par morceaux
+Le client crée une session (nom et taille du fichier), envoie des morceaux à
+un décalage donné, peut demander à tout moment le décalage reçu (après une
+coupure réseau) puis finalise. Les sessions sont sur disque, partagées par
+tous les workers: la taille du fichier partiel fait foi, et un verrou sur ce
+fichier sérialise les écritures concurrentes.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import secrets
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SESSION_RE = re.compile(r"^[A-Za-z0-9_-]{32}$")
+
+
+class UploadOffsetError(ValueError):
+    """Morceau envoyé au-delà des données reçues, ou session incomplète"""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UploadSessions:
+    """Sessions de téléversement par morceaux, avec expiration"""
+
+    def __init__(self, root: str = "uploads/sessions", max_size: int = 50 * 1024 * 1024,
+                 ttl: int = 86400, cleanup_interval: int = 300):
+        """
+        Initialise le stockage des sessions
+
+        Args:
+            root: Répertoire des sessions (métadonnées et fichiers partiels)
+            max_size: Taille maximale d'un fichier téléversé en octets
+            ttl: Durée de vie d'une session sans nouveau morceau, en secondes
+            cleanup_interval: Intervalle minimal entre deux nettoyages
+        """
+        self.root = root
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+        os.makedirs(self.root, exist_ok=True)
+
+    def _paths(self, upload_id: str) -> tuple:
+        base = os.path.join(self.root, upload_id)
+        return f"{base}.json", f"{base}.part"
+
+    def create(self, filename: str, size: int, sha256: str = None) -> dict:
+        """
+        Ouvre une session de téléversement
+
+        Args:
+            filename: Nom du fichier
+            size: Taille annoncée en octets
+            sha256: Empreinte annoncée, vérifiée à la lecture (optionnelle)
+
+        Returns:
+            dict: {'upload_id', 'filename', 'size', 'sha256', 'offset'}
+        """
+        if size <= 0 or size > self.max_size:
+            raise ValueError(f"Taille invalide: {size} octets (maximum {self.max_size})")
+        self.cleanup()
+        upload_id = secrets.token_urlsafe(24)
+        meta_path, part_path = self._paths(upload_id)
+        meta = {'upload_id': upload_id, 'filename': filename, 'size': size,
+                'sha256': sha256.lower() if sha256 else None, 'created': time.time()}
+        open(part_path, "wb").close()
+        tmp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+        return {**meta, 'offset': 0}
+
+    def status(self, upload_id: str):
+        """
+        État d'une session
+
+        Returns:
+            dict: {'upload_id', 'filename', 'size', 'sha256', 'offset', 'complete'}
+            ou None si la session est inconnue ou a expiré
+        """
+        if not _SESSION_RE.match(upload_id or ""):
+            return None
+        meta_path, part_path = self._paths(upload_id)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            offset = os.path.getsize(part_path)
+            if time.time() - os.path.getmtime(part_path) > self.ttl:
+                return None
+        except (OSError, ValueError):
+            return None
+        return {**meta, 'offset': offset, 'complete': offset == meta['size']}
+
+    def append(self, upload_id: str, offset: int, data: bytes):
+        """
+        Écrit un morceau à son décalage
+
+        Un morceau renvoyé (accusé de réception perdu) réécrit les mêmes
+        octets: seul un décalage au-delà des données reçues est refusé.
+
+        Returns:
+            dict: État de la session après écriture, None si elle est inconnue
+
+        Raises:
+            UploadOffsetError: Décalage au-delà des données reçues
+            ValueError: Morceau dépassant la taille annoncée
+        """
+        session = self.status(upload_id)
+        if session is None:
+            return None
+        if offset < 0 or offset + len(data) > session['size']:
+            raise ValueError(f"Morceau hors du fichier: {offset}+{len(data)} > {session['size']} octets")
+        _, part_path = self._paths(upload_id)
+        with open(part_path, "r+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            received = os.fstat(f.fileno()).st_size
+            if offset > received:
+                raise UploadOffsetError(f"Décalage {offset} au-delà des {received} octets reçus", received)
+            f.seek(offset)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            received = max(received, offset + len(data))
+        return {**session, 'offset': received, 'complete': received == session['size']}
+
+    def read(self, upload_id: str):
+        """
+        Contenu complet d'une session
+
+        Returns:
+            bytes: Contenu, None si la session est inconnue
+
+        Raises:
+            UploadOffsetError: Session incomplète
+            ValueError: Empreinte différente de celle annoncée
+        """
+        session = self.status(upload_id)
+        if session is None:
+            return None
+        if not session['complete']:
+            raise UploadOffsetError(
+                f"Téléversement incomplet: {session['offset']}/{session['size']} octets", session['offset']
+            )
+        with open(self._paths(upload_id)[1], "rb") as f:
+            content = f.read()
+        if session['sha256'] and hashlib.sha256(content).hexdigest() != session['sha256']:
+            raise ValueError("Empreinte SHA-256 différente de celle annoncée")
+        return content
+
+    def discard(self, upload_id: str):
+        """Supprime une session"""
+        if not _SESSION_RE.match(upload_id or ""):
+            return
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def cleanup(self):
+        """Supprime les sessions expirées (au plus une fois par intervalle)"""
+        now = time.time()
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        removed = 0
+        for filename in os.listdir(self.root):
+            upload_id, extension = os.path.splitext(filename)
+            if extension == ".json" and self.status(upload_id) is None:
+                self.discard(upload_id)
+                removed += 1
+        if removed:
+            logger.info(f"🧹 {removed} sessions de téléversement expirées supprimées")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Détection automatique des zones ADF à nettoyer (logo, tableau d'informations, bannière)
+Les zones sont calculées à partir des blocs de texte, d'images et de dessins de la
+page 1, puis mises en cache par empreinte de mise en page : la détection ne tourne
+qu'une fois par variante de modèle, les devis suivants réutilisent le plan.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import logging
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+# Types d'éléments de get_bboxlog() considérés comme du contenu visible
+CONTENT_TYPES = {
+    'fill-text', 'stroke-text', 'ignore-text',
+    'fill-path', 'stroke-path', 'fill-image', 'fill-shade',
+}
+
+# Version du format des plans enregistrés (les plans d'une autre version sont ignorés)
+PLAN_VERSION = 2
+
+
+def layout_fingerprint(page) -> str:
+    """
+    Empreinte de la mise en page d'une page de modèle
+
+    Seuls la taille de page et les images et dessins des bandes d'en-tête et de
+    pied de page sont pris en compte (arrondis à 10 points) : le texte varie
+    d'un devis à l'autre, le cadre du modèle non.
+    """
+    width, height = page.rect.width, page.rect.height
+    header_limit, footer_limit = 220, height - 100
+
+    boxes = []
+    for kind, bbox in page.get_bboxlog():
+        if kind not in CONTENT_TYPES or kind.endswith('-text'):
+            continue
+        rect = fitz.Rect(bbox)
+        if rect.y1 <= header_limit or rect.y0 >= footer_limit:
+            boxes.append((kind, *(int(round(v / 10)) for v in rect)))
+
+    layout = {'size': (round(width), round(height)), 'boxes': sorted(boxes)}
+    return hashlib.sha1(json.dumps(layout).encode()).hexdigest()[:16]
+
+
+class ZoneDetector:
+    """Détecte les zones ADF et met les plans en cache par empreinte de mise en page"""
+
+    def __init__(self, plans_dir: str = "plans", min_overlap: float = 0.5,
+                 tolerance: float = 20, margin: float = 2):
+        """
+        Initialise le détecteur
+
+        Args:
+            plans_dir: Répertoire des plans détectés (partagés entre processus)
+            min_overlap: Part minimale d'un élément dans la zone attendue pour en faire partie
+            tolerance: Décalage maximal (en points) d'un élément du modèle hors de sa zone
+            margin: Marge ajoutée autour des éléments détectés (en points)
+        """
+        self.plans_dir = plans_dir
+        self.min_overlap = min_overlap
+        self.tolerance = tolerance
+        self.margin = margin
+        self._plans = {}
+        self._lock = threading.Lock()
+        self.detections = 0
+
+    def plan_for(self, doc, default_zones: dict, texts=None) -> dict:
+        """
+        Retourne le plan de zones d'un document, détecté ou repris du cache
+
+        Args:
+            doc: Document PyMuPDF ouvert
+            default_zones: Zones attendues au format zones_to_clean
+                ({'page1_only': [...], 'all_pages': [...]}), chaque zone pouvant
+                lister des 'keywords' qui identifient son texte
+            texts: TextPageCache partagé du document (optionnel)
+
+        Returns:
+            dict: Zones ajustées, au même format
+        """
+        page1 = doc[0]
+        defaults_hash = hashlib.sha1(json.dumps(default_zones, sort_keys=True).encode()).hexdigest()[:8]
+        key = f"{layout_fingerprint(page1)}_{defaults_hash}_v{PLAN_VERSION}"
+
+        with self._lock:
+            plan = self._plans.get(key)
+        if plan is None:
+            plan = self._load_plan(key)
+        if plan is None:
+            plan = self.detect(page1, default_zones, texts)
+            self._save_plan(key, plan)
+            logger.info(f"Plan de zones détecté pour la mise en page {key}")
+        with self._lock:
+            self._plans[key] = plan
+        return plan
+
+    def detect(self, page, default_zones: dict, texts=None) -> dict:
+        """Ajuste chaque zone attendue aux éléments de la page qu'elle contient"""
+        self.detections += 1
+
+        # Images, dessins et texte ligne par ligne (une seule fois par modèle);
+        # les images viennent du journal des boîtes, sans analyse de texte dédiée
+        elements = [(fitz.Rect(bbox), None) for kind, bbox in page.get_bboxlog()
+                    if kind in ('fill-image', 'fill-imgmask')]
+        elements += [(fitz.Rect(drawing['rect']), None) for drawing in page.get_drawings()]
+        text_dict = texts.as_dict(page) if texts is not None else page.get_text("dict")
+        for block in text_dict["blocks"]:
+            for line in block.get("lines", []):
+                text = "".join(span["text"] for span in line["spans"])
+                if text.strip():
+                    elements.append((fitz.Rect(line["bbox"]), text))
+
+        plan = {}
+        for scope, zones in default_zones.items():
+            plan[scope] = [self._fit_zone(zone, elements, page.rect) for zone in zones]
+        return plan
+
+    def _belongs_to_zone(self, rect, text, zone: dict, expected, window) -> bool:
+        """
+        Un élément fait partie de la zone s'il y est majoritairement contenu, ou s'il
+        déborde de moins de `tolerance` points et ressemble au modèle (image, dessin,
+        ou texte contenant un mot-clé de la zone)
+        """
+        inside = rect & expected
+        if inside.is_empty:
+            if not rect.intersects(window):
+                return False
+        elif inside.get_area() >= self.min_overlap * rect.get_area():
+            return True
+
+        if not window.contains(rect):
+            return False
+        if text is None:
+            return True
+        return any(keyword.lower() in text.lower() for keyword in zone.get('keywords', []))
+
+    def _fit_zone(self, zone: dict, elements: list, page_rect) -> dict:
+        """
+        Zone ajustée: zone attendue agrandie aux éléments du modèle trouvés autour
+
+        La zone ne fait que grandir: le plan est partagé par tous les devis de la
+        même mise en page, dont les textes (dates, codes client) sont plus ou
+        moins longs que ceux du devis qui a servi à la détection.
+        """
+        expected = fitz.Rect(zone['rect'])
+        window = expected + (-self.tolerance, -self.tolerance, self.tolerance, self.tolerance)
+        found = fitz.Rect()
+        for rect, text in elements:
+            if rect.is_empty:
+                continue
+            if self._belongs_to_zone(rect, text, zone, expected, window):
+                found |= rect
+
+        fitted = dict(zone)
+        if found.is_empty:
+            # Rien de reconnu: garder la zone attendue
+            fitted['detected'] = False
+        else:
+            found = (found + (-self.margin, -self.margin, self.margin, self.margin)) & page_rect
+            found |= expected
+            fitted['rect'] = [round(v, 1) for v in found]
+            fitted['detected'] = True
+        return fitted
+
+    def _plan_path(self, key: str) -> str:
+        return os.path.join(self.plans_dir, f"{key}.json")
+
+    def _load_plan(self, key: str):
+        try:
+            with open(self._plan_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_plan(self, key: str, plan: dict):
+        try:
+            os.makedirs(self.plans_dir, exist_ok=True)
+            tmp_path = f"{self._plan_path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(plan, f, indent=2)
+            os.replace(tmp_path, self._plan_path(key))
+        except OSError as e:
+            logger.warning(f"Plan de zones non enregistré: {e}")
+
+
+_detector = None
+
+
+def get_zone_detector() -> ZoneDetector:
+    """Détecteur partagé par tous les traitements du processus"""
+    global _detector
+    if _detector is None:
+        _detector = ZoneDetector()
+    return _detector